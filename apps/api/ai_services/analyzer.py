@@ -1,19 +1,135 @@
+from django.conf import settings
 from .rekognition import RekognitionService
 from .yolo_detector import YOLODetector
 from .ocr_service import OCRService
+from .frame import Frame
+from .mosaic import MOSAIC_TILES
+from .engines import (
+    LABEL_OBJECT_KEYS, REKOGNITION_ENGINES, engine_fingerprint, reuse_engine_output, stale_engines,
+)
 import logging
 
 logger = logging.getLogger(__name__)
 
 
 class VideoAnalyzer:
-    def __init__(self):
+    # detect_protective_equipment, detect_labels (objects), detect_text, detect_labels (people)
+    REKOGNITION_CALLS_PER_FRAME = 4
+
+    def __init__(self, store_id=None):
         self.rekognition = RekognitionService()
         self.yolo = YOLODetector()
-        self.ocr = OCRService()
+        # The store scopes the menu board cache
+        self.ocr = OCRService(store_id=store_id)
+
+    @classmethod
+    def for_scoring(cls):
+        """Analyzer that only scores and generates findings for existing analyses
+
+        No detector is loaded, so it makes no AI service calls.
+        """
+        analyzer = cls.__new__(cls)
+        analyzer.rekognition = analyzer.yolo = analyzer.ocr = None
+        return analyzer
+
+    def needs_local_frame(self):
+        """True when a local detector (YOLO/OCR) needs the frame's pixels"""
+        return self.yolo.model is not None or self.ocr.available
+
+    def _gates_ocr_on_text(self, rekognition_image):
+        """True when menu board OCR waits for Rekognition text regions"""
+        return bool(
+            settings.OCR_REGION_GATING and rekognition_image
+            and self.rekognition.client is not None and self.ocr.available
+        )
 
-    def analyze_frame(self, frame_path, frame_image_bytes=None):
-        """Analyze a single video frame for all compliance criteria"""
+    def engine_fingerprints(self):
+        """Fingerprint of every detector engine as this analyzer runs it (see engines)"""
+        rekognition_active = self.rekognition.client is not None
+        return {
+            'rekognition_ppe': engine_fingerprint('rekognition_ppe', rekognition_active),
+            'rekognition_labels': engine_fingerprint('rekognition_labels', rekognition_active),
+            'rekognition_text': engine_fingerprint('rekognition_text', rekognition_active),
+            'yolo': engine_fingerprint('yolo', self.yolo.model is not None),
+            'ocr': engine_fingerprint('ocr', self.ocr.available),
+        }
+
+    def stale_engines(self, analysis):
+        """Engines an earlier analysis of a frame needs re-run with (see engines.stale_engines)"""
+        return stale_engines(analysis, self.engine_fingerprints())
+
+    def analyze_frames(self, frames, label_mosaic=False, previous=None):
+        """Analyze a batch of frames
+
+        Menu board OCR for the whole batch is queued first, so with the OCR
+        pool it runs on other cores while Rekognition is called; when OCR is
+        gated on Rekognition text regions each frame queues its own OCR once
+        its text is known. With label_mosaic, object and people detection
+        come from one mosaic detect_labels call per MOSAIC_TILES frames
+        (RekognitionService.detect_labels_mosaic); if a mosaic call fails or
+        finds a label that matters for findings or scores but cannot be
+        attributed to a frame, its frames fall back to their own label calls.
+
+        Args:
+            frames: Frame objects
+            previous: Earlier analysis (or None) per frame; only the engines
+                that are stale in it run (see analyze_frame)
+
+        Returns:
+            list: analyze_frame() results in input order
+        """
+        previous = previous or [None] * len(frames)
+        fingerprints = self.engine_fingerprints()
+        stale = [stale_engines(analysis, fingerprints) for analysis in previous]
+
+        menu_boards = [None] * len(frames)
+        if not self._gates_ocr_on_text(True):
+            ocr_indexes = [index for index, engines in enumerate(stale) if 'ocr' in engines]
+            for index, menu_board in zip(ocr_indexes, self.ocr.submit_menu_boards([frames[i] for i in ocr_indexes])):
+                menu_boards[index] = menu_board
+
+        label_results = [None] * len(frames)
+        if label_mosaic:
+            label_indexes = [index for index, engines in enumerate(stale) if 'rekognition_labels' in engines]
+            for start in range(0, len(label_indexes), MOSAIC_TILES):
+                chunk = label_indexes[start:start + MOSAIC_TILES]
+                try:
+                    mosaic_results = self.rekognition.detect_labels_mosaic(
+                        [frames[index].downscaled(settings.REKOGNITION_MOSAIC_TILE_SIZE) for index in chunk]
+                    )
+                    for index, labels in zip(chunk, mosaic_results):
+                        label_results[index] = labels
+                except Exception as e:
+                    logger.warning(f"Mosaic label detection failed, analyzing frames individually: {e}")
+
+        return [
+            self.analyze_frame(frame, label_results=labels, menu_board=menu_board, previous=analysis)
+            for frame, labels, menu_board, analysis in zip(frames, label_results, menu_boards, previous)
+        ]
+
+    def analyze_frame(self, frame, frame_image_bytes=None, frame_s3_image=None, label_results=None,
+                      menu_board=None, previous=None):
+        """Analyze a single video frame for all compliance criteria
+
+        frame is a Frame shared by every detector, so the frame is decoded at
+        most once. Callers without one may pass a frame file path (or None)
+        with frame_image_bytes, or frame_s3_image (see
+        RekognitionService.s3_image) so Rekognition reads the frame from S3
+        itself. label_results carries this frame's share of a mosaic
+        detect_labels call and replaces the per-frame object and people
+        calls. menu_board is a pending result from
+        OCRService.submit_menu_boards.
+
+        previous is an earlier analysis of the same frame: only the engines
+        whose version or configuration changed since are run, the output of
+        the others is reused. The fingerprint of every engine whose output
+        the result holds is recorded under 'engines'; Rekognition calls that
+        failed are left out, so the next analysis retries them.
+        """
+        fingerprints = self.engine_fingerprints()
+        stale = stale_engines(previous, fingerprints)
+        frame = Frame.coerce(frame, data=frame_image_bytes, s3_image=frame_s3_image)
+        rekognition_image = frame.rekognition_image if stale & REKOGNITION_ENGINES else None
         results = {
             'ppe_analysis': {},
             'safety_analysis': [],  # List, not dict - for extend() compatibility
@@ -31,74 +147,108 @@ class VideoAnalyzer:
             'rekognition_available': True,
             'warnings': []
         }
+        engines = {}
+        for name in fingerprints.keys() - stale:
+            reuse_engine_output(results, previous, name)
+            engines[name] = fingerprints[name]
+            if name in REKOGNITION_ENGINES and not fingerprints[name]['active']:
+                results['rekognition_available'] = False
+
+        def record(name, succeeded=True):
+            # Failures of a configured-off engine are its normal output
+            if succeeded or not fingerprints[name]['active']:
+                engines[name] = fingerprints[name]
+
+        # Without Rekognition's text regions (when re-run) gated OCR reads the reused ones
+        text_source = rekognition_image if 'rekognition_text' in stale else results['text_analysis']
+        if 'ocr' in stale and menu_board is None and not self._gates_ocr_on_text(text_source):
+            menu_board = self.ocr.submit_menu_boards([frame])[0]
 
         try:
             # PPE Detection using AWS Rekognition
-            if frame_image_bytes:
+            if rekognition_image and 'rekognition_ppe' in stale:
                 try:
-                    ppe_results = self.rekognition.detect_ppe(frame_image_bytes)
+                    ppe_results = self.rekognition.detect_ppe(rekognition_image)
                     results['ppe_analysis'] = ppe_results
+                    record('rekognition_ppe')
                     logger.info(f"PPE analysis completed for frame")
                 except (RuntimeError, Exception) as e:
                     logger.warning(f"Rekognition PPE detection unavailable: {e}")
                     results['rekognition_available'] = False
                     results['warnings'].append(f"PPE detection unavailable: {str(e)}")
+                    record('rekognition_ppe', succeeded=False)
 
             # Object Detection using AWS Rekognition (expanded categories)
-            if frame_image_bytes and results['rekognition_available']:
+            if rekognition_image and 'rekognition_labels' in stale and results['rekognition_available']:
                 try:
-                    object_results = self.rekognition.detect_objects(frame_image_bytes)
-                    results['safety_analysis'] = object_results.get('safety_objects', [])
-                    results['cleanliness_analysis'] = object_results.get('cleanliness_objects', [])
-                    results['food_safety_analysis'] = object_results.get('food_safety_objects', [])
-                    results['equipment_analysis'] = object_results.get('equipment_objects', [])
-                    results['operational_analysis'] = object_results.get('operational_objects', [])
-                    results['food_quality_analysis'] = object_results.get('food_quality_objects', [])
-                    results['staff_behavior_analysis'] = object_results.get('staff_behavior_objects', [])
+                    if label_results:
+                        object_results = label_results['objects']
+                    else:
+                        object_results = self.rekognition.detect_objects(rekognition_image)
+                    # YOLO objects reused from the previous analysis stay after Rekognition's
+                    for key in LABEL_OBJECT_KEYS:
+                        category = key[:-len('_analysis')]
+                        results[key] = object_results.get(f'{category}_objects', []) + results[key]
                 except (RuntimeError, Exception) as e:
                     logger.warning(f"Rekognition object detection unavailable: {e}")
                     results['rekognition_available'] = False
                     results['warnings'].append(f"Object detection unavailable: {str(e)}")
+                    record('rekognition_labels', succeeded=False)
 
             # Text Detection using AWS Rekognition
-            if frame_image_bytes and results['rekognition_available']:
+            if rekognition_image and 'rekognition_text' in stale and results['rekognition_available']:
                 try:
-                    text_results = self.rekognition.detect_text(frame_image_bytes)
+                    text_results = self.rekognition.detect_text(rekognition_image)
                     results['text_analysis'] = text_results
+                    record('rekognition_text')
                     logger.info(f"Text detection completed for frame")
                 except (RuntimeError, Exception) as e:
                     logger.warning(f"Rekognition text detection unavailable: {e}")
                     results['warnings'].append(f"Text detection unavailable: {str(e)}")
+                    record('rekognition_text', succeeded=False)
+
+            if 'ocr' in stale and menu_board is None:
+                # OCR only the text regions found above; full frame if text detection failed
+                menu_board = self.ocr.submit_menu_boards([frame], [results['text_analysis'] or None])[0]
 
-            # People Detection using AWS Rekognition
-            if frame_image_bytes and results['rekognition_available']:
+            # People Detection using AWS Rekognition (recorded with the objects as one labels engine)
+            if rekognition_image and 'rekognition_labels' in stale and results['rekognition_available']:
                 try:
-                    people_results = self.rekognition.detect_people(frame_image_bytes)
+                    if label_results:
+                        people_results = label_results['people']
+                    else:
+                        people_results = self.rekognition.detect_people(rekognition_image)
                     results['people_analysis'] = people_results
+                    record('rekognition_labels')
                     logger.info(f"People detection completed for frame")
                 except (RuntimeError, Exception) as e:
                     logger.warning(f"Rekognition people detection unavailable: {e}")
                     results['warnings'].append(f"People detection unavailable: {str(e)}")
+                    record('rekognition_labels', succeeded=False)
 
-            # Enhanced object detection using YOLO
-            yolo_results = self.yolo.detect_objects(frame_path)
-            self._merge_object_detections(results, yolo_results)
+            if 'yolo' in stale:
+                # Enhanced object detection using YOLO
+                yolo_results = self.yolo.detect_objects(frame)
+                self._merge_object_detections(results, yolo_results)
 
-            # Uniform compliance using YOLO
-            uniform_results = self.yolo.detect_uniform_compliance(frame_path)
-            results['uniform_analysis'] = uniform_results
+                # Uniform compliance using YOLO
+                uniform_results = self.yolo.detect_uniform_compliance(frame)
+                results['uniform_analysis'] = uniform_results
+                record('yolo')
 
-            # Menu board analysis using OCR
-            menu_results = self.ocr.analyze_menu_board(frame_path)
-            results['menu_board_analysis'] = menu_results
+            if 'ocr' in stale:
+                # Menu board analysis using OCR
+                results['menu_board_analysis'] = menu_board()
+                record('ocr')
 
             # Calculate overall score (adjusted for available services)
             results['overall_score'] = self._calculate_overall_score(results)
 
         except Exception as e:
-            logger.error(f"Critical error analyzing frame {frame_path}: {e}")
+            logger.error(f"Critical error analyzing frame {frame.path}: {e}")
             results['error'] = str(e)
 
+        results['engines'] = engines
         return results
 
     def _merge_object_detections(self, results, yolo_results):
@@ -457,6 +607,7 @@ class VideoAnalyzer:
                     'confidence': confidence,
                     'frame': frame_obj,
                     'bounding_box': obj.get('bounding_box'),
+                    'label': obj_name,
                     'recommended_action': 'Immediately clear blocked exits and pathways'
                 })
         
@@ -479,6 +630,7 @@ class VideoAnalyzer:
                     'confidence': confidence,
                     'frame': frame_obj,
                     'bounding_box': obj.get('bounding_box'),
+                    'label': obj_name,
                     'recommended_action': 'Clean up spill immediately and check for slip hazards'
                 })
         
@@ -539,6 +691,7 @@ class VideoAnalyzer:
                     'confidence': confidence,
                     'frame': frame_obj,
                     'bounding_box': obj.get('bounding_box'),
+                    'label': obj_name,
                     'recommended_action': 'Ensure all food containers are properly covered to prevent contamination'
                 })
 
@@ -557,6 +710,7 @@ class VideoAnalyzer:
                     'confidence': confidence,
                     'frame': frame_obj,
                     'bounding_box': obj.get('bounding_box'),
+                    'label': obj_name,
                     'recommended_action': 'Verify cutting boards are color-coded and used properly (raw vs. cooked)'
                 })
 
@@ -580,6 +734,7 @@ class VideoAnalyzer:
                     'confidence': confidence,
                     'frame': frame_obj,
                     'bounding_box': obj.get('bounding_box'),
+                    'label': obj_name,
                     'recommended_action': 'Inspect and repair or replace damaged equipment immediately'
                 })
 
@@ -593,6 +748,7 @@ class VideoAnalyzer:
                     'confidence': confidence,
                     'frame': frame_obj,
                     'bounding_box': obj.get('bounding_box'),
+                    'label': obj_name,
                     'recommended_action': 'Clean grease from hoods, filters, and surfaces to prevent fire hazards'
                 })
 
@@ -606,6 +762,7 @@ class VideoAnalyzer:
                     'confidence': confidence,
                     'frame': frame_obj,
                     'bounding_box': obj.get('bounding_box'),
+                    'label': obj_name,
                     'recommended_action': 'Identify source of leak and repair to prevent slip hazards and equipment damage'
                 })
 
@@ -645,6 +802,7 @@ class VideoAnalyzer:
                     'confidence': confidence,
                     'frame': frame_obj,
                     'bounding_box': obj.get('bounding_box'),
+                    'label': obj_name,
                     'recommended_action': 'Monitor queue length and adjust staffing as needed'
                 })
 
@@ -671,6 +829,7 @@ class VideoAnalyzer:
                         'confidence': confidence,
                         'frame': frame_obj,
                         'bounding_box': obj.get('bounding_box'),
+                        'label': obj_name,
                         'recommended_action': 'Review plate presentation for consistency with brand standards'
                     })
 
@@ -694,6 +853,7 @@ class VideoAnalyzer:
                     'confidence': confidence,
                     'frame': frame_obj,
                     'bounding_box': obj.get('bounding_box'),
+                    'label': obj_name,
                     'recommended_action': 'Ensure staff remove jewelry and accessories per food safety policy'
                 })
 
@@ -707,6 +867,7 @@ class VideoAnalyzer:
                     'confidence': confidence,
                     'frame': frame_obj,
                     'bounding_box': obj.get('bounding_box'),
+                    'label': obj_name,
                     'recommended_action': 'Remove phones from food preparation areas to maintain hygiene'
                 })
 
@@ -720,6 +881,7 @@ class VideoAnalyzer:
                     'confidence': confidence,
                     'frame': frame_obj,
                     'bounding_box': obj.get('bounding_box'),
+                    'label': obj_name,
                     'recommended_action': 'Ensure employees only eat/drink in designated areas'
                 })
 
@@ -12,8 +12,9 @@ class BedrockRecommendationService:
     Uses Claude via Bedrock to generate contextual recommendations and time estimates.
     """
 
-    def __init__(self):
-        self.enabled = getattr(settings, 'ENABLE_BEDROCK_RECOMMENDATIONS', False)
+    def __init__(self, enabled=None):
+        # enabled=False forces the fallback recommendations, e.g. for offline re-scoring
+        self.enabled = getattr(settings, 'ENABLE_BEDROCK_RECOMMENDATIONS', False) if enabled is None else enabled
 
         if self.enabled:
             try:
@@ -0,0 +1,166 @@
+"""
+Flat detections of a frame analysis.
+
+analyze_frame results are nested per detector. For storage in the Detection
+table they are flattened into (type, label, confidence, bbox) rows, with
+confidences normalized to 0-1, and frame_analysis_from_detections rebuilds
+an analysis from those rows that scores and produces findings exactly like
+the original, so scores can be recomputed without calling any AI service.
+
+Besides the detector outputs, every frame gets one 'frame' row recording
+whether Rekognition was available (it changes the score weights), so frames
+without any detection are not lost either.
+"""
+from .analyzer import VideoAnalyzer
+from .ocr_service import OCRService
+from .yolo_detector import YOLODetector
+
+# Rekognition object categories, stored under the analysis key without '_analysis'
+OBJECT_TYPES = [
+    'safety', 'cleanliness', 'food_safety', 'equipment',
+    'operational', 'food_quality', 'staff_behavior',
+]
+
+PPE_EQUIPMENT = {
+    'FACE_COVER': 'persons_with_face_cover',
+    'HAND_COVER': 'persons_with_hand_cover',
+    'HEAD_COVER': 'persons_with_head_cover',
+}
+
+REKOGNITION_AVAILABLE = 'rekognition_available'
+REKOGNITION_UNAVAILABLE = 'rekognition_unavailable'
+
+LABEL_MAX_LENGTH = 200
+
+
+def _confidence(value):
+    """Rekognition reports 0-100, YOLO and EasyOCR 0-1"""
+    value = value or 0.0
+    return value / 100.0 if value > 1 else value
+
+
+def _row(type, label, confidence, bbox=None):
+    return {
+        'type': type,
+        'label': (label or '')[:LABEL_MAX_LENGTH],
+        'confidence': _confidence(confidence),
+        'bbox': bbox or None,
+    }
+
+
+def flatten_frame_analysis(analysis):
+    """Detection rows of one analyze_frame result
+
+    Returns:
+        list: dicts with type, label, confidence (0-1) and bbox
+    """
+    available = analysis.get('rekognition_available', True)
+    rows = [_row('frame', REKOGNITION_AVAILABLE if available else REKOGNITION_UNAVAILABLE, 1.0)]
+
+    # One row per person and one per kind of equipment covering that person
+    for person in (analysis.get('ppe_analysis') or {}).get('persons', []):
+        rows.append(_row('ppe', 'person', person.get('confidence'), person.get('bounding_box')))
+        covered = {}
+        for part in person.get('body_parts', []):
+            for equipment in part.get('equipment', []):
+                if equipment.get('covers_body_part') and equipment.get('type') not in covered:
+                    covered[equipment.get('type')] = equipment
+        for equipment_type, equipment in covered.items():
+            rows.append(_row('ppe', equipment_type, equipment.get('confidence'), equipment.get('bounding_box')))
+
+    for object_type in OBJECT_TYPES:
+        for obj in analysis.get(f'{object_type}_analysis') or []:
+            rows.append(_row(
+                object_type, obj.get('name') or obj.get('class'), obj.get('confidence'), obj.get('bounding_box')
+            ))
+
+    for instance in (analysis.get('people_analysis') or {}).get('people_instances', []):
+        rows.append(_row('people', 'person', instance.get('confidence'), instance.get('bounding_box')))
+
+    for line in (analysis.get('text_analysis') or {}).get('lines', []):
+        rows.append(_row('text', line.get('text'), line.get('confidence'), line.get('bounding_box')))
+
+    for obj in (analysis.get('uniform_analysis') or {}).get('uniform_objects', []):
+        rows.append(_row('uniform', obj.get('class'), obj.get('confidence'), obj.get('bounding_box')))
+
+    menu_text = ((analysis.get('menu_board_analysis') or {}).get('detected_text') or {}).get('text_detections', [])
+    for detection in menu_text:
+        rows.append(_row('menu_text', detection.get('text'), detection.get('confidence'), detection.get('bounding_box')))
+
+    return rows
+
+
+def frame_analysis_from_detections(rows, analyzer=None):
+    """Rebuild a frame analysis from its detection rows
+
+    Args:
+        rows: dicts or Detection instances of one frame (type, label,
+            confidence and bbox or bbox_json)
+        analyzer: VideoAnalyzer used for the overall score; defaults to a
+            detector-free VideoAnalyzer.for_scoring()
+    """
+    analysis = {
+        'ppe_analysis': {
+            'persons': [],
+            'summary': {'total_persons': 0, **{key: 0 for key in PPE_EQUIPMENT.values()}},
+        },
+        **{f'{object_type}_analysis': [] for object_type in OBJECT_TYPES},
+        'people_analysis': {'people_count': 0, 'people_instances': [], 'detected': False},
+        'text_analysis': {'lines': [], 'all_text': ''},
+        'rekognition_available': True,
+    }
+    uniform_objects = []
+    menu_text = []
+
+    for row in rows:
+        if isinstance(row, dict):
+            row_type, label, confidence, bbox = row['type'], row['label'], row['confidence'], row.get('bbox')
+        else:
+            row_type, label, confidence, bbox = row.type, row.label, row.confidence, row.bbox_json
+
+        if row_type == 'frame':
+            analysis['rekognition_available'] = label != REKOGNITION_UNAVAILABLE
+        elif row_type == 'ppe':
+            summary = analysis['ppe_analysis']['summary']
+            if label == 'person':
+                analysis['ppe_analysis']['persons'].append({'confidence': confidence, 'bounding_box': bbox})
+                summary['total_persons'] += 1
+            elif label in PPE_EQUIPMENT:
+                summary[PPE_EQUIPMENT[label]] += 1
+        elif row_type in OBJECT_TYPES:
+            analysis[f'{row_type}_analysis'].append({'name': label, 'confidence': confidence, 'bounding_box': bbox})
+        elif row_type == 'people':
+            analysis['people_analysis']['people_instances'].append({'confidence': confidence, 'bounding_box': bbox})
+        elif row_type == 'text':
+            analysis['text_analysis']['lines'].append({'text': label, 'confidence': confidence, 'bounding_box': bbox})
+        elif row_type == 'uniform':
+            uniform_objects.append({
+                'class': label,
+                'confidence': confidence,
+                'bounding_box': bbox,
+                'compliance_status': YOLODetector._check_uniform_compliance(label),
+            })
+        elif row_type == 'menu_text':
+            menu_text.append((bbox_points(bbox), label, confidence))
+
+    people = analysis['people_analysis']
+    people['people_count'] = len(people['people_instances'])
+    people['detected'] = people['people_count'] > 0
+    analysis['text_analysis']['all_text'] = ' '.join(line['text'] for line in analysis['text_analysis']['lines'])
+    analysis['uniform_analysis'] = {
+        'uniform_objects': uniform_objects,
+        'compliance_score': YOLODetector._calculate_uniform_score(uniform_objects),
+    }
+    analysis['menu_board_analysis'] = OCRService._analyze_menu_compliance(
+        OCRService._process_ocr_results(menu_text)
+    )
+
+    analysis['overall_score'] = (analyzer or VideoAnalyzer.for_scoring())._calculate_overall_score(analysis)
+    return analysis
+
+
+def bbox_points(bbox):
+    """EasyOCR style corner points of an x1/y1/x2/y2 box"""
+    bbox = bbox or {}
+    x1, y1, x2, y2 = bbox.get('x1', 0), bbox.get('y1', 0), bbox.get('x2', 0), bbox.get('y2', 0)
+    return [[x1, y1], [x2, y1], [x2, y2], [x1, y2]]
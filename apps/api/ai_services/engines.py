@@ -0,0 +1,112 @@
+"""
+Versioned detector engines of a frame analysis.
+
+A frame analysis is assembled from several detector engines. Each analysis
+records under 'engines' the fingerprint (version, whether the engine really
+ran, and a hash of the settings its output depends on) of every engine whose
+output it holds. Analyzing the frame again only re-runs the engines whose
+fingerprint changed and reuses the output of the others, so e.g. enabling
+YOLO runs YOLO alone over frames that were already analyzed.
+
+Bump an engine's version whenever its output for the same frame changes
+(new model, different post-processing).
+"""
+import hashlib
+import json
+
+from django.conf import settings
+
+ENGINES = {
+    'rekognition_ppe': {
+        'version': 'v1',
+        'settings': ['REKOGNITION_PPE_MIN_CONFIDENCE'],
+    },
+    'rekognition_labels': {
+        'version': 'v2',
+        'settings': [
+            'REKOGNITION_OBJECTS_MIN_CONFIDENCE', 'REKOGNITION_MAX_LABELS',
+            'REKOGNITION_LABEL_MOSAIC', 'REKOGNITION_MOSAIC_TILE_SIZE',
+        ],
+    },
+    'rekognition_text': {
+        'version': 'v1',
+        'settings': ['REKOGNITION_TEXT_MIN_CONFIDENCE'],
+    },
+    'yolo': {
+        'version': 'v8n',
+        'settings': [],
+    },
+    'ocr': {
+        'version': 'v1',
+        'settings': ['OCR_REGION_GATING', 'OCR_REGION_PADDING'],
+        # Menu board OCR only reads the text regions Rekognition found
+        'depends_on': ['rekognition_text'],
+    },
+}
+
+REKOGNITION_ENGINES = {'rekognition_ppe', 'rekognition_labels', 'rekognition_text'}
+
+# Analysis keys holding each engine's output. YOLO objects share the safety
+# and cleanliness lists with Rekognition's and are told apart by their source.
+LABEL_OBJECT_KEYS = [
+    'safety_analysis', 'cleanliness_analysis', 'food_safety_analysis', 'equipment_analysis',
+    'operational_analysis', 'food_quality_analysis', 'staff_behavior_analysis',
+]
+YOLO_OBJECT_KEYS = ['safety_analysis', 'cleanliness_analysis']
+ENGINE_KEYS = {
+    'rekognition_ppe': ['ppe_analysis'],
+    'rekognition_labels': ['people_analysis'],
+    'rekognition_text': ['text_analysis'],
+    'yolo': ['uniform_analysis'],
+    'ocr': ['menu_board_analysis'],
+}
+
+
+def engine_fingerprint(name, active=True):
+    """Fingerprint of an engine under the current settings
+
+    Args:
+        active: False when the engine is configured off or unavailable and
+            produced placeholder output
+    """
+    engine = ENGINES[name]
+    config = json.dumps({setting: getattr(settings, setting) for setting in engine['settings']}, sort_keys=True)
+    return {
+        'version': engine['version'],
+        'active': active,
+        'config': hashlib.sha1(config.encode()).hexdigest()[:12],
+    }
+
+
+def stale_engines(analysis, fingerprints):
+    """Engines that have to run again for an earlier analysis of a frame
+
+    Args:
+        analysis: Earlier analyze_frame result, or None
+        fingerprints: Current fingerprint per engine name
+
+    Returns:
+        set: Engine names; every engine for missing, failed or legacy
+            analyses without engine fingerprints
+    """
+    if not analysis or 'error' in analysis or 'engines' not in analysis:
+        return set(ENGINES)
+
+    recorded = analysis['engines']
+    stale = {name for name, fingerprint in fingerprints.items() if recorded.get(name) != fingerprint}
+    for name, engine in ENGINES.items():
+        if stale.intersection(engine.get('depends_on', [])):
+            stale.add(name)
+    return stale
+
+
+def reuse_engine_output(results, analysis, name):
+    """Copy an engine's output from an earlier analysis into results"""
+    for key in ENGINE_KEYS[name]:
+        results[key] = analysis.get(key) or {}
+    if name == 'rekognition_labels':
+        for key in LABEL_OBJECT_KEYS:
+            results[key] = [obj for obj in analysis.get(key) or [] if obj.get('source') != 'yolo'] + results[key]
+    elif name == 'yolo':
+        for key in YOLO_OBJECT_KEYS:
+            results[key] = results[key] + [obj for obj in analysis.get(key) or [] if obj.get('source') == 'yolo']
@@ -0,0 +1,95 @@
+"""
+Decode-once frame shared by every detector.
+
+Rekognition wants encoded JPEG bytes, while YOLO, EasyOCR and the label
+mosaic want pixels. A Frame holds the encoded bytes, the decoded RGB image and
+any downscaled variants, each produced lazily on first use and then reused, so
+a frame is read and decoded at most once however many detectors look at it.
+"""
+import io
+
+from PIL import Image
+
+
+class Frame:
+    """One video frame as bytes, decoded pixels and cached derivatives
+
+    Args:
+        path: Local file the frame can be read from
+        data: Encoded image bytes (JPEG/PNG)
+        image: Already decoded PIL image
+        s3_image: Rekognition S3 reference (RekognitionService.s3_image)
+            used instead of the bytes when set
+    """
+
+    def __init__(self, path=None, data=None, image=None, s3_image=None):
+        self.path = path
+        self.s3_image = s3_image
+        self._data = data
+        self._image = image.convert('RGB') if image is not None else None
+        self._array = None
+        self._downscaled = {}
+        self._memo = {}
+
+    @classmethod
+    def coerce(cls, frame, data=None, s3_image=None):
+        """A Frame for detectors that accept either a Frame or a file path"""
+        if isinstance(frame, cls):
+            return frame
+        return cls(path=frame, data=data, s3_image=s3_image)
+
+    @property
+    def data(self):
+        """Encoded bytes, read from the file on first use"""
+        if self._data is None and self.path:
+            with open(self.path, 'rb') as f:
+                self._data = f.read()
+        return self._data
+
+    @property
+    def rekognition_image(self):
+        """Bytes when the frame is already in memory, else the S3 reference, else the file's bytes"""
+        if self._data is not None:
+            return self._data
+        if self.s3_image is not None:
+            return self.s3_image
+        return self.data
+
+    @property
+    def image(self):
+        """Decoded RGB PIL image"""
+        if self._image is None:
+            with Image.open(io.BytesIO(self.data)) as img:
+                self._image = img.convert('RGB')
+        return self._image
+
+    @property
+    def size(self):
+        return self.image.size
+
+    def array(self):
+        """Decoded RGB pixels as a (height, width, 3) uint8 ndarray"""
+        if self._array is None:
+            import numpy as np
+            self._array = np.asarray(self.image)
+        return self._array
+
+    def downscaled(self, max_dimension):
+        """RGB image scaled down so neither side exceeds max_dimension, cached per size"""
+        if max(self.size) <= max_dimension:
+            return self.image
+        if max_dimension not in self._downscaled:
+            image = self.image.copy()
+            image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+            self._downscaled[max_dimension] = image
+        return self._downscaled[max_dimension]
+
+    def memo(self, key, compute):
+        """Result of compute() for this frame, computed once per key
+
+        Lets detectors that share a model (e.g. YOLO objects and uniforms)
+        run inference once per frame.
+        """
+        if key not in self._memo:
+            self._memo[key] = compute()
+        return self._memo[key]
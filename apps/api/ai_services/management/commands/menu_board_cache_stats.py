@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from ai_services.menu_board_cache import MenuBoardCache
+from brands.models import Store
+
+
+class Command(BaseCommand):
+    help = 'Show menu board cache hits, misses and hit rate per store'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--store', type=int, action='append', help='Store id (repeatable); default all active stores')
+
+    def handle(self, *args, **options):
+        stores = Store.objects.filter(is_active=True)
+        if options['store']:
+            stores = Store.objects.filter(id__in=options['store'])
+
+        total_hits = total_misses = 0
+        self.stdout.write(f"{'store':40} {'hits':>8} {'misses':>8} {'hit rate':>9}")
+        for store in stores.order_by('id'):
+            stats = MenuBoardCache(store.id).stats()
+            if not stats['hits'] and not stats['misses']:
+                continue
+            total_hits += stats['hits']
+            total_misses += stats['misses']
+            self.stdout.write(
+                f"{str(store)[:40]:40} {stats['hits']:8d} {stats['misses']:8d} {stats['hit_rate']:9.1%}"
+            )
+
+        lookups = total_hits + total_misses
+        if not lookups:
+            self.stdout.write(self.style.WARNING('No menu board cache lookups recorded'))
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f'\nTotal: {total_hits} hits, {total_misses} misses, hit rate {total_hits / lookups:.1%}'
+        ))
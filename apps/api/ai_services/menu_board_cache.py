@@ -0,0 +1,107 @@
+"""
+Per-store cache of menu board compliance results.
+
+Menu boards rarely change, so re-reading them on every inspection is wasted
+OCR. The board region (the union of the text regions Rekognition found) is
+reduced to a perceptual hash; when a store has a cached result for a board
+within MENU_BOARD_CACHE_MAX_DISTANCE hash bits that is younger than
+MENU_BOARD_CACHE_MAX_AGE_HOURS, that result is reused and OCR is skipped.
+
+Entries live in Redis next to the pipeline locks and, like them, fail open:
+without Redis every board is simply read again.
+"""
+import json
+import logging
+import time
+
+import redis
+from django.conf import settings
+
+from core.locks import get_redis_client
+from videos.sampling import dhash, hamming_distance
+
+logger = logging.getLogger(__name__)
+
+
+def board_region(regions):
+    """Bounding box of all text regions of a frame, or None"""
+    if not regions:
+        return None
+    return (
+        min(region[0] for region in regions),
+        min(region[1] for region in regions),
+        max(region[2] for region in regions),
+        max(region[3] for region in regions),
+    )
+
+
+def board_hash(image, regions):
+    """Perceptual hash of the menu board region of a frame, or None without text"""
+    region = board_region(regions)
+    if region is None:
+        return None
+    return dhash(image.crop(region))
+
+
+class MenuBoardCache:
+    """Menu board results of one store, keyed by board hash"""
+
+    def __init__(self, store_id):
+        self.store_id = store_id
+        self.key = f"menu_board_cache:{store_id}"
+        self.stats_key = f"menu_board_cache:stats:{store_id}"
+
+    def _entries(self, client):
+        return [json.loads(entry) for entry in client.lrange(self.key, 0, -1)]
+
+    def lookup(self, board_hash):
+        """Cached compliance result for a board, or None; counts the hit or miss"""
+        try:
+            client = get_redis_client()
+            now = time.time()
+            max_age = settings.MENU_BOARD_CACHE_MAX_AGE_HOURS * 3600
+            matches = [
+                entry for entry in self._entries(client)
+                if now - entry['cached_at'] <= max_age
+                and hamming_distance(entry['hash'], board_hash) <= settings.MENU_BOARD_CACHE_MAX_DISTANCE
+            ]
+            client.hincrby(self.stats_key, 'hits' if matches else 'misses', 1)
+        except redis.RedisError as e:
+            logger.warning(f"Redis unavailable, skipping menu board cache for store {self.store_id}: {e}")
+            return None
+
+        if not matches:
+            return None
+        return min(matches, key=lambda entry: hamming_distance(entry['hash'], board_hash))['result']
+
+    def store(self, board_hash, result):
+        """Remember the result for a board, replacing entries for the same board"""
+        try:
+            client = get_redis_client()
+            entries = [
+                entry for entry in self._entries(client)
+                if hamming_distance(entry['hash'], board_hash) > settings.MENU_BOARD_CACHE_MAX_DISTANCE
+            ]
+            entries.insert(0, {'hash': board_hash, 'result': result, 'cached_at': time.time()})
+
+            pipe = client.pipeline()
+            pipe.delete(self.key)
+            pipe.rpush(self.key, *[json.dumps(entry) for entry in entries[:settings.MENU_BOARD_CACHE_MAX_ENTRIES]])
+            pipe.expire(self.key, int(settings.MENU_BOARD_CACHE_MAX_AGE_HOURS * 3600))
+            pipe.execute()
+        except redis.RedisError as e:
+            logger.warning(f"Redis unavailable, could not cache menu board for store {self.store_id}: {e}")
+
+    def stats(self):
+        """Hit and miss counts of the store's cache"""
+        try:
+            counts = get_redis_client().hgetall(self.stats_key)
+        except redis.RedisError:
+            counts = {}
+        hits, misses = int(counts.get('hits', 0)), int(counts.get('misses', 0))
+        lookups = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / lookups, 3) if lookups else None,
+        }
@@ -0,0 +1,138 @@
+"""
+Frame mosaics for Rekognition label detection.
+
+detect_labels is billed per call, not per pixel, so up to four downscaled
+frames are tiled into a 2x2 mosaic and sent in one request. Instance bounding
+boxes in the response are mapped back to the tile they fall in and rescaled
+to that frame's own coordinates. Labels without instances are mapped to the
+frames holding a located label they are a parent of (e.g. Food above a
+located Pizza); others cannot be mapped to a frame.
+"""
+import io
+import math
+
+from PIL import Image
+
+MOSAIC_COLUMNS = 2
+MOSAIC_TILES = 4
+
+
+def build_mosaic(images, tile_size):
+    """Tile up to MOSAIC_TILES images into one JPEG
+
+    Args:
+        images: Encoded image bytes or PIL images, one per frame
+        tile_size: Maximum width and height of each tile in pixels
+
+    Returns:
+        tuple: (mosaic JPEG bytes, list of (left, top, width, height) tile
+            rectangles in mosaic pixels in input order, (width, height) of
+            the mosaic)
+    """
+    if not 0 < len(images) <= MOSAIC_TILES:
+        raise ValueError(f"A mosaic holds 1 to {MOSAIC_TILES} frames, got {len(images)}")
+
+    columns = min(len(images), MOSAIC_COLUMNS)
+    rows = math.ceil(len(images) / MOSAIC_COLUMNS)
+    mosaic = Image.new('RGB', (columns * tile_size, rows * tile_size))
+
+    tiles = []
+    for index, image in enumerate(images):
+        if isinstance(image, Image.Image):
+            # convert() copies, so shared frame images are never resized in place
+            tile = image.convert('RGB')
+        else:
+            with Image.open(io.BytesIO(image)) as img:
+                tile = img.convert('RGB')
+        tile.thumbnail((tile_size, tile_size), Image.LANCZOS)
+
+        left = (index % MOSAIC_COLUMNS) * tile_size
+        top = (index // MOSAIC_COLUMNS) * tile_size
+        mosaic.paste(tile, (left, top))
+        tiles.append((left, top, tile.width, tile.height))
+
+    buffer = io.BytesIO()
+    mosaic.save(buffer, 'JPEG', quality=90)
+    return buffer.getvalue(), tiles, mosaic.size
+
+
+def map_box_to_tile(box, tiles, mosaic_size):
+    """Find the tile a mosaic bounding box belongs to and rescale it to that frame
+
+    Args:
+        box: Rekognition BoundingBox normalized to the mosaic
+        tiles: Tile rectangles from build_mosaic
+        mosaic_size: (width, height) of the mosaic
+
+    Returns:
+        tuple: (tile index, BoundingBox normalized to the frame), or
+            (None, None) if the box is centered outside every tile
+    """
+    mosaic_width, mosaic_height = mosaic_size
+    left = box.get('Left', 0) * mosaic_width
+    top = box.get('Top', 0) * mosaic_height
+    right = left + box.get('Width', 0) * mosaic_width
+    bottom = top + box.get('Height', 0) * mosaic_height
+    center_x, center_y = (left + right) / 2, (top + bottom) / 2
+
+    for index, (tile_left, tile_top, tile_width, tile_height) in enumerate(tiles):
+        if not (tile_left <= center_x < tile_left + tile_width and tile_top <= center_y < tile_top + tile_height):
+            continue
+
+        # Clip to the tile so boxes never spill into a neighbouring frame
+        clipped_left = max(left, tile_left)
+        clipped_top = max(top, tile_top)
+        clipped_right = min(right, tile_left + tile_width)
+        clipped_bottom = min(bottom, tile_top + tile_height)
+        return index, {
+            'Left': (clipped_left - tile_left) / tile_width,
+            'Top': (clipped_top - tile_top) / tile_height,
+            'Width': (clipped_right - clipped_left) / tile_width,
+            'Height': (clipped_bottom - clipped_top) / tile_height,
+        }
+
+    return None, None
+
+
+def split_mosaic_labels(labels, tiles, mosaic_size):
+    """Split a mosaic detect_labels response into one label list per frame
+
+    Labels with instances go to the frames their instances fall in, with the
+    boxes in frame coordinates. An image-level label without instances goes
+    to the frames where a located label names it among its Parents; one
+    without such evidence cannot be localized and is returned separately.
+
+    Returns:
+        tuple: (label list per frame, labels without instances)
+    """
+    per_frame = [[] for _ in tiles]
+    image_level = []
+
+    for label in labels:
+        instances = label.get('Instances', [])
+        if not instances:
+            image_level.append(label)
+            continue
+
+        by_tile = {}
+        for instance in instances:
+            index, box = map_box_to_tile(instance.get('BoundingBox', {}), tiles, mosaic_size)
+            if index is not None:
+                by_tile.setdefault(index, []).append({**instance, 'BoundingBox': box})
+
+        for index, tile_instances in by_tile.items():
+            per_frame[index].append({**label, 'Instances': tile_instances})
+
+    parents = [
+        {parent.get('Name') for located in frame_labels for parent in located.get('Parents', [])}
+        for frame_labels in per_frame
+    ]
+    unlocated = []
+    for label in image_level:
+        indexes = [index for index, names in enumerate(parents) if label.get('Name') in names]
+        for index in indexes:
+            per_frame[index].append(label)
+        if not indexes:
+            unlocated.append(label)
+
+    return per_frame, unlocated
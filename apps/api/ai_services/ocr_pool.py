@@ -0,0 +1,145 @@
+"""
+Dedicated process pool for EasyOCR.
+
+readtext is CPU-bound and holds the GIL for long stretches, so running it in
+the Celery worker stalls the rest of frame analysis. The pool keeps one warm
+easyocr.Reader per process. Frames go to the workers as raw RGB pixels in
+multiprocessing.shared_memory blocks instead of file paths, so workers neither
+re-read nor re-decode the JPEG, and a batch of frames is read with a single
+readtext_batched call when the frames share a size.
+"""
+import atexit
+import importlib.util
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+from django.conf import settings
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+_pool = None
+_pool_broken = False
+
+# Reader of the current pool worker process
+_reader = None
+
+
+def _init_worker(languages):
+    global _reader
+    import easyocr
+    _reader = easyocr.Reader(languages)
+
+
+def _read_batch(frames):
+    """Pool worker: run readtext over frames described as (shm name, (height, width, 3))
+
+    Returns:
+        list: EasyOCR (bbox, text, confidence) results per frame, with plain
+            Python numbers so they pickle cheaply
+    """
+    import numpy as np
+
+    images = []
+    for name, shape in frames:
+        # Pool workers share the parent's resource tracker, so attaching does
+        # not make the worker responsible for unlinking the block
+        shm = shared_memory.SharedMemory(name=name)
+        try:
+            images.append(np.ndarray(shape, dtype=np.uint8, buffer=shm.buf).copy())
+        finally:
+            shm.close()
+
+    if len(images) > 1 and len({image.shape for image in images}) == 1:
+        height, width = images[0].shape[:2]
+        batches = _reader.readtext_batched(images, n_width=width, n_height=height)
+    else:
+        batches = [_reader.readtext(image) for image in images]
+
+    return [
+        [([[float(x), float(y)] for x, y in bbox], text, float(confidence)) for bbox, text, confidence in results]
+        for results in batches
+    ]
+
+
+class OCRPool:
+    """Process pool of warm EasyOCR readers fed through shared memory"""
+
+    def __init__(self, processes, languages=('en',)):
+        self.executor = ProcessPoolExecutor(
+            max_workers=processes,
+            # Spawned workers do not inherit the Celery worker's threads and connections
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(list(languages),),
+        )
+
+    def submit(self, images):
+        """Queue OCR of a batch of images
+
+        Args:
+            images: Image file paths or PIL images (e.g. text region crops)
+
+        Returns:
+            Future: resolves to a list of EasyOCR results, one per image
+        """
+        blocks = []
+        try:
+            frames = []
+            for image in images:
+                if isinstance(image, Image.Image):
+                    pixels = image.convert('RGB')
+                else:
+                    with Image.open(image) as img:
+                        pixels = img.convert('RGB')
+                data = pixels.tobytes()
+                shm = shared_memory.SharedMemory(create=True, size=len(data))
+                blocks.append(shm)
+                shm.buf[:len(data)] = data
+                frames.append((shm.name, (pixels.height, pixels.width, 3)))
+
+            future = self.executor.submit(_read_batch, frames)
+        except Exception:
+            _release(blocks)
+            raise
+
+        future.add_done_callback(lambda _: _release(blocks))
+        return future
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _release(blocks):
+    for shm in blocks:
+        shm.close()
+        shm.unlink()
+
+
+def get_ocr_pool():
+    """Shared OCR pool of this process, or None when OCR runs in-process
+
+    The pool is disabled with OCR_POOL_PROCESSES=0, when EasyOCR is not
+    installed, and after it fails to start (e.g. when the worker's processes
+    are not allowed to have children).
+    """
+    global _pool
+    if _pool is None and not _pool_broken and settings.OCR_POOL_PROCESSES > 0:
+        if importlib.util.find_spec('easyocr') is None:
+            return None
+        _pool = OCRPool(settings.OCR_POOL_PROCESSES)
+        atexit.register(_pool.shutdown)
+        logger.info(f"Started OCR pool with {settings.OCR_POOL_PROCESSES} processes")
+    return _pool
+
+
+def disable_ocr_pool(reason):
+    """Stop using the pool for the rest of this process's life"""
+    global _pool, _pool_broken
+    logger.warning(f"OCR pool unavailable, running OCR in-process: {reason}")
+    _pool_broken = True
+    if _pool is not None:
+        _pool.shutdown()
+        _pool = None
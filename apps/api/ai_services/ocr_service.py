@@ -1,40 +1,248 @@
+from concurrent.futures.process import BrokenProcessPool
+
 from django.conf import settings
 import logging
 
+from .frame import Frame
+from .menu_board_cache import MenuBoardCache, board_hash
+from .ocr_pool import disable_ocr_pool, get_ocr_pool
+
 logger = logging.getLogger(__name__)
 
 
+def text_regions(lines, image_size, padding=None):
+    """Pixel regions of a frame worth reading with EasyOCR
+
+    Rekognition LINE boxes (normalized) are padded by a fraction of their
+    height on every side, so clipped glyphs are read whole, and overlapping
+    boxes are merged so a menu board becomes one crop rather than dozens.
+
+    Returns:
+        list: (left, top, right, bottom) integer boxes clipped to the image
+    """
+    if padding is None:
+        padding = settings.OCR_REGION_PADDING
+    width, height = image_size
+
+    boxes = []
+    for line in lines:
+        box = line.get('bounding_box') or {}
+        if not box:
+            continue
+        left, top = box.get('Left', 0) * width, box.get('Top', 0) * height
+        right, bottom = left + box.get('Width', 0) * width, top + box.get('Height', 0) * height
+        pad = max((bottom - top) * padding, 2)
+        boxes.append([max(0, left - pad), max(0, top - pad), min(width, right + pad), min(height, bottom + pad)])
+
+    merged = True
+    while merged:
+        merged = False
+        for i in range(len(boxes)):
+            for j in range(i + 1, len(boxes)):
+                a, b = boxes[i], boxes[j]
+                if a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]:
+                    boxes[i] = [min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3])]
+                    del boxes[j]
+                    merged = True
+                    break
+            if merged:
+                break
+
+    return [
+        (int(left), int(top), int(round(right)), int(round(bottom)))
+        for left, top, right, bottom in boxes
+        if right - left >= 1 and bottom - top >= 1
+    ]
+
+
 class OCRService:
-    def __init__(self):
+    def __init__(self, store_id=None):
         self.reader = None
+        self.pool = None
+        self.menu_board_cache = None
+        if store_id and settings.MENU_BOARD_CACHE_ENABLED:
+            self.menu_board_cache = MenuBoardCache(store_id)
         if settings.ENABLE_OCR_DETECTION:
-            try:
-                import easyocr
-                self.reader = easyocr.Reader(['en'])
-                logger.info("EasyOCR reader initialized successfully")
-            except ImportError:
-                logger.warning("EasyOCR not available, using mock OCR")
-            except Exception as e:
-                logger.error(f"Failed to initialize OCR reader: {e}")
+            self.pool = get_ocr_pool()
+            if self.pool is None:
+                self._load_reader()
 
-    def extract_text(self, image_path):
-        """Extract text from image"""
+    def _load_reader(self):
+        try:
+            import easyocr
+            self.reader = easyocr.Reader(['en'])
+            logger.info("EasyOCR reader initialized successfully")
+        except ImportError:
+            logger.warning("EasyOCR not available, using mock OCR")
+        except Exception as e:
+            logger.error(f"Failed to initialize OCR reader: {e}")
+
+    @property
+    def available(self):
+        """True when OCR runs for real, in-process or in the OCR pool"""
+        return self.reader is not None or self.pool is not None
+
+    def extract_text(self, frame):
+        """Extract text from image
+
+        Args:
+            frame: Frame, or an image file path
+        """
         if not self.reader:
             return self._mock_text_extraction()
 
         try:
-            results = self.reader.readtext(image_path)
+            results = self.reader.readtext(Frame.coerce(frame).array())
             return self._process_ocr_results(results)
         except Exception as e:
             logger.error(f"OCR extraction error: {e}")
             return self._mock_text_extraction()
 
-    def analyze_menu_board(self, image_path):
+    def analyze_menu_board(self, frame):
         """Analyze menu board compliance"""
-        text_results = self.extract_text(image_path)
-        return self._analyze_menu_compliance(text_results)
+        return self.submit_menu_boards([frame])[0]()
+
+    def submit_menu_boards(self, frames, text_analyses=None):
+        """Start menu board analysis of a batch of frames without waiting for it
+
+        With the OCR pool the frames are read in one batch by a pool process
+        while the caller carries on; otherwise they are analyzed right away.
+
+        Args:
+            frames: Frames (or frame file paths); None where there is no frame
+            text_analyses: Rekognition text results per frame (see
+                RekognitionService.detect_text), None where unknown. With
+                OCR_REGION_GATING only the line regions Rekognition found are
+                read, and frames without any text line skip EasyOCR. Boards
+                found in the store's menu board cache are not read at all.
+
+        Returns:
+            list: One zero-argument callable per frame returning its
+                analyze_menu_board() result
+        """
+        if not self.available:
+            results = [self._analyze_menu_compliance(self._mock_text_extraction()) for _ in frames]
+            return [lambda result=result: result for result in results]
+
+        jobs = [
+            self._ocr_job(frame, text_analysis)
+            for frame, text_analysis in zip(frames, text_analyses or [None] * len(frames))
+        ]
+        images = [image for job in jobs for image, _ in job['inputs']]
+
+        if self.pool is not None and images:
+            try:
+                # The pool gets pixels; whole frames hand over their decoded image
+                batch = self.pool.submit([image.image if isinstance(image, Frame) else image for image in images])
+            except OSError as e:
+                logger.error(f"OCR frame decoding error: {e}")
+                batch = None
+            except Exception as e:
+                self._fall_back_from_pool(e)
+                batch = None
+
+            if batch is not None:
+                collected = []
+
+                def collect():
+                    if not collected:
+                        collected.append(self._collect_menu_boards(batch, jobs, images))
+                    return collected[0]
+
+                return [lambda index=index: collect()[index] for index in range(len(jobs))]
+
+        results = self._menu_boards_from_ocr(jobs, [self._readtext(image) for image in images])
+        return [lambda result=result: result for result in results]
+
+    def _ocr_job(self, frame, text_analysis):
+        """What EasyOCR has to read for one frame
+
+        Returns:
+            dict: 'inputs' as (Frame or cropped PIL image, (x, y) offset of
+                the image in the frame) pairs, empty when there is nothing
+                to read; 'board_hash' of the menu board region when known;
+                'cached' result from the menu board cache on a hit
+        """
+        job = {'inputs': [], 'board_hash': None, 'cached': None}
+        if not frame:
+            return job
+        frame = Frame.coerce(frame)
+        if not settings.OCR_REGION_GATING or text_analysis is None:
+            job['inputs'] = [(frame, (0, 0))]
+            return job
+
+        try:
+            regions = text_regions(text_analysis.get('lines', []), frame.size)
+        except Exception as e:
+            logger.error(f"OCR region extraction error: {e}")
+            return job
+        if not regions:
+            return job
+
+        if self.menu_board_cache is not None:
+            job['board_hash'] = board_hash(frame.image, regions)
+            job['cached'] = self.menu_board_cache.lookup(job['board_hash'])
+            if job['cached'] is not None:
+                return job
+
+        job['inputs'] = [(frame.image.crop(region), region[:2]) for region in regions]
+        return job
+
+    def _readtext(self, image):
+        """Raw EasyOCR results for a Frame or PIL image, read in-process"""
+        if not self.reader:
+            return []
+
+        try:
+            if isinstance(image, Frame):
+                return self.reader.readtext(image.array())
+            import numpy as np
+            return self.reader.readtext(np.asarray(image))
+        except Exception as e:
+            logger.error(f"OCR extraction error: {e}")
+            return []
+
+    def _collect_menu_boards(self, batch, jobs, images):
+        try:
+            raw_results = batch.result(timeout=settings.OCR_POOL_TIMEOUT_SECONDS)
+        except BrokenProcessPool as e:
+            self._fall_back_from_pool(e)
+            raw_results = [self._readtext(image) for image in images]
+        except Exception as e:
+            logger.error(f"OCR extraction error: {e}")
+            raw_results = [[] for _ in images]
+
+        return self._menu_boards_from_ocr(jobs, raw_results)
+
+    def _menu_boards_from_ocr(self, jobs, raw_results):
+        """Menu board analyses per frame from raw results of every job image, in order"""
+        analyses = []
+        remaining = iter(raw_results)
+        for job in jobs:
+            if job['cached'] is not None:
+                analyses.append({**job['cached'], 'cache_hit': True})
+                continue
+
+            frame_results = []
+            for (_, (dx, dy)), results in zip(job['inputs'], remaining):
+                # Region crops report boxes relative to the crop
+                frame_results.extend(
+                    ([[x + dx, y + dy] for x, y in bbox], text, confidence)
+                    for bbox, text, confidence in results
+                )
+            analysis = self._analyze_menu_compliance(self._process_ocr_results(frame_results))
+            if job['board_hash'] is not None:
+                self.menu_board_cache.store(job['board_hash'], analysis)
+            analyses.append(analysis)
+        return analyses
+
+    def _fall_back_from_pool(self, reason):
+        disable_ocr_pool(reason)
+        self.pool = None
+        self._load_reader()
 
-    def _process_ocr_results(self, results):
+    @staticmethod
+    def _process_ocr_results(results):
         """Process EasyOCR results"""
         text_detections = []
         
@@ -63,7 +271,8 @@ class OCRService:
             'all_text': ' '.join([det['text'] for det in text_detections])
         }
 
-    def _analyze_menu_compliance(self, text_results):
+    @classmethod
+    def _analyze_menu_compliance(cls, text_results):
         """Analyze menu board for compliance issues"""
         all_text = text_results.get('all_text', '').lower()
         text_detections = text_results.get('text_detections', [])
@@ -90,7 +299,7 @@ class OCRService:
                 compliance_score -= 20
         
         # Check for readability issues
-        readability_issues = self._check_readability(text_detections)
+        readability_issues = cls._check_readability(text_detections)
         compliance_issues.extend(readability_issues)
         compliance_score -= len(readability_issues) * 10
         
@@ -114,7 +323,8 @@ class OCRService:
             }
         }
 
-    def _check_readability(self, text_detections):
+    @staticmethod
+    def _check_readability(text_detections):
         """Check for text readability issues"""
         issues = []
         
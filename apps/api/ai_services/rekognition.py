@@ -3,8 +3,55 @@ from django.conf import settings
 from botocore.exceptions import ClientError, BotoCoreError
 import logging
 
+from .mosaic import build_mosaic, split_mosaic_labels
+
 logger = logging.getLogger(__name__)
 
+# detect_people thresholds; the label mosaic applies the same ones to people
+PEOPLE_MAX_LABELS = 50
+PEOPLE_MIN_CONFIDENCE = 70
+
+# Expanded keyword lists for comprehensive detection, per object category
+OBJECT_CATEGORY_KEYWORDS = {
+    'safety': ['fire', 'exit', 'sign', 'door', 'emergency', 'extinguisher', 'blocked', 'obstruction'],
+    'cleanliness': ['trash', 'garbage', 'spill', 'dirt', 'mess', 'clean', 'floor', 'surface'],
+    'food_safety': ['thermometer', 'temperature', 'glove', 'cutting board', 'container', 'cover',
+                    'raw', 'cooked', 'handwash', 'sink', 'soap', 'sanitizer'],
+    'equipment': ['rust', 'damage', 'wear', 'grease', 'leak', 'water', 'moisture', 'drip',
+                  'hood', 'filter', 'equipment', 'broken', 'crack'],
+    'operational': ['crowd', 'queue', 'line', 'sign', 'label', 'warning', 'notice', 'poster'],
+    'food_quality': ['plate', 'food', 'garnish', 'steam', 'presentation', 'plating'],
+    'staff_behavior': ['jewelry', 'watch', 'ring', 'bracelet', 'phone', 'mobile', 'cell',
+                       'eating', 'drinking', 'beverage', 'cup', 'bottle'],
+}
+
+
+def label_categories(name):
+    """Object categories a Rekognition label name falls into"""
+    name = name.lower()
+    return [
+        category for category, keywords in OBJECT_CATEGORY_KEYWORDS.items()
+        if any(keyword in name for keyword in keywords)
+    ]
+
+
+def label_affects_scoring(label):
+    """True when a label alone yields a finding or changes a frame's score
+
+    Such a label has to be attributed to the right frame; any other label
+    only adds to a frame's object lists.
+    """
+    from .analyzer import VideoAnalyzer
+
+    scorer = VideoAnalyzer.for_scoring()
+    label_data = {'name': label.get('Name', ''), 'confidence': label.get('Confidence', 0), 'instances': []}
+    baseline = scorer._calculate_overall_score({'rekognition_available': True})
+    for category in label_categories(label.get('Name', '')):
+        analysis = {'rekognition_available': True, f'{category}_analysis': [label_data]}
+        if scorer.generate_findings(analysis, None) or scorer._calculate_overall_score(analysis) != baseline:
+            return True
+    return False
+
 
 class RekognitionService:
     def __init__(self):
@@ -30,11 +77,27 @@ class RekognitionService:
             logger.error(f"Failed to initialize Rekognition client: {e}")
             raise
 
-    def detect_ppe(self, image_bytes):
+    @staticmethod
+    def s3_image(key, bucket=None):
+        """Reference to an image stored in S3, usable wherever image bytes are
+
+        Rekognition reads the object directly, so the bytes never pass through
+        the worker. The bucket must be in the Rekognition client's region.
+        """
+        return {'S3Object': {'Bucket': bucket or settings.AWS_STORAGE_BUCKET_NAME, 'Name': key}}
+
+    @staticmethod
+    def image_param(image):
+        """Rekognition Image parameter for raw bytes or an s3_image() reference"""
+        if isinstance(image, dict):
+            return image
+        return {'Bytes': image}
+
+    def detect_ppe(self, image):
         """Detect Personal Protective Equipment in image
 
         Args:
-            image_bytes: Image data as bytes
+            image: Image data as bytes, or an S3 reference from s3_image()
 
         Returns:
             dict: PPE detection results with persons and summary
@@ -53,7 +116,7 @@ class RekognitionService:
         try:
             min_confidence = getattr(settings, 'REKOGNITION_PPE_MIN_CONFIDENCE', 80)
             response = self.client.detect_protective_equipment(
-                Image={'Bytes': image_bytes},
+                Image=self.image_param(image),
                 SummarizationAttributes={
                     'MinConfidence': min_confidence,
                     'RequiredEquipmentTypes': ['FACE_COVER', 'HAND_COVER', 'HEAD_COVER']
@@ -64,11 +127,11 @@ class RekognitionService:
             logger.error(f"Rekognition PPE detection error: {e}")
             raise
 
-    def detect_objects(self, image_bytes):
+    def detect_objects(self, image):
         """Detect general objects in image
 
         Args:
-            image_bytes: Image data as bytes
+            image: Image data as bytes, or an S3 reference from s3_image()
 
         Returns:
             dict: Object detection results categorized by type
@@ -88,7 +151,7 @@ class RekognitionService:
             max_labels = getattr(settings, 'REKOGNITION_MAX_LABELS', 50)
             min_confidence = getattr(settings, 'REKOGNITION_OBJECTS_MIN_CONFIDENCE', 70)
             response = self.client.detect_labels(
-                Image={'Bytes': image_bytes},
+                Image=self.image_param(image),
                 MaxLabels=max_labels,
                 MinConfidence=min_confidence
             )
@@ -97,11 +160,11 @@ class RekognitionService:
             logger.error(f"Rekognition object detection error: {e}")
             raise
 
-    def detect_text(self, image_bytes):
+    def detect_text(self, image):
         """Detect text in image using AWS Rekognition Text Detection
 
         Args:
-            image_bytes: Image data as bytes
+            image: Image data as bytes, or an S3 reference from s3_image()
 
         Returns:
             dict: Text detection results with detected text and locations
@@ -118,17 +181,17 @@ class RekognitionService:
             )
 
         try:
-            response = self.client.detect_text(Image={'Bytes': image_bytes})
+            response = self.client.detect_text(Image=self.image_param(image))
             return self._process_text_response(response)
         except (ClientError, BotoCoreError) as e:
             logger.error(f"Rekognition text detection error: {e}")
             raise
 
-    def detect_people(self, image_bytes):
+    def detect_people(self, image):
         """Detect and count people in image for occupancy monitoring
 
         Args:
-            image_bytes: Image data as bytes
+            image: Image data as bytes, or an S3 reference from s3_image()
 
         Returns:
             dict: People detection results with count and locations
@@ -147,15 +210,80 @@ class RekognitionService:
         try:
             # Use detect_labels to find people
             response = self.client.detect_labels(
-                Image={'Bytes': image_bytes},
-                MaxLabels=50,
-                MinConfidence=70
+                Image=self.image_param(image),
+                MaxLabels=PEOPLE_MAX_LABELS,
+                MinConfidence=PEOPLE_MIN_CONFIDENCE
             )
             return self._process_people_response(response)
         except (ClientError, BotoCoreError) as e:
             logger.error(f"Rekognition people detection error: {e}")
             raise
 
+    def detect_labels_mosaic(self, images):
+        """Detect objects and people in up to MOSAIC_TILES frames with one call
+
+        The frames are tiled into a mosaic (see ai_services.mosaic) and
+        detect_labels runs once on it, with the objects' and the people's
+        thresholds applied to the labels afterwards. Instance boxes are mapped
+        back to the frame they belong to, so each frame gets the same result
+        shape as detect_objects and detect_people. Labels without instances
+        go to the frames of located labels they are a parent of. One that
+        cannot be attributed that way is left out if it neither yields a
+        finding nor changes a score (Floor, Food, Water, ...); otherwise the
+        frames of the mosaic get None and need their own label calls.
+
+        Args:
+            images: Image data as bytes or decoded PIL images, one per frame
+
+        Returns:
+            list: {'objects': ..., 'people': ...} or None per frame, in input order
+
+        Raises:
+            RuntimeError: If Rekognition is not enabled or credentials missing
+            ClientError: If AWS API returns an error
+            BotoCoreError: If boto3 encounters an error
+        """
+        if not self.client:
+            raise RuntimeError(
+                "AWS Rekognition is not enabled or credentials are missing. "
+                "Set ENABLE_AWS_REKOGNITION=True and configure AWS credentials."
+            )
+
+        mosaic, tiles, mosaic_size = build_mosaic(images, settings.REKOGNITION_MOSAIC_TILE_SIZE)
+        objects_min_confidence = getattr(settings, 'REKOGNITION_OBJECTS_MIN_CONFIDENCE', 70)
+
+        try:
+            # Label budget is shared by every frame in the mosaic
+            max_labels = max(getattr(settings, 'REKOGNITION_MAX_LABELS', 50), PEOPLE_MAX_LABELS) * len(images)
+            response = self.client.detect_labels(
+                Image={'Bytes': mosaic},
+                MaxLabels=max_labels,
+                MinConfidence=min(objects_min_confidence, PEOPLE_MIN_CONFIDENCE)
+            )
+        except (ClientError, BotoCoreError) as e:
+            logger.error(f"Rekognition mosaic label detection error: {e}")
+            raise
+
+        per_frame, unlocated = split_mosaic_labels(response.get('Labels', []), tiles, mosaic_size)
+        unlocated = [label for label in unlocated if label.get('Confidence', 0) >= objects_min_confidence]
+        scored = [label['Name'] for label in unlocated if label_affects_scoring(label)]
+        if scored:
+            logger.info(f"Mosaic labels {scored} have no instances, detecting labels per frame")
+            return [None] * len(images)
+        if unlocated:
+            logger.debug(f"Mosaic labels {[label['Name'] for label in unlocated]} have no instances, left out")
+
+        def above(labels, min_confidence):
+            return {'Labels': [label for label in labels if label.get('Confidence', 0) >= min_confidence]}
+
+        return [
+            {
+                'objects': self._process_object_response(above(labels, objects_min_confidence)),
+                'people': self._process_people_response(above(labels, PEOPLE_MIN_CONFIDENCE)),
+            }
+            for labels in per_frame
+        ]
+
     def _process_ppe_response(self, response):
         """Process AWS Rekognition PPE response
 
@@ -226,28 +354,8 @@ class RekognitionService:
         """Process AWS Rekognition object detection response"""
         labels = response.get('Labels', [])
 
-        safety_objects = []
-        cleanliness_objects = []
-        food_safety_objects = []
-        equipment_objects = []
-        operational_objects = []
-        food_quality_objects = []
-        staff_behavior_objects = []
-
-        # Expanded keyword lists for comprehensive detection
-        safety_keywords = ['fire', 'exit', 'sign', 'door', 'emergency', 'extinguisher', 'blocked', 'obstruction']
-        cleanliness_keywords = ['trash', 'garbage', 'spill', 'dirt', 'mess', 'clean', 'floor', 'surface']
-        food_safety_keywords = ['thermometer', 'temperature', 'glove', 'cutting board', 'container', 'cover',
-                                'raw', 'cooked', 'handwash', 'sink', 'soap', 'sanitizer']
-        equipment_keywords = ['rust', 'damage', 'wear', 'grease', 'leak', 'water', 'moisture', 'drip',
-                             'hood', 'filter', 'equipment', 'broken', 'crack']
-        operational_keywords = ['crowd', 'queue', 'line', 'sign', 'label', 'warning', 'notice', 'poster']
-        food_quality_keywords = ['plate', 'food', 'garnish', 'steam', 'presentation', 'plating']
-        staff_behavior_keywords = ['jewelry', 'watch', 'ring', 'bracelet', 'phone', 'mobile', 'cell',
-                                  'eating', 'drinking', 'beverage', 'cup', 'bottle']
-
+        objects = {category: [] for category in OBJECT_CATEGORY_KEYWORDS}
         for label in labels:
-            label_name = label.get('Name', '').lower()
             confidence = label.get('Confidence', 0)
 
             instances = []
@@ -264,29 +372,11 @@ class RekognitionService:
             }
 
             # Categorize into multiple categories (object can belong to multiple)
-            if any(keyword in label_name for keyword in safety_keywords):
-                safety_objects.append(label_data)
-            if any(keyword in label_name for keyword in cleanliness_keywords):
-                cleanliness_objects.append(label_data)
-            if any(keyword in label_name for keyword in food_safety_keywords):
-                food_safety_objects.append(label_data)
-            if any(keyword in label_name for keyword in equipment_keywords):
-                equipment_objects.append(label_data)
-            if any(keyword in label_name for keyword in operational_keywords):
-                operational_objects.append(label_data)
-            if any(keyword in label_name for keyword in food_quality_keywords):
-                food_quality_objects.append(label_data)
-            if any(keyword in label_name for keyword in staff_behavior_keywords):
-                staff_behavior_objects.append(label_data)
+            for category in label_categories(label.get('Name', '')):
+                objects[category].append(label_data)
 
         return {
-            'safety_objects': safety_objects,
-            'cleanliness_objects': cleanliness_objects,
-            'food_safety_objects': food_safety_objects,
-            'equipment_objects': equipment_objects,
-            'operational_objects': operational_objects,
-            'food_quality_objects': food_quality_objects,
-            'staff_behavior_objects': staff_behavior_objects,
+            **{f'{category}_objects': category_objects for category, category_objects in objects.items()},
             'all_labels': labels
         }
 
@@ -3,6 +3,7 @@ from unittest.mock import patch, Mock, MagicMock
 from botocore.exceptions import ClientError, BotoCoreError
 from .rekognition import RekognitionService
 from .analyzer import VideoAnalyzer
+from .frame import Frame
 import logging
 
 # Disable logging during tests
@@ -278,6 +279,33 @@ class RekognitionServiceTest(TestCase):
 
         self.assertIn('credentials', str(context.exception).lower())
 
+    @override_settings(ENABLE_AWS_REKOGNITION=True, AWS_ACCESS_KEY_ID='test_key')
+    @patch('ai_services.rekognition.boto3.client')
+    def test_s3_image_reference_is_passed_through(self, mock_boto3):
+        """Test that S3 references reach Rekognition as Image.S3Object"""
+        mock_client = Mock()
+        mock_boto3.return_value = mock_client
+        mock_client.detect_text.return_value = {'TextDetections': []}
+
+        service = RekognitionService()
+        service.detect_text(RekognitionService.s3_image('frames/video_1_frame_0.jpg', bucket='test-bucket'))
+
+        mock_client.detect_text.assert_called_once_with(
+            Image={'S3Object': {'Bucket': 'test-bucket', 'Name': 'frames/video_1_frame_0.jpg'}}
+        )
+
+    @override_settings(ENABLE_AWS_REKOGNITION=True, AWS_ACCESS_KEY_ID='test_key')
+    @patch('ai_services.rekognition.boto3.client')
+    def test_image_bytes_are_sent_inline(self, mock_boto3):
+        """Test that raw bytes still go as Image.Bytes"""
+        mock_client = Mock()
+        mock_boto3.return_value = mock_client
+        mock_client.detect_text.return_value = {'TextDetections': []}
+
+        RekognitionService().detect_text(self.sample_image_bytes)
+
+        mock_client.detect_text.assert_called_once_with(Image={'Bytes': self.sample_image_bytes})
+
 
 class VideoAnalyzerTest(TestCase):
     """Test VideoAnalyzer integration with RekognitionService"""
@@ -359,6 +387,662 @@ class VideoAnalyzerTest(TestCase):
         # Score should still be calculated from available services
         self.assertGreaterEqual(result['overall_score'], 0)
 
+    @override_settings(ENABLE_AWS_REKOGNITION=True, AWS_ACCESS_KEY_ID='test_key')
+    @patch('ai_services.rekognition.boto3.client')
+    def test_analyze_frame_from_s3_without_local_file(self, mock_boto3):
+        """Test frame analysis with only an S3 reference and no local detectors"""
+        mock_client = Mock()
+        mock_boto3.return_value = mock_client
+        mock_client.detect_protective_equipment.return_value = {'Persons': []}
+        mock_client.detect_labels.return_value = {'Labels': []}
+        mock_client.detect_text.return_value = {'TextDetections': []}
+        s3_image = RekognitionService.s3_image('frames/video_1_frame_0.jpg', bucket='test-bucket')
+
+        analyzer = VideoAnalyzer()
+        result = analyzer.analyze_frame(None, frame_s3_image=s3_image)
+
+        self.assertTrue(result['rekognition_available'])
+        self.assertEqual(mock_client.detect_protective_equipment.call_args.kwargs['Image'], s3_image)
+        self.assertEqual(mock_client.detect_labels.call_args.kwargs['Image'], s3_image)
+
+
+
+def _jpeg_bytes(size=(640, 360), color=(90, 90, 90)):
+    import io
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color).save(buffer, 'JPEG')
+    return buffer.getvalue()
+
+
+class LabelMosaicTest(TestCase):
+    """Test tiling frames into one detect_labels call"""
+
+    def test_box_is_mapped_back_to_its_tile(self):
+        from .mosaic import map_box_to_tile
+
+        # 2x2 mosaic of 100px tiles, second tile only 100x50
+        tiles = [(0, 0, 100, 100), (100, 0, 100, 50), (0, 100, 100, 100), (100, 100, 100, 100)]
+        box = {'Left': 0.55, 'Top': 0.05, 'Width': 0.1, 'Height': 0.1}
+
+        index, frame_box = map_box_to_tile(box, tiles, (200, 200))
+
+        self.assertEqual(index, 1)
+        self.assertAlmostEqual(frame_box['Left'], 0.1)
+        self.assertAlmostEqual(frame_box['Top'], 0.2)
+        self.assertAlmostEqual(frame_box['Width'], 0.2)
+        self.assertAlmostEqual(frame_box['Height'], 0.4)
+
+        # Centered in the padding below the short tile
+        self.assertEqual(map_box_to_tile({'Left': 0.7, 'Top': 0.3, 'Width': 0.05, 'Height': 0.05},
+                                         tiles, (200, 200)), (None, None))
+
+    @override_settings(ENABLE_AWS_REKOGNITION=True, AWS_ACCESS_KEY_ID='test_key', REKOGNITION_MOSAIC_TILE_SIZE=100)
+    @patch('ai_services.rekognition.boto3.client')
+    def test_one_call_splits_labels_per_frame(self, mock_boto3):
+        mock_client = Mock()
+        mock_boto3.return_value = mock_client
+        mock_client.detect_labels.return_value = {'Labels': [
+            {'Name': 'Person', 'Confidence': 99.0, 'Instances': [
+                {'Confidence': 99.0, 'BoundingBox': {'Left': 0.1, 'Top': 0.1, 'Width': 0.1, 'Height': 0.2}},
+                {'Confidence': 95.0, 'BoundingBox': {'Left': 0.6, 'Top': 0.6, 'Width': 0.1, 'Height': 0.2}},
+                {'Confidence': 90.0, 'BoundingBox': {'Left': 0.7, 'Top': 0.6, 'Width': 0.1, 'Height': 0.2}},
+            ]},
+            {'Name': 'Fire Extinguisher', 'Confidence': 88.0, 'Instances': [
+                {'Confidence': 88.0, 'BoundingBox': {'Left': 0.6, 'Top': 0.1, 'Width': 0.1, 'Height': 0.1}},
+            ]},
+            {'Name': 'Kitchen', 'Confidence': 80.0, 'Instances': []},
+        ]}
+
+        results = RekognitionService().detect_labels_mosaic([_jpeg_bytes() for _ in range(4)])
+
+        mock_client.detect_labels.assert_called_once()
+        self.assertEqual(len(results), 4)
+        self.assertEqual([r['people']['people_count'] for r in results], [1, 0, 0, 2])
+        self.assertEqual([len(r['objects']['safety_objects']) for r in results], [0, 1, 0, 0])
+        # Uncategorized image-level labels are dropped rather than copied to every frame
+        self.assertEqual(results[2]['objects']['all_labels'], [])
+
+        extinguisher = results[1]['objects']['safety_objects'][0]['instances'][0]['bounding_box']
+        self.assertAlmostEqual(extinguisher['Left'], 0.2)
+        # 640x360 frames become 100x56 tiles
+        self.assertAlmostEqual(extinguisher['Top'], 20 / 56)
+
+    @override_settings(ENABLE_AWS_REKOGNITION=True, AWS_ACCESS_KEY_ID='test_key', REKOGNITION_MOSAIC_TILE_SIZE=100,
+                       REKOGNITION_OBJECTS_MIN_CONFIDENCE=50)
+    @patch('ai_services.rekognition.boto3.client')
+    def test_mosaic_applies_per_frame_thresholds(self, mock_boto3):
+        mock_client = Mock()
+        mock_boto3.return_value = mock_client
+        person = {'Confidence': 60.0, 'BoundingBox': {'Left': 0.1, 'Top': 0.1, 'Width': 0.1, 'Height': 0.2}}
+        mock_client.detect_labels.return_value = {'Labels': [
+            {'Name': 'Person', 'Confidence': 60.0, 'Instances': [person]},
+        ]}
+
+        results = RekognitionService().detect_labels_mosaic([_jpeg_bytes() for _ in range(2)])
+
+        # Below detect_people's confidence, like a per-frame call would have filtered it
+        self.assertEqual(mock_client.detect_labels.call_args.kwargs['MinConfidence'], 50)
+        self.assertEqual(results[0]['people']['people_count'], 0)
+        self.assertEqual(results[0]['objects']['all_labels'][0]['Name'], 'Person')
+
+        # A spill without instances may be in any frame, so every frame needs its own call
+        mock_client.detect_labels.return_value = {'Labels': [
+            {'Name': 'Spill', 'Confidence': 80.0, 'Instances': []},
+        ]}
+        self.assertEqual(RekognitionService().detect_labels_mosaic([_jpeg_bytes() for _ in range(2)]), [None, None])
+
+    @override_settings(ENABLE_AWS_REKOGNITION=True, AWS_ACCESS_KEY_ID='test_key')
+    @patch('ai_services.rekognition.boto3.client')
+    @patch('ai_services.yolo_detector.YOLODetector.detect_objects')
+    @patch('ai_services.yolo_detector.YOLODetector.detect_uniform_compliance')
+    @patch('ai_services.ocr_service.OCRService.analyze_menu_board')
+    def test_analyzer_shares_label_call_across_frames(self, mock_ocr, mock_yolo_uniform,
+                                                      mock_yolo_objects, mock_boto3):
+        mock_client = Mock()
+        mock_boto3.return_value = mock_client
+        mock_client.detect_protective_equipment.return_value = {'Persons': []}
+        mock_client.detect_labels.return_value = {'Labels': []}
+        mock_client.detect_text.return_value = {'TextDetections': []}
+        mock_yolo_objects.return_value = {'safety_objects': [], 'cleanliness_objects': []}
+        mock_yolo_uniform.return_value = {'compliance_score': 95.0}
+        mock_ocr.return_value = {'compliance_score': 90.0, 'compliance_issues': []}
+
+        frames = [Frame(data=_jpeg_bytes()) for _ in range(4)]
+        results = VideoAnalyzer().analyze_frames(frames, label_mosaic=True)
+
+        self.assertEqual(len(results), 4)
+        self.assertTrue(all(r['rekognition_available'] for r in results))
+        self.assertEqual(mock_client.detect_labels.call_count, 1)
+        self.assertEqual(mock_client.detect_protective_equipment.call_count, 4)
+        self.assertEqual(mock_client.detect_text.call_count, 4)
+
+    @override_settings(ENABLE_AWS_REKOGNITION=True, AWS_ACCESS_KEY_ID='test_key')
+    @patch('ai_services.rekognition.boto3.client')
+    def test_kitchen_scene_labels_need_no_per_frame_calls(self, mock_boto3):
+        mock_client = Mock()
+        mock_boto3.return_value = mock_client
+        mock_client.detect_protective_equipment.return_value = {'Persons': []}
+        mock_client.detect_text.return_value = {'TextDetections': []}
+        # Typical kitchen footage: scene labels without instances next to located objects
+        mock_client.detect_labels.return_value = {'Labels': [
+            {'Name': 'Person', 'Confidence': 99.0, 'Instances': [
+                {'Confidence': 99.0, 'BoundingBox': {'Left': 0.1, 'Top': 0.1, 'Width': 0.1, 'Height': 0.2}},
+            ]},
+            {'Name': 'Pizza', 'Confidence': 90.0, 'Parents': [{'Name': 'Food'}], 'Instances': [
+                {'Confidence': 90.0, 'BoundingBox': {'Left': 0.6, 'Top': 0.6, 'Width': 0.1, 'Height': 0.1}},
+            ]},
+            *({'Name': name, 'Confidence': 85.0, 'Instances': []}
+              for name in ['Floor', 'Food', 'Sign', 'Water', 'Surface']),
+        ]}
+
+        VideoAnalyzer().analyze_frames([Frame(data=_jpeg_bytes()) for _ in range(4)])
+        per_frame_calls = mock_client.detect_labels.call_count
+        mock_client.detect_labels.reset_mock()
+
+        results = VideoAnalyzer().analyze_frames([Frame(data=_jpeg_bytes()) for _ in range(4)], label_mosaic=True)
+
+        # One mosaic call instead of object and people calls for each of the four frames
+        self.assertEqual(per_frame_calls, 8)
+        self.assertEqual(mock_client.detect_labels.call_count, 1)
+        food = [[obj['name'] for obj in result['food_quality_analysis']] for result in results]
+        # Food is attributed to the frame of the located Pizza it is the parent of
+        self.assertEqual(food, [[], [], [], ['Food']])
+
+    @override_settings(ENABLE_AWS_REKOGNITION=True, AWS_ACCESS_KEY_ID='test_key')
+    @patch('ai_services.rekognition.boto3.client')
+    def test_analyzer_falls_back_to_per_frame_labels(self, mock_boto3):
+        mock_client = Mock()
+        mock_boto3.return_value = mock_client
+        mock_client.detect_protective_equipment.return_value = {'Persons': []}
+        mock_client.detect_labels.return_value = {'Labels': []}
+        mock_client.detect_text.return_value = {'TextDetections': []}
+
+        # Undecodable bytes make the mosaic fail before any label call
+        results = VideoAnalyzer().analyze_frames([Frame(data=b'not-an-image'), Frame(data=b'not-an-image')],
+                                                 label_mosaic=True)
+
+        self.assertEqual(len(results), 2)
+        # Objects and people per frame
+        self.assertEqual(mock_client.detect_labels.call_count, 4)
+
+
+class OCRPoolTest(TestCase):
+    """Test handing frames to the OCR process pool"""
+
+    def test_frames_travel_through_shared_memory(self):
+        import os
+        import tempfile
+        from concurrent.futures import Future
+        from multiprocessing import shared_memory
+        from PIL import Image
+        from .ocr_pool import OCRPool
+
+        received = []
+
+        def fake_submit(fn, frames):
+            # Read the blocks the way a pool worker would, before they are released
+            for name, shape in frames:
+                shm = shared_memory.SharedMemory(name=name)
+                received.append((name, shape, bytes(shm.buf[:3])))
+                shm.close()
+            future = Future()
+            future.set_result([[] for _ in frames])
+            return future
+
+        pool = OCRPool.__new__(OCRPool)
+        pool.executor = Mock(submit=fake_submit)
+        with tempfile.TemporaryDirectory() as temp_dir:
+            frame_path = os.path.join(temp_dir, 'frame.png')
+            Image.new('RGB', (4, 2), (10, 20, 30)).save(frame_path)
+            result = pool.submit([frame_path, frame_path]).result()
+
+        self.assertEqual(result, [[], []])
+        self.assertEqual([(shape, pixel) for _, shape, pixel in received], [((2, 4, 3), bytes([10, 20, 30]))] * 2)
+        # Blocks are unlinked once the batch is done
+        with self.assertRaises(FileNotFoundError):
+            shared_memory.SharedMemory(name=received[0][0])
+
+    @override_settings(ENABLE_OCR_DETECTION=False)
+    def test_pool_results_become_menu_board_analyses(self):
+        from concurrent.futures import Future
+        from .ocr_service import OCRService
+
+        service = OCRService()
+        batch = Future()
+        batch.set_result([
+            [([[0, 0], [10, 0], [10, 5], [0, 5]], 'Burger $5.99', 0.95)],
+            [],
+        ])
+        service.pool = Mock(submit=Mock(return_value=batch))
+
+        frames = [Frame(data=_jpeg_bytes()), Frame(data=_jpeg_bytes())]
+        pending = service.submit_menu_boards(frames)
+
+        # Frames are handed over decoded
+        service.pool.submit.assert_called_once_with([frames[0].image, frames[1].image])
+        first, second = pending[0](), pending[1]()
+        self.assertEqual(first['detected_text']['all_text'], 'Burger $5.99')
+        self.assertEqual(first['detected_text']['text_detections'][0]['bounding_box']['x2'], 10)
+        self.assertEqual(second['analysis_summary']['readable_text_blocks'], 0)
+
+    @override_settings(ENABLE_OCR_DETECTION=False)
+    @patch('ai_services.ocr_service.disable_ocr_pool')
+    def test_broken_pool_falls_back_to_in_process_ocr(self, mock_disable):
+        from concurrent.futures import Future
+        from concurrent.futures.process import BrokenProcessPool
+        from .ocr_service import OCRService
+
+        service = OCRService()
+        batch = Future()
+        batch.set_exception(BrokenProcessPool('worker died'))
+        service.pool = Mock(submit=Mock(return_value=batch))
+
+        result = service.submit_menu_boards([Frame(data=_jpeg_bytes())])[0]()
+
+        mock_disable.assert_called_once()
+        self.assertIsNone(service.pool)
+        self.assertIn('compliance_score', result)
+
+
+class OCRRegionGatingTest(TestCase):
+    """Test OCR limited to Rekognition text regions"""
+
+    def _line(self, left, top, width, height):
+        return {'text': 'x', 'bounding_box': {'Left': left, 'Top': top, 'Width': width, 'Height': height}}
+
+    def test_text_regions_are_padded_and_merged(self):
+        from .ocr_service import text_regions
+
+        lines = [
+            self._line(0.1, 0.1, 0.3, 0.05),
+            self._line(0.1, 0.16, 0.3, 0.05),  # next menu line, overlaps once padded
+            self._line(0.7, 0.8, 0.1, 0.05),
+        ]
+
+        regions = text_regions(lines, (1000, 1000), padding=0.5)
+
+        self.assertEqual(regions, [(75, 75, 425, 235), (675, 775, 825, 875)])
+
+    @override_settings(ENABLE_OCR_DETECTION=False, OCR_REGION_GATING=True)
+    def test_only_text_regions_are_read(self):
+        import os
+        import tempfile
+        from PIL import Image
+        from .ocr_service import OCRService
+
+        service = OCRService()
+        service.reader = Mock()
+        crop_results = [([[0, 0], [20, 0], [20, 10], [0, 10]], 'Fries $2.49', 0.9)]
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            frame_path = os.path.join(temp_dir, 'frame.jpg')
+            Image.new('RGB', (1000, 1000)).save(frame_path)
+            with patch.object(service, '_readtext', return_value=crop_results) as mock_readtext:
+                with_text, without_text = service.submit_menu_boards(
+                    [frame_path, frame_path],
+                    [{'lines': [self._line(0.5, 0.5, 0.2, 0.1)]}, {'lines': []}],
+                )
+                with_text, without_text = with_text(), without_text()
+
+        mock_readtext.assert_called_once()
+        self.assertEqual(mock_readtext.call_args[0][0].size, (300, 200))
+        # Boxes come back in frame coordinates
+        self.assertEqual(with_text['detected_text']['text_detections'][0]['bounding_box']['x1'], 450)
+        self.assertEqual(with_text['detected_text']['all_text'], 'Fries $2.49')
+        self.assertEqual(without_text['detected_text']['total_text_blocks'], 0)
+
+    @override_settings(ENABLE_AWS_REKOGNITION=True, AWS_ACCESS_KEY_ID='test_key', OCR_REGION_GATING=True)
+    @patch('ai_services.rekognition.boto3.client')
+    def test_analyzer_waits_for_rekognition_text(self, mock_boto3):
+        mock_client = Mock()
+        mock_boto3.return_value = mock_client
+        mock_client.detect_protective_equipment.return_value = {'Persons': []}
+        mock_client.detect_labels.return_value = {'Labels': []}
+        mock_client.detect_text.return_value = {'TextDetections': []}
+
+        analyzer = VideoAnalyzer()
+        analyzer.ocr.reader = Mock()
+        with patch.object(analyzer.ocr, 'submit_menu_boards', return_value=[lambda: {}]) as mock_submit:
+            analyzer.analyze_frame('/fake/path.jpg', b'fake_bytes')
+
+        mock_submit.assert_called_once()
+        self.assertEqual(mock_submit.call_args[0][1][0]['lines'], [])
+
+
+class FakeCacheRedis:
+    """In-memory stand-in for the Redis list and hash commands used by the menu board cache"""
+
+    def __init__(self):
+        self.lists = {}
+        self.hashes = {}
+
+    def lrange(self, key, start, end):
+        return list(self.lists.get(key, []))
+
+    def hincrby(self, key, field, amount):
+        counts = self.hashes.setdefault(key, {})
+        counts[field] = str(int(counts.get(field, 0)) + amount)
+
+    def hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+
+    def pipeline(self):
+        return self
+
+    def delete(self, key):
+        self.lists.pop(key, None)
+
+    def rpush(self, key, *values):
+        self.lists.setdefault(key, []).extend(values)
+
+    def expire(self, key, seconds):
+        pass
+
+    def execute(self):
+        pass
+
+
+@override_settings(MENU_BOARD_CACHE_MAX_DISTANCE=4, MENU_BOARD_CACHE_MAX_AGE_HOURS=24, MENU_BOARD_CACHE_MAX_ENTRIES=8)
+class MenuBoardCacheTest(TestCase):
+    """Test reuse of menu board results per store"""
+
+    def setUp(self):
+        self.redis = FakeCacheRedis()
+        patcher = patch('ai_services.menu_board_cache.get_redis_client', return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_similar_board_hits_and_different_board_misses(self):
+        from .menu_board_cache import MenuBoardCache
+
+        cache = MenuBoardCache(store_id=1)
+        cache.store(0b1111, {'compliance_score': 80.0})
+
+        self.assertEqual(cache.lookup(0b1110), {'compliance_score': 80.0})
+        self.assertIsNone(cache.lookup(0xFFFF0000))
+        # Other stores have their own boards
+        self.assertIsNone(MenuBoardCache(store_id=2).lookup(0b1111))
+        self.assertEqual(cache.stats(), {'hits': 1, 'misses': 1, 'hit_rate': 0.5})
+
+    def test_expired_results_are_not_reused(self):
+        from .menu_board_cache import MenuBoardCache
+
+        cache = MenuBoardCache(store_id=1)
+        with patch('ai_services.menu_board_cache.time.time', return_value=1_000_000):
+            cache.store(0b1111, {'compliance_score': 80.0})
+        with patch('ai_services.menu_board_cache.time.time', return_value=1_000_000 + 25 * 3600):
+            self.assertIsNone(cache.lookup(0b1111))
+
+    @override_settings(ENABLE_OCR_DETECTION=False, OCR_REGION_GATING=True, MENU_BOARD_CACHE_ENABLED=True)
+    def test_cached_board_skips_ocr(self):
+        import os
+        import tempfile
+        from PIL import Image
+        from .ocr_service import OCRService
+
+        service = OCRService(store_id=1)
+        service.reader = Mock()
+        text = {'lines': [{'text': 'x', 'bounding_box': {'Left': 0.2, 'Top': 0.2, 'Width': 0.5, 'Height': 0.1}}]}
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            frame_path = os.path.join(temp_dir, 'frame.jpg')
+            Image.linear_gradient('L').convert('RGB').save(frame_path)
+            with patch.object(service, '_readtext', return_value=[]) as mock_readtext:
+                first = service.submit_menu_boards([frame_path], [text])[0]()
+                second = service.submit_menu_boards([frame_path], [text])[0]()
+
+        mock_readtext.assert_called_once()
+        self.assertNotIn('cache_hit', first)
+        self.assertTrue(second['cache_hit'])
+        self.assertEqual(second['compliance_score'], first['compliance_score'])
+
+
+class FrameTest(TestCase):
+    """Test the decode-once frame shared by detectors"""
+
+    def test_frame_is_decoded_once_and_downscales_are_cached(self):
+        from PIL import Image
+
+        frame = Frame(data=_jpeg_bytes(size=(1280, 720)))
+
+        with patch('ai_services.frame.Image.open', wraps=Image.open) as mock_open:
+            self.assertEqual(frame.size, (1280, 720))
+            small = frame.downscaled(640)
+            self.assertIs(frame.downscaled(640), small)
+            self.assertEqual(small.size, (640, 360))
+            self.assertEqual(frame.image.size, (1280, 720))
+
+        self.assertEqual(mock_open.call_count, 1)
+        self.assertIs(frame.downscaled(2000), frame.image)
+
+    def test_bytes_preferred_over_s3_reference_for_rekognition(self):
+        s3_image = RekognitionService.s3_image('frames/a.jpg', bucket='b')
+
+        self.assertEqual(Frame(data=b'jpeg', s3_image=s3_image).rekognition_image, b'jpeg')
+        self.assertEqual(Frame(s3_image=s3_image).rekognition_image, s3_image)
+        self.assertIsNone(Frame().rekognition_image)
+
+    @override_settings(ENABLE_YOLO_DETECTION=False)
+    def test_yolo_checks_share_one_inference(self):
+        from .yolo_detector import YOLODetector
+
+        detector = YOLODetector()
+        detector.model = Mock(return_value=[], names={})
+        frame = Frame(data=_jpeg_bytes())
+
+        detector.detect_objects(frame)
+        detector.detect_uniform_compliance(frame)
+
+        detector.model.assert_called_once_with(frame.image)
 
 # Re-enable logging after tests
 logging.disable(logging.NOTSET)
+
+
+class TrackingTest(TestCase):
+    """Test cross-frame tracking of findings"""
+
+    def _frames(self, count):
+        return [Mock(timestamp=float(index)) for index in range(count)]
+
+    def _spill(self, left, confidence=0.8):
+        return {
+            'category': 'CLEANLINESS', 'severity': 'MEDIUM', 'title': 'Spill or Mess Detected',
+            'confidence': confidence,
+            'bounding_box': {'Left': left, 'Top': 0.5, 'Width': 0.1, 'Height': 0.1},
+        }
+
+    @override_settings(TRACKING_IOU_THRESHOLD=0.3, TRACKING_MAX_CENTROID_DISTANCE=0.5, TRACKING_MAX_MISSED_FRAMES=1)
+    def test_same_object_across_frames_is_one_track(self):
+        from .tracking import track_findings
+
+        frames = self._frames(4)
+        tracks = track_findings([
+            (frames[0], [self._spill(0.10, 0.6), self._spill(0.70)]),
+            (frames[1], [self._spill(0.11, 0.9), self._spill(0.70)]),
+            (frames[2], []),
+            (frames[3], [self._spill(0.12, 0.7)]),
+        ])
+
+        self.assertEqual(len(tracks), 2)
+        moving = tracks[0]
+        self.assertEqual(moving['affected_frame_count'], 3)
+        self.assertEqual(moving['confidence'], 0.9)
+        self.assertAlmostEqual(moving['average_confidence'], (0.6 + 0.9 + 0.7) / 3)
+        self.assertEqual((moving['first_timestamp'], moving['last_timestamp']), (0.0, 3.0))
+        self.assertEqual(moving['bounding_box']['Left'], 0.11)
+        self.assertEqual(tracks[1]['affected_frame_count'], 2)
+
+    @override_settings(TRACKING_IOU_THRESHOLD=0.3, TRACKING_MAX_CENTROID_DISTANCE=0.5, TRACKING_MAX_MISSED_FRAMES=0)
+    def test_gap_and_boxless_findings(self):
+        from .tracking import track_findings
+
+        ppe = {'category': 'PPE', 'severity': 'HIGH', 'title': 'Missing Face Covers', 'confidence': 0.9}
+        frames = self._frames(3)
+        tracks = track_findings([
+            (frames[0], [self._spill(0.1), ppe]),
+            (frames[1], [ppe]),
+            (frames[2], [self._spill(0.1)]),
+        ])
+
+        # The spill was missing for a frame, so it starts a new track
+        self.assertEqual(
+            sorted((t['title'], t['first_timestamp'], t['affected_frame_count']) for t in tracks),
+            [('Missing Face Covers', 0.0, 2), ('Spill or Mess Detected', 0.0, 1), ('Spill or Mess Detected', 2.0, 1)],
+        )
+
+
+class DetectionsTest(TestCase):
+    """Test flattening analyses into detection rows and rebuilding them"""
+
+    def _analysis(self):
+        from .ocr_service import OCRService
+
+        face_cover = {'type': 'FACE_COVER', 'confidence': 95.0, 'covers_body_part': True, 'bounding_box': {}}
+        analysis = {
+            'rekognition_available': True,
+            'ppe_analysis': {
+                'persons': [
+                    {'confidence': 99.0, 'bounding_box': {'Left': 0.1, 'Top': 0.1, 'Width': 0.2, 'Height': 0.5},
+                     'body_parts': [{'name': 'FACE', 'equipment': [face_cover]},
+                                    {'name': 'HEAD', 'equipment': [face_cover]}]},
+                    {'confidence': 98.0, 'bounding_box': {}, 'body_parts': []},
+                ],
+                'summary': {'total_persons': 2, 'persons_with_face_cover': 1,
+                            'persons_with_hand_cover': 0, 'persons_with_head_cover': 0},
+            },
+            'safety_analysis': [{'name': 'Blocked Exit', 'confidence': 91.0, 'instances': []}],
+            'cleanliness_analysis': [{'class': 'spill', 'confidence': 0.8, 'source': 'yolo',
+                                      'bounding_box': {'x1': 1, 'y1': 2, 'x2': 30, 'y2': 40}}],
+            'food_safety_analysis': [{'name': 'Container', 'confidence': 88.0, 'instances': []}],
+            'equipment_analysis': [],
+            'operational_analysis': [],
+            'food_quality_analysis': [],
+            'staff_behavior_analysis': [{'name': 'Cell Phone', 'confidence': 80.0, 'instances': []}],
+            'people_analysis': {
+                'people_count': 12, 'detected': True,
+                'people_instances': [{'confidence': 90.0, 'bounding_box': {}} for _ in range(12)],
+            },
+            'text_analysis': {'lines': [{'text': 'EXP 10/12/2025', 'confidence': 99.0, 'bounding_box': {}}],
+                              'all_text': 'EXP 10/12/2025'},
+            'uniform_analysis': {'uniform_objects': [
+                {'class': 'shirt', 'confidence': 0.9, 'compliance_status': 'compliant'},
+                {'class': 'shoes', 'confidence': 0.7, 'compliance_status': 'non_compliant'},
+            ], 'compliance_score': 50.0},
+            'menu_board_analysis': OCRService._analyze_menu_compliance(OCRService._process_ocr_results([
+                ([[0, 0], [10, 0], [10, 5], [0, 5]], '$5 burger 500 cal', 0.9),
+                ([[0, 6], [10, 6], [10, 9], [0, 9]], 'ab', 0.5),
+            ])),
+        }
+        analysis['overall_score'] = VideoAnalyzer.for_scoring()._calculate_overall_score(analysis)
+        return analysis
+
+    def test_rebuilt_analysis_scores_and_finds_the_same(self):
+        from inspections.tasks import calculate_inspection_scores
+        from .detections import flatten_frame_analysis, frame_analysis_from_detections
+
+        analysis = self._analysis()
+        rows = flatten_frame_analysis(analysis)
+        rebuilt = frame_analysis_from_detections(rows)
+
+        self.assertTrue(all(0 <= row['confidence'] <= 1 for row in rows))
+        self.assertEqual(len([row for row in rows if row['label'] == 'FACE_COVER']), 1)
+        self.assertAlmostEqual(rebuilt['overall_score'], analysis['overall_score'])
+        self.assertEqual(calculate_inspection_scores([rebuilt]), calculate_inspection_scores([analysis]))
+
+        scorer = VideoAnalyzer.for_scoring()
+
+        def summarize(findings):
+            return sorted((f['title'], f['severity'], round(f['confidence'], 3)) for f in findings)
+
+        original = scorer.generate_findings(analysis, None)
+        self.assertGreater(len(original), 5)
+        self.assertEqual(summarize(scorer.generate_findings(rebuilt, None)), summarize(original))
+
+    def test_rekognition_outage_is_kept(self):
+        from .detections import flatten_frame_analysis, frame_analysis_from_detections
+        from .ocr_service import OCRService
+
+        analysis = {
+            'rekognition_available': False,
+            'uniform_analysis': {'uniform_objects': [], 'compliance_score': 100.0},
+            'menu_board_analysis': OCRService._analyze_menu_compliance(OCRService._process_ocr_results([])),
+        }
+        analysis['overall_score'] = VideoAnalyzer.for_scoring()._calculate_overall_score(analysis)
+
+        rebuilt = frame_analysis_from_detections(flatten_frame_analysis(analysis))
+
+        self.assertFalse(rebuilt['rekognition_available'])
+        self.assertAlmostEqual(rebuilt['overall_score'], analysis['overall_score'])
+
+
+class EngineVersioningTest(TestCase):
+    """Test re-analysis re-running only the detector engines that changed"""
+
+    def _analyzer(self, mock_boto3):
+        mock_client = Mock()
+        mock_boto3.return_value = mock_client
+        mock_client.detect_protective_equipment.return_value = {'Persons': []}
+        mock_client.detect_labels.return_value = {'Labels': []}
+        mock_client.detect_text.return_value = {'TextDetections': []}
+        return VideoAnalyzer(), mock_client
+
+    @override_settings(ENABLE_AWS_REKOGNITION=True, AWS_ACCESS_KEY_ID='test_key')
+    @patch('ai_services.rekognition.boto3.client')
+    def test_enabling_yolo_runs_only_yolo(self, mock_boto3):
+        analyzer, mock_client = self._analyzer(mock_boto3)
+        with patch.object(analyzer.rekognition, 'detect_objects', return_value={
+            'safety_objects': [{'name': 'Wet Floor Sign', 'confidence': 90.0}],
+        }):
+            first = analyzer.analyze_frame('/fake/path.jpg', b'fake_bytes')
+        self.assertEqual(analyzer.stale_engines(first), set())
+        self.assertFalse(first['engines']['yolo']['active'])
+
+        mock_client.reset_mock()
+        analyzer.yolo.model = Mock()
+        self.assertEqual(analyzer.stale_engines(first), {'yolo'})
+        with patch.object(analyzer.yolo, 'detect_objects', return_value={
+            'safety_objects': [{'class': 'knife', 'confidence': 0.7}], 'cleanliness_objects': [],
+        }), patch.object(analyzer.yolo, 'detect_uniform_compliance', return_value={'compliance_score': 80.0}):
+            second = analyzer.analyze_frame('/fake/path.jpg', b'fake_bytes', previous=first)
+
+        mock_client.detect_protective_equipment.assert_not_called()
+        mock_client.detect_labels.assert_not_called()
+        mock_client.detect_text.assert_not_called()
+        self.assertEqual([obj.get('source') for obj in second['safety_analysis']], [None, 'yolo'])
+        self.assertEqual(second['uniform_analysis'], {'compliance_score': 80.0})
+        self.assertEqual(second['ppe_analysis'], first['ppe_analysis'])
+        self.assertEqual(analyzer.stale_engines(second), set())
+
+        # YOLO objects of the earlier analysis are replaced, not duplicated, when YOLO runs again
+        second['engines'].pop('yolo')
+        with patch.object(analyzer.yolo, 'detect_objects', return_value={'safety_objects': [], 'cleanliness_objects': []}):
+            third = analyzer.analyze_frame('/fake/path.jpg', b'fake_bytes', previous=second)
+        self.assertEqual(third['safety_analysis'], [{'name': 'Wet Floor Sign', 'confidence': 90.0}])
+
+    @override_settings(ENABLE_AWS_REKOGNITION=True, AWS_ACCESS_KEY_ID='test_key')
+    @patch('ai_services.rekognition.boto3.client')
+    def test_config_changes_and_failures_make_engines_stale(self, mock_boto3):
+        analyzer, mock_client = self._analyzer(mock_boto3)
+        self.assertEqual(analyzer.stale_engines({'overall_score': 80.0}), set(analyzer.engine_fingerprints()))
+
+        mock_client.detect_text.side_effect = ClientError(
+            {'Error': {'Code': 'ThrottlingException', 'Message': 'Slow down'}}, 'DetectText'
+        )
+        first = analyzer.analyze_frame('/fake/path.jpg', b'fake_bytes')
+        # Menu board OCR reads Rekognition's text regions, so it re-runs with them
+        self.assertEqual(analyzer.stale_engines(first), {'rekognition_text', 'ocr'})
+
+        mock_client.detect_text.side_effect = None
+        second = analyzer.analyze_frame('/fake/path.jpg', b'fake_bytes', previous=first)
+        self.assertEqual(analyzer.stale_engines(second), set())
+
+        with override_settings(REKOGNITION_OBJECTS_MIN_CONFIDENCE=50):
+            self.assertEqual(analyzer.stale_engines(second), {'rekognition_labels'})
+            mock_client.reset_mock()
+            analyzer.analyze_frame('/fake/path.jpg', b'fake_bytes', previous=second)
+        mock_client.detect_protective_equipment.assert_not_called()
+        mock_client.detect_text.assert_not_called()
+        self.assertEqual(mock_client.detect_labels.call_count, 2)
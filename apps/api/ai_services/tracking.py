@@ -0,0 +1,166 @@
+"""
+Cross-frame tracking of findings.
+
+generate_findings emits one finding per detected object per frame, so a spill
+visible in eight frames arrives as eight findings. The tracker links findings
+with the same (category, severity, title) across consecutive analyzed frames
+into tracks: boxes are matched to a track's last box by IoU, falling back to
+centroid distance for objects that moved, and findings without a box (e.g.
+the PPE summary) form one track per title. A track is continued over at most
+TRACKING_MAX_MISSED_FRAMES frames it was not seen in.
+
+Each track comes out as a single finding dict carrying the peak confidence
+frame and box plus first/last timestamps, affected frame count and average
+confidence, ready for create_findings_from_analysis.
+"""
+import math
+
+from django.conf import settings
+
+
+def box_corners(box):
+    """(x1, y1, x2, y2) of a YOLO/OCR pixel box or a Rekognition normalized box, or None"""
+    if not box:
+        return None
+    if 'x1' in box:
+        return box['x1'], box['y1'], box['x2'], box['y2']
+    if 'Width' in box:
+        left, top = box.get('Left', 0), box.get('Top', 0)
+        return left, top, left + box['Width'], top + box.get('Height', 0)
+    return None
+
+
+def iou(a, b):
+    """Intersection over union of two corner boxes"""
+    width = min(a[2], b[2]) - max(a[0], b[0])
+    height = min(a[3], b[3]) - max(a[1], b[1])
+    if width <= 0 or height <= 0:
+        return 0.0
+    intersection = width * height
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - intersection
+    return intersection / union if union > 0 else 0.0
+
+
+def centroid_distance(a, b):
+    """Distance between box centers relative to the boxes' mean diagonal
+
+    Relative distances work for pixel and normalized boxes alike.
+    """
+    dx = (a[0] + a[2]) / 2 - (b[0] + b[2]) / 2
+    dy = (a[1] + a[3]) / 2 - (b[1] + b[3]) / 2
+    diagonal = (math.hypot(a[2] - a[0], a[3] - a[1]) + math.hypot(b[2] - b[0], b[3] - b[1])) / 2
+    return math.hypot(dx, dy) / diagonal if diagonal > 0 else math.inf
+
+
+def _finding_key(finding):
+    return (
+        finding.get('category', 'OTHER'),
+        finding.get('severity', 'LOW'),
+        finding.get('title', 'Unknown Issue'),
+    )
+
+
+class Track:
+    """One object (or one frame-level issue) followed across frames"""
+
+    def __init__(self, key, finding, frame, index):
+        self.key = key
+        self.peak = finding
+        self.confidences = [finding.get('confidence', 0.0)]
+        self.timestamps = [frame.timestamp] if frame is not None else []
+        self.last_index = index
+        self.last_box = box_corners(finding.get('bounding_box'))
+        self.pixel_boxes = 'x1' in (finding.get('bounding_box') or {})
+
+    def add(self, finding, frame, index):
+        confidence = finding.get('confidence', 0.0)
+        if index == self.last_index:
+            # A second box-less finding of the same title in the same frame
+            self.confidences[-1] = max(self.confidences[-1], confidence)
+        else:
+            self.confidences.append(confidence)
+            if frame is not None:
+                self.timestamps.append(frame.timestamp)
+        if confidence > self.peak.get('confidence', 0.0):
+            self.peak = finding
+        self.last_index = index
+        box = box_corners(finding.get('bounding_box'))
+        if box is not None:
+            self.last_box = box
+
+    def match_score(self, box, pixel_boxes):
+        """Sort key of a match with a box (lower is better), or None if it is not the same object"""
+        if self.last_box is None or pixel_boxes != self.pixel_boxes:
+            return None
+        overlap = iou(self.last_box, box)
+        if overlap >= settings.TRACKING_IOU_THRESHOLD:
+            return (0, -overlap)
+        distance = centroid_distance(self.last_box, box)
+        if distance <= settings.TRACKING_MAX_CENTROID_DISTANCE:
+            return (1, distance)
+        return None
+
+    def as_finding(self):
+        finding = dict(self.peak)
+        finding.update({
+            'confidence': max(self.confidences),
+            'average_confidence': sum(self.confidences) / len(self.confidences),
+            'affected_frame_count': len(self.confidences),
+            'first_timestamp': min(self.timestamps) if self.timestamps else None,
+            'last_timestamp': max(self.timestamps) if self.timestamps else None,
+        })
+        return finding
+
+
+def track_findings(frame_findings):
+    """Merge per-frame findings into one finding per tracked object
+
+    Args:
+        frame_findings: (frame, findings) pairs in the order the frames were
+            analyzed, including frames without findings so gaps are counted
+
+    Returns:
+        list: One finding dict per track, ordered by first appearance
+    """
+    tracks = []
+    max_missed = settings.TRACKING_MAX_MISSED_FRAMES
+
+    for index, (frame, findings) in enumerate(frame_findings):
+        active = [track for track in tracks if index - track.last_index <= max_missed + 1]
+
+        candidates = []
+        for finding_index, finding in enumerate(findings):
+            key = _finding_key(finding)
+            box = box_corners(finding.get('bounding_box'))
+
+            if box is None:
+                track = next((t for t in active if t.key == key and t.last_box is None), None)
+                if track is None:
+                    track = Track(key, finding, frame, index)
+                    tracks.append(track)
+                    active.append(track)
+                else:
+                    track.add(finding, frame, index)
+                continue
+
+            pixel_boxes = 'x1' in finding['bounding_box']
+            for track in active:
+                if track.key == key and track.last_index < index:
+                    score = track.match_score(box, pixel_boxes)
+                    if score is not None:
+                        candidates.append((score, finding_index, track))
+
+        # Greedy assignment, best IoU first, then nearest centroid
+        matched_findings, matched_tracks = set(), set()
+        for _, finding_index, track in sorted(candidates, key=lambda c: (c[0], c[1])):
+            if finding_index in matched_findings or id(track) in matched_tracks:
+                continue
+            track.add(findings[finding_index], frame, index)
+            matched_findings.add(finding_index)
+            matched_tracks.add(id(track))
+
+        for finding_index, finding in enumerate(findings):
+            if finding_index not in matched_findings and box_corners(finding.get('bounding_box')) is not None:
+                tracks.append(Track(_finding_key(finding), finding, frame, index))
+
+    return [track.as_finding() for track in tracks]
@@ -1,6 +1,8 @@
 from django.conf import settings
 import logging
 
+from .frame import Frame
+
 logger = logging.getLogger(__name__)
 
 
@@ -18,30 +20,42 @@ class YOLODetector:
             except Exception as e:
                 logger.error(f"Failed to load YOLO model: {e}")
 
-    def detect_objects(self, image_path):
-        """Detect objects using YOLOv8"""
+    def detect_objects(self, frame):
+        """Detect objects using YOLOv8
+
+        Args:
+            frame: Frame, or a frame file path
+        """
         if not self.model:
             return self._mock_detection()
 
         try:
-            results = self.model(image_path)
+            results = self._predict(Frame.coerce(frame))
             return self._process_yolo_results(results)
         except Exception as e:
             logger.error(f"YOLO detection error: {e}")
             return self._mock_detection()
 
-    def detect_uniform_compliance(self, image_path):
-        """Detect uniform-related objects"""
+    def detect_uniform_compliance(self, frame):
+        """Detect uniform-related objects
+
+        Args:
+            frame: Frame, or a frame file path
+        """
         if not self.model:
             return self._mock_uniform_detection()
 
         try:
-            results = self.model(image_path)
+            results = self._predict(Frame.coerce(frame))
             return self._process_uniform_results(results)
         except Exception as e:
             logger.error(f"YOLO uniform detection error: {e}")
             return self._mock_uniform_detection()
 
+    def _predict(self, frame):
+        """YOLO inference on the decoded frame, run once per frame for all YOLO checks"""
+        return frame.memo('yolo', lambda: self.model(frame.image))
+
     def _process_yolo_results(self, results):
         """Process YOLO detection results"""
         detections = []
@@ -122,7 +136,8 @@ class YOLODetector:
         uniform_classes = ['person', 'shirt', 'hat', 'apron', 'shoes', 'pants']
         return any(uc in class_name.lower() for uc in uniform_classes)
 
-    def _check_uniform_compliance(self, class_name):
+    @staticmethod
+    def _check_uniform_compliance(class_name):
         """Mock uniform compliance check"""
         # This would contain actual business logic for uniform compliance
         compliance_map = {
@@ -134,7 +149,8 @@ class YOLODetector:
         }
         return compliance_map.get(class_name.lower(), 'unknown')
 
-    def _calculate_uniform_score(self, uniform_objects):
+    @staticmethod
+    def _calculate_uniform_score(uniform_objects):
         """Calculate overall uniform compliance score"""
         if not uniform_objects:
             return 100.0
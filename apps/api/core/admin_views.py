@@ -71,7 +71,7 @@ def admin_queue_status(request):
         )
 
         recent_inspections = Inspection.objects.filter(
-            status__in=['PENDING', 'PROCESSING']
+            status__in=['PENDING', 'PROCESSING', 'PARTIAL']
         ).select_related('video').order_by('-created_at')[:20]
 
         inspection_data = []
@@ -94,7 +94,7 @@ def admin_queue_status(request):
             'processing_uploads': Upload.objects.filter(status='processing').count(),
             'processing_videos': Video.objects.filter(status='PROCESSING').count(),
             'pending_inspections': Inspection.objects.filter(status='PENDING').count(),
-            'processing_inspections': Inspection.objects.filter(status='PROCESSING').count(),
+            'processing_inspections': Inspection.objects.filter(status__in=['PROCESSING', 'PARTIAL']).count(),
         }
 
         return Response({
@@ -0,0 +1,189 @@
+"""
+Distributed locks and idempotency keys for background processing.
+
+Pipeline runs hold a Redis lease lock on the resource they process (an upload,
+a video or an inspection) so duplicate API calls, retried requests and
+redelivered Celery messages cannot start a second run. The lock token travels
+with the pipeline payload; every stage renews the lease while it runs and the
+final stage releases it. If Redis is unreachable the locks fail open so
+processing is never blocked by the lock layer itself.
+"""
+import json
+import logging
+import threading
+import uuid
+from contextlib import contextmanager
+
+import redis
+from celery.exceptions import Ignore
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Only touch the key when it still holds our token
+RENEW_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+_client = None
+
+
+def get_redis_client():
+    """Shared Redis client for locks and idempotency keys"""
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(
+            settings.REDIS_URL,
+            socket_connect_timeout=2,
+            socket_timeout=2,
+            decode_responses=True,
+        )
+    return _client
+
+
+class PipelineLock:
+    """Redis lease lock identified by a key and owned through a random token"""
+
+    def __init__(self, key, token=None, ttl=None):
+        self.key = key
+        self.token = token or uuid.uuid4().hex
+        self.ttl = ttl or settings.PIPELINE_LOCK_TTL_SECONDS
+
+    @classmethod
+    def for_resource(cls, kind, resource_id, token=None):
+        return cls(f"lock:pipeline:{kind}:{resource_id}", token=token)
+
+    @classmethod
+    def from_payload(cls, payload):
+        """Rebuild the lock carried by a pipeline payload, if any"""
+        lock = payload.get('lock')
+        if not lock:
+            return None
+        return cls(lock['key'], token=lock['token'])
+
+    def as_payload(self):
+        return {'key': self.key, 'token': self.token}
+
+    def acquire(self):
+        """Take the lock, or confirm we already own it
+
+        Returns:
+            bool: False when another run holds the lock
+        """
+        try:
+            client = get_redis_client()
+            if client.set(self.key, self.token, nx=True, px=self.ttl * 1000):
+                return True
+            return bool(client.eval(RENEW_SCRIPT, 1, self.key, self.token, self.ttl * 1000))
+        except redis.RedisError as e:
+            logger.warning(f"Redis unavailable, proceeding without lock {self.key}: {e}")
+            return True
+
+    def renew(self):
+        """Extend the lease; False when the lock expired or was taken over"""
+        try:
+            return bool(get_redis_client().eval(RENEW_SCRIPT, 1, self.key, self.token, self.ttl * 1000))
+        except redis.RedisError as e:
+            logger.warning(f"Redis unavailable, could not renew lock {self.key}: {e}")
+            return True
+
+    def release(self):
+        try:
+            get_redis_client().eval(RELEASE_SCRIPT, 1, self.key, self.token)
+        except redis.RedisError as e:
+            logger.warning(f"Redis unavailable, could not release lock {self.key}: {e}")
+
+    def is_held(self):
+        """True when any run currently holds this lock"""
+        try:
+            return get_redis_client().get(self.key) is not None
+        except redis.RedisError:
+            return False
+
+    @contextmanager
+    def keep_alive(self):
+        """Renew the lease in the background for the duration of the block"""
+        stopped = threading.Event()
+        interval = max(self.ttl / 3, 1)
+
+        def renew_until_stopped():
+            while not stopped.wait(interval):
+                if not self.renew():
+                    logger.warning(f"Lost pipeline lock {self.key} while running")
+                    return
+
+        renewer = threading.Thread(target=renew_until_stopped, daemon=True)
+        renewer.start()
+        try:
+            yield self
+        finally:
+            stopped.set()
+            renewer.join(timeout=1)
+
+
+@contextmanager
+def pipeline_lease(payload):
+    """Hold the pipeline lock of a payload while a stage runs
+
+    Stops the chain (Celery Ignore) when the lock has been taken over by a
+    newer run, e.g. after this run's lease expired on a dead worker.
+    """
+    lock = PipelineLock.from_payload(payload)
+    if lock is None:
+        yield None
+        return
+
+    if not lock.acquire():
+        logger.warning(f"Pipeline lock {lock.key} is held by another run, stopping stage")
+        raise Ignore()
+
+    with lock.keep_alive():
+        yield lock
+
+
+def release_pipeline_lock(payload):
+    """Release the lock of a finished or abandoned pipeline run"""
+    lock = PipelineLock.from_payload(payload)
+    if lock is not None:
+        lock.release()
+
+
+def claim_idempotency_key(key):
+    """Record an idempotency key; False when it was already claimed"""
+    try:
+        return bool(get_redis_client().set(
+            f"idempotency:{key}", '{}', nx=True, ex=settings.IDEMPOTENCY_KEY_TTL_SECONDS
+        ))
+    except redis.RedisError as e:
+        logger.warning(f"Redis unavailable, not enforcing idempotency key {key}: {e}")
+        return True
+
+
+def get_idempotent_response(key):
+    """Response data stored for an idempotency key, or None"""
+    try:
+        data = get_redis_client().get(f"idempotency:response:{key}")
+    except redis.RedisError:
+        return None
+    return json.loads(data) if data else None
+
+
+def store_idempotent_response(key, data):
+    try:
+        get_redis_client().set(
+            f"idempotency:response:{key}",
+            json.dumps(data, default=str),
+            ex=settings.IDEMPOTENCY_KEY_TTL_SECONDS,
+        )
+    except redis.RedisError as e:
+        logger.warning(f"Redis unavailable, could not store response for idempotency key {key}: {e}")
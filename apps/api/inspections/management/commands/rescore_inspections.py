@@ -0,0 +1,77 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from inspections.models import Inspection
+from inspections.rescoring import InspectionRescorer
+from inspections.tasks import rescore_from_detections, rescore_inspections_task
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute inspection scores without calling AI services: scores and AI findings of '
+        'given inspections from stored detections, or with --all the scores of every completed inspection'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--inspection', type=int, action='append', help='Inspection id (repeatable)')
+        parser.add_argument('--upload', type=int, action='append', help='Re-score the inspections of an upload (repeatable)')
+        parser.add_argument('--all', action='store_true', help='Re-score the scores of all completed inspections in chunks')
+        parser.add_argument('--after-id', type=int, default=0, help='With --all, resume after this inspection id')
+        parser.add_argument('--chunk-size', type=int, default=settings.RESCORE_CHUNK_SIZE, help='Inspections per chunk')
+        parser.add_argument('--processes', type=int, default=os.cpu_count() or 1,
+                            help='Scoring processes, 0 to score in this process')
+        parser.add_argument('--pause', type=float, default=settings.RESCORE_PAUSE_SECONDS,
+                            help='Seconds to sleep between chunks')
+        parser.add_argument('--dry-run', action='store_true', help='With --all, count changes without writing them')
+        parser.add_argument('--queue', action='store_true', help='With --all, run as a background Celery job instead')
+
+    def handle(self, *args, **options):
+        if options['all']:
+            return self.rescore_all(options)
+        if not options['inspection'] and not options['upload']:
+            raise CommandError('Pass --inspection, --upload or --all')
+
+        inspections = Inspection.objects.none()
+        if options['inspection']:
+            inspections |= Inspection.objects.filter(id__in=options['inspection'])
+        if options['upload']:
+            inspections |= Inspection.objects.filter(videos__upload_id__in=options['upload'])
+
+        rescored = skipped = 0
+        for inspection in inspections.distinct().order_by('id'):
+            previous = inspection.overall_score
+            if rescore_from_detections(inspection):
+                rescored += 1
+                self.stdout.write(f'Inspection {inspection.id}: overall score {previous} -> {inspection.overall_score:.1f}')
+            else:
+                skipped += 1
+                self.stdout.write(self.style.WARNING(f'Inspection {inspection.id}: no stored detections, skipped'))
+
+        self.stdout.write(self.style.SUCCESS(f'\nRe-scored {rescored} inspections, skipped {skipped}'))
+
+    def rescore_all(self, options):
+        if options['queue']:
+            rescore_inspections_task.delay(options['after_id'])
+            self.stdout.write(self.style.SUCCESS('Queued the re-scoring job'))
+            return
+
+        def progress(rescorer):
+            self.stdout.write(
+                f'{rescorer.rows} inspections, {rescorer.updated} changed, {rescorer.rows_per_second:.0f} rows/s'
+            )
+
+        rescorer = InspectionRescorer(
+            chunk_size=options['chunk_size'], processes=options['processes'], dry_run=options['dry_run']
+        )
+        try:
+            rescorer.run(options['after_id'], pause_seconds=options['pause'], progress=progress)
+        finally:
+            rescorer.shutdown()
+
+        verb = 'would change' if options['dry_run'] else 'changed'
+        self.stdout.write(self.style.SUCCESS(
+            f'\nRe-scored {rescorer.rows} inspections ({rescorer.updated} {verb}) '
+            f'at {rescorer.rows_per_second:.0f} rows/s'
+        ))
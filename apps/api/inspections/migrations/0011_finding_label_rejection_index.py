@@ -0,0 +1,22 @@
+# Generated by Django 4.2.30 on 2026-10-19 03:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inspections', '0010_add_textfield_defaults'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='finding',
+            name='label',
+            field=models.CharField(blank=True, default='', help_text='Detected object label, if any', max_length=200),
+        ),
+        migrations.AddIndex(
+            model_name='finding',
+            index=models.Index(fields=['is_rejected', 'rejected_at'], name='findings_is_reje_d7966b_idx'),
+        ),
+    ]
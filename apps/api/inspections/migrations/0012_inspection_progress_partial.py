@@ -0,0 +1,30 @@
+# Generated by Django 4.2.30 on 2026-10-19 03:26
+
+from django.db import migrations, models
+
+
+def mark_completed_inspections_analyzed(apps, schema_editor):
+    """Existing completed inspections had every frame analyzed"""
+    Inspection = apps.get_model('inspections', 'Inspection')
+    Inspection.objects.filter(status='COMPLETED').update(progress=1.0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inspections', '0011_finding_label_rejection_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inspection',
+            name='progress',
+            field=models.FloatField(default=0.0, help_text='Fraction of frames analyzed 0-1'),
+        ),
+        migrations.AlterField(
+            model_name='inspection',
+            name='status',
+            field=models.CharField(choices=[('PENDING', 'Pending'), ('PROCESSING', 'Processing'), ('PARTIAL', 'Partial results'), ('COMPLETED', 'Completed'), ('FAILED', 'Failed')], default='PENDING', max_length=20),
+        ),
+        migrations.RunPython(mark_completed_inspections_analyzed, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
 
 
@@ -10,6 +10,7 @@ class Inspection(models.Model):
     class Status(models.TextChoices):
         PENDING = 'PENDING', 'Pending'
         PROCESSING = 'PROCESSING', 'Processing'
+        PARTIAL = 'PARTIAL', 'Partial results'
         COMPLETED = 'COMPLETED', 'Completed'
         FAILED = 'FAILED', 'Failed'
 
@@ -21,6 +22,7 @@ class Inspection(models.Model):
 
     mode = models.CharField(max_length=20, choices=Mode.choices)
     status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
+    progress = models.FloatField(default=0.0, help_text="Fraction of frames analyzed 0-1")
 
     # Enterprise mode fields
     assigned_inspector = models.ForeignKey(
@@ -62,8 +64,19 @@ class Inspection(models.Model):
 
     @property
     def video(self):
-        """Backward compatibility property - returns first video"""
-        return self.videos.first() if self.videos.exists() else None
+        """Backward compatibility property - returns the first uploaded video"""
+        return self.videos.order_by('created_at', 'id').first()
+
+    def update_ai_analysis(self, change):
+        """Replace ai_analysis with change(stored ai_analysis) under a row lock and save
+
+        Concurrent writers (analysis stages, on-demand range analyses) thereby
+        never write back a stale copy over each other's keys.
+        """
+        with transaction.atomic():
+            stored = Inspection.objects.select_for_update().values_list('ai_analysis', flat=True).get(pk=self.pk)
+            self.ai_analysis = change(stored or {})
+            self.save(update_fields=['ai_analysis', 'updated_at'])
 
 
 class Finding(models.Model):
@@ -94,6 +107,7 @@ class Finding(models.Model):
     description = models.TextField()
     confidence = models.FloatField(help_text="AI confidence score 0-1 (max when consolidated)")
     bounding_box = models.JSONField(null=True, blank=True, help_text="Object detection coordinates")
+    label = models.CharField(max_length=200, blank=True, default='', help_text="Detected object label, if any")
     recommended_action = models.TextField(blank=True)
     is_resolved = models.BooleanField(default=False)
 
@@ -142,6 +156,9 @@ class Finding(models.Model):
     class Meta:
         db_table = 'findings'
         ordering = ['-severity', '-confidence', 'created_at']
+        indexes = [
+            models.Index(fields=['is_rejected', 'rejected_at']),
+        ]
 
     def __str__(self):
         return f"{self.category} - {self.title}"
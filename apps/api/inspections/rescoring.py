@@ -0,0 +1,218 @@
+"""
+Bulk re-scoring of historical inspections.
+
+When the scoring weights (VideoAnalyzer._calculate_overall_score) or the
+deductions in calculate_inspection_scores change, completed inspections are
+re-scored from their stored frame analyses, or from the upload's stored
+detections when an inspection has none, without calling any AI service.
+
+Designed to run against a live database: inspections are walked in primary
+key order in chunks (keyset pagination, no OFFSET), each chunk reads only the
+columns it needs, scoring runs in a process pool outside any transaction, and
+only rows whose scores changed are written, with one bulk_update per chunk
+touching nothing but the score columns (and one for the scorecards of the
+uploads whose inspection scores changed). The write locks the chunk's rows
+and skips those updated since they were read (e.g. re-analyzed meanwhile),
+so fresh scores are never overwritten with stale ones.
+"""
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import groupby
+from operator import attrgetter
+
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+SCORE_FIELDS = [
+    'overall_score', 'ppe_score', 'safety_score', 'cleanliness_score', 'food_safety_score',
+    'equipment_score', 'operational_score', 'food_quality_score', 'staff_behavior_score',
+    'uniform_score', 'menu_board_score',
+]
+
+
+def pool_processes(requested):
+    """Scoring processes this process may start: 0 inside daemonic worker processes"""
+    import billiard
+
+    if multiprocessing.current_process().daemon or billiard.current_process().daemon:
+        return 0
+    return requested
+
+
+def _init_worker():
+    import django
+    django.setup()
+
+
+def score_frame_analyses(frame_analyses):
+    """Inspection scores of stored frame analyses under the current scoring rules
+
+    Each frame's overall score is recomputed too, as it was stored with the
+    weights in effect when the frame was analyzed.
+    """
+    from ai_services.analyzer import VideoAnalyzer
+    from .tasks import calculate_inspection_scores
+
+    scorer = VideoAnalyzer.for_scoring()
+    analyses = [
+        analysis if 'error' in analysis else {**analysis, 'overall_score': scorer._calculate_overall_score(analysis)}
+        for analysis in frame_analyses
+    ]
+    return calculate_inspection_scores(analyses)
+
+
+def _analyses_from_detections(inspections):
+    """Frame analyses rebuilt from stored detections, per inspection id"""
+    from ai_services.analyzer import VideoAnalyzer
+    from ai_services.detections import frame_analysis_from_detections
+    from uploads.models import Detection
+    from videos.models import Video
+
+    videos = list(
+        Video.objects.filter(inspection__in=inspections, upload__isnull=False)
+        .order_by('created_at', 'id').values_list('inspection_id', 'upload_id')
+    )
+    if not videos:
+        return {}
+
+    scorer = VideoAnalyzer.for_scoring()
+    analyses = {}
+    rows = Detection.objects.filter(upload_id__in={upload_id for _, upload_id in videos}).order_by(
+        'upload_id', 'frame_ts_ms', 'id'
+    )
+    for (upload_id, _), frame_rows in groupby(rows.iterator(), key=attrgetter('upload_id', 'frame_ts_ms')):
+        analyses.setdefault(upload_id, []).append(frame_analysis_from_detections(frame_rows, scorer))
+
+    # A multi-video inspection is scored from the detections of all of its videos
+    by_inspection = {}
+    for inspection_id, upload_id in videos:
+        by_inspection.setdefault(inspection_id, []).extend(analyses.get(upload_id, []))
+    return {inspection_id: frame_analyses for inspection_id, frame_analyses in by_inspection.items() if frame_analyses}
+
+
+class InspectionRescorer:
+    """Re-scores completed inspections chunk by chunk
+
+    Args:
+        chunk_size: Inspections read and written per chunk
+        processes: Scoring processes; 0 scores in this process (required
+            inside Celery prefork workers, which cannot have children)
+        dry_run: Compute scores without writing them
+    """
+
+    def __init__(self, chunk_size=500, processes=0, dry_run=False):
+        self.chunk_size = chunk_size
+        self.processes = processes
+        self.dry_run = dry_run
+        self.executor = None
+        if processes > 0:
+            self.executor = ProcessPoolExecutor(
+                max_workers=processes,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+            )
+        self.rows = 0
+        self.updated = 0
+        self.started = time.monotonic()
+
+    @property
+    def rows_per_second(self):
+        elapsed = time.monotonic() - self.started
+        return self.rows / elapsed if elapsed > 0 else 0.0
+
+    def _score(self, payloads):
+        if self.executor is not None:
+            return list(self.executor.map(score_frame_analyses, payloads, chunksize=max(1, len(payloads) // self.processes)))
+        return [score_frame_analyses(payload) for payload in payloads]
+
+    def rescore_chunk(self, after_id=0, queryset=None):
+        """Re-score the next chunk of inspections with an id above after_id
+
+        Returns:
+            int or None: Last id of the chunk, None when there are no more
+        """
+        # Imported here: spawned scoring workers import this module before django.setup()
+        from .models import Inspection
+        from uploads.scorecards import refresh_scorecards
+
+        queryset = queryset if queryset is not None else Inspection.objects.all()
+        inspections = list(
+            queryset.filter(status=Inspection.Status.COMPLETED, id__gt=after_id)
+            .order_by('id')
+            .only('id', 'ai_analysis', 'updated_at', *SCORE_FIELDS)[:self.chunk_size]
+        )
+        if not inspections:
+            return None
+
+        missing = [inspection.id for inspection in inspections if not inspection.ai_analysis.get('frame_analyses')]
+        detection_analyses = _analyses_from_detections(missing) if missing else {}
+
+        scored = []
+        payloads = []
+        for inspection in inspections:
+            analyses = inspection.ai_analysis.get('frame_analyses') or detection_analyses.get(inspection.id)
+            if analyses:
+                scored.append(inspection)
+                payloads.append(analyses)
+
+        changed = []
+        for inspection, scores in zip(scored, self._score(payloads)):
+            if any(getattr(inspection, field) != scores[field] for field in SCORE_FIELDS):
+                for field in SCORE_FIELDS:
+                    setattr(inspection, field, scores[field])
+                changed.append(inspection)
+
+        if changed and not self.dry_run:
+            with transaction.atomic():
+                current = dict(
+                    Inspection.objects.select_for_update()
+                    .filter(id__in=[inspection.id for inspection in changed], status=Inspection.Status.COMPLETED)
+                    .values_list('id', 'updated_at')
+                )
+                skipped = len(changed)
+                changed = [inspection for inspection in changed if current.get(inspection.id) == inspection.updated_at]
+                skipped -= len(changed)
+                Inspection.objects.bulk_update(changed, SCORE_FIELDS)
+                refresh_scorecards(changed)
+            if skipped:
+                logger.info(f"Skipped {skipped} inspections updated while they were re-scored")
+
+        self.rows += len(inspections)
+        self.updated += len(changed)
+        return inspections[-1].id
+
+    def run(self, after_id=0, queryset=None, max_chunks=None, pause_seconds=0.0, progress=None):
+        """Re-score chunks until done or max_chunks were processed
+
+        Args:
+            pause_seconds: Sleep between chunks to limit load on a live database
+            progress: Called with the rescorer after every chunk
+
+        Returns:
+            int or None: Id to resume after, None when every inspection was done
+        """
+        chunks = 0
+        try:
+            while max_chunks is None or chunks < max_chunks:
+                last_id = self.rescore_chunk(after_id, queryset)
+                if last_id is None:
+                    return None
+                after_id = last_id
+                chunks += 1
+                if progress:
+                    progress(self)
+                if pause_seconds:
+                    time.sleep(pause_seconds)
+            return after_id
+        finally:
+            logger.info(
+                f"Re-scored {self.rows} inspections ({self.updated} changed) "
+                f"at {self.rows_per_second:.0f} rows/s"
+            )
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown()
@@ -40,6 +40,7 @@ class InspectionSerializer(serializers.ModelSerializer):
     findings_count = serializers.SerializerMethodField()
     critical_findings_count = serializers.SerializerMethodField()
     open_actions_count = serializers.SerializerMethodField()
+    video_progress = serializers.SerializerMethodField()
 
     class Meta:
         model = Inspection
@@ -54,6 +55,18 @@ class InspectionSerializer(serializers.ModelSerializer):
     def get_open_actions_count(self, obj):
         return obj.action_items.filter(status='OPEN').count()
 
+    def get_video_progress(self, obj):
+        """Analysis progress of each of the inspection's videos"""
+        return [
+            {
+                'video_id': video.id,
+                'title': video.title,
+                'status': video.status,
+                'progress': video.analysis_progress(obj.id),
+            }
+            for video in obj.videos.order_by('created_at', 'id')
+        ]
+
 
 class InspectionListSerializer(serializers.ModelSerializer):
     video_title = serializers.CharField(source='title', read_only=True)
@@ -63,7 +76,7 @@ class InspectionListSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Inspection
-        fields = ('id', 'mode', 'status', 'overall_score', 'video_title', 'store_name',
+        fields = ('id', 'mode', 'status', 'progress', 'overall_score', 'video_title', 'store_name',
                  'findings_count', 'critical_findings_count', 'expires_at', 'created_at')
 
     def get_findings_count(self, obj):
@@ -0,0 +1,156 @@
+"""
+Per-store suppression of known false positives.
+
+Managers reject the same false positives at a store over and over (a
+decorative sign flagged as a blocked exit, a cup on a shelf). The findings
+they rejected recently are indexed by (category, title, object label, box
+region), the region being the cell of a FINDING_SUPPRESSION_GRID grid the
+box center falls in. New findings matching the index are downgraded one
+severity level, or dropped once the match was rejected
+FINDING_SUPPRESSION_MIN_REJECTIONS times, before any recommendation is
+generated or row written for them, and before the brand's rules are checked
+against them.
+"""
+import logging
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from ai_services.tracking import box_corners
+from .models import Finding
+
+logger = logging.getLogger(__name__)
+
+SEVERITY_DOWNGRADES = {
+    Finding.Severity.CRITICAL: Finding.Severity.HIGH,
+    Finding.Severity.HIGH: Finding.Severity.MEDIUM,
+    Finding.Severity.MEDIUM: Finding.Severity.LOW,
+    Finding.Severity.LOW: Finding.Severity.LOW,
+}
+
+
+def box_region(box, frame=None):
+    """Grid cell (column, row) of a box's center, or None without a usable box
+
+    Pixel boxes are normalized by the frame's size; Rekognition boxes are
+    already relative.
+    """
+    corners = box_corners(box)
+    if corners is None:
+        return None
+    x1, y1, x2, y2 = corners
+    if 'x1' in box:
+        if frame is None or not frame.width or not frame.height:
+            return None
+        x1, x2 = x1 / frame.width, x2 / frame.width
+        y1, y2 = y1 / frame.height, y2 / frame.height
+
+    grid = settings.FINDING_SUPPRESSION_GRID
+    column = min(grid - 1, max(0, int((x1 + x2) / 2 * grid)))
+    row = min(grid - 1, max(0, int((y1 + y2) / 2 * grid)))
+    return column, row
+
+
+def suppression_key(category, title, label, box, frame=None):
+    return category, title, (label or '').lower(), box_region(box, frame)
+
+
+class SuppressionIndex:
+    """Rejection counts of a store's recently rejected findings by suppression key"""
+
+    def __init__(self, rejections=None):
+        self.rejections = rejections or Counter()
+
+    @classmethod
+    def for_store(cls, store_id):
+        cutoff = timezone.now() - timedelta(days=settings.FINDING_SUPPRESSION_LOOKBACK_DAYS)
+        rejected = (
+            Finding.objects.filter(inspection__store_id=store_id, is_rejected=True, rejected_at__gte=cutoff)
+            .select_related('frame')
+            .only('category', 'title', 'label', 'bounding_box', 'frame__width', 'frame__height')
+        )
+        return cls(Counter(
+            suppression_key(finding.category, finding.title, finding.label, finding.bounding_box, finding.frame)
+            for finding in rejected
+        ))
+
+    def apply(self, findings_data):
+        """Drop or downgrade findings matching rejected ones
+
+        Returns:
+            tuple: (kept finding dicts, suppressed count, downgraded count)
+        """
+        if not self.rejections:
+            return list(findings_data), 0, 0
+
+        kept = []
+        suppressed = downgraded = 0
+        for finding_data in findings_data:
+            rejections = self.rejections.get(suppression_key(
+                finding_data.get('category', 'OTHER'),
+                finding_data.get('title', 'Unknown Issue'),
+                finding_data.get('label'),
+                finding_data.get('bounding_box'),
+                finding_data.get('frame'),
+            ), 0)
+            if rejections >= settings.FINDING_SUPPRESSION_MIN_REJECTIONS:
+                suppressed += 1
+                continue
+            if rejections:
+                severity = finding_data.get('severity', 'LOW')
+                finding_data = {**finding_data, 'severity': SEVERITY_DOWNGRADES.get(severity, severity)}
+                downgraded += 1
+            kept.append(finding_data)
+        return kept, suppressed, downgraded
+
+
+def suppress_known_false_positives(inspection, findings_data, summary=None):
+    """Apply the store's suppression index to an inspection's candidate findings
+
+    Args:
+        summary: Dict to record the counts in; defaults to the inspection's
+            analysis summary, which is saved
+
+    Returns:
+        list: Finding dicts to create
+    """
+    if not settings.FINDING_SUPPRESSION_ENABLED or not findings_data:
+        return findings_data
+
+    kept, suppressed, downgraded = SuppressionIndex.for_store(inspection.store_id).apply(findings_data)
+
+    counts = {'findings_suppressed': suppressed, 'findings_downgraded': downgraded}
+    if summary is None:
+        inspection.update_ai_analysis(lambda stored: {
+            **stored, 'analysis_summary': {**stored.get('analysis_summary', {}), **counts},
+        })
+    else:
+        summary.update(counts)
+
+    if suppressed or downgraded:
+        logger.info(
+            f"Inspection {inspection.id}: suppressed {suppressed} and downgraded {downgraded} "
+            f"findings matching rejected false positives"
+        )
+    return kept
+
+
+def suppress_frame_findings(store_id, frame_findings):
+    """Apply the store's suppression index to the findings of each analyzed frame
+
+    The brand's rules are evaluated on the result, so findings suppressed or
+    downgraded as known false positives raise no (or less severe) violations.
+
+    Args:
+        frame_findings: (frame, finding dicts) pairs
+
+    Returns:
+        list: (frame, kept finding dicts) pairs
+    """
+    if not settings.FINDING_SUPPRESSION_ENABLED:
+        return frame_findings
+
+    index = SuppressionIndex.for_store(store_id)
+    return [(frame, index.apply(findings)[0]) for frame, findings in frame_findings]
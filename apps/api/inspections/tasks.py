@@ -1,123 +1,777 @@
-import os
-import tempfile
-from celery import shared_task
+import math
+from itertools import groupby, takewhile
+from operator import attrgetter
+from celery import shared_task, chain, group
 from django.utils import timezone
 from django.conf import settings
 from django.core.files.storage import default_storage
+from django.db import transaction
 from .models import Inspection, Finding, ActionItem
+from .suppression import suppress_frame_findings, suppress_known_false_positives
 from ai_services.analyzer import VideoAnalyzer
+from ai_services.frame import Frame
 from ai_services.bedrock_service import BedrockRecommendationService
+from ai_services.detections import flatten_frame_analysis, frame_analysis_from_detections
+from ai_services.engines import ENGINES
+from ai_services.mosaic import MOSAIC_TILES
+from ai_services.rekognition import RekognitionService
+from ai_services.tracking import track_findings
+from uploads.models import Detection, Upload
+from uploads.rule_engine import RuleEngine, create_violations
+from uploads.scorecards import build_scorecards
+from videos.frame_policy import frame_policy, record_frame_budget, scores_stable
+from core.locks import PipelineLock, pipeline_lease, release_pipeline_lock
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Order of preliminary top findings
+SEVERITY_RANKS = {
+    Finding.Severity.CRITICAL: 4,
+    Finding.Severity.HIGH: 3,
+    Finding.Severity.MEDIUM: 2,
+    Finding.Severity.LOW: 1,
+}
+
 
 @shared_task(bind=True)
-def analyze_video(self, inspection_id):
-    """Analyze video for AI inspection"""
-    try:
-        inspection = Inspection.objects.get(id=inspection_id)
-        inspection.status = Inspection.Status.PROCESSING
-        inspection.save()
-
-        # Get first video (backward compatible property - returns inspection.videos.first())
-        video = inspection.video
-        if not video:
-            raise Exception("No video found for this inspection")
-
-        analyzer = VideoAnalyzer()
-
-        # Get video frames
-        frames = video.frames.all().order_by('timestamp')
-        if not frames.exists():
-            raise Exception("No frames found for video analysis")
-
-        all_analyses = []
-        all_findings = []
-        
-        # Analyze each frame
-        for frame in frames:
-            temp_frame_path = None
-            try:
-                # Download frame from S3 to temp file
-                with tempfile.NamedTemporaryFile(delete=False, suffix='.jpg') as tmp_file:
-                    # Read from S3
-                    with default_storage.open(frame.image.name, 'rb') as s3_file:
-                        frame_bytes = s3_file.read()
-                        tmp_file.write(frame_bytes)
-                        temp_frame_path = tmp_file.name
-
-                # Analyze frame
-                frame_analysis = analyzer.analyze_frame(temp_frame_path, frame_bytes)
+def analyze_video(self, inspection_id, lock_key=None, lock_token=None, idempotency_key=None):
+    """Analyze video for AI inspection
+
+    Thin wrapper that runs the analyze and persist pipeline stages for an
+    inspection whose frames are already stored. The run holds the
+    inspection's pipeline lock unless the caller hands over a lock it already
+    holds (e.g. the upload lock taken by a reprocess request).
+
+    The videos of a multi-video inspection are analyzed by parallel chains
+    sharing the lock; the chain finishing last merges the results and
+    releases it.
+    """
+    from videos.tasks import claim_task_idempotency_key, start_pipeline
+
+    if not claim_task_idempotency_key(self, idempotency_key):
+        return f"Inspection {inspection_id} already queued (duplicate request)"
+
+    if lock_key:
+        lock = PipelineLock(lock_key, token=lock_token)
+    else:
+        lock = PipelineLock.for_resource('inspection', inspection_id, token=lock_token)
+    if not lock.acquire():
+        return f"Inspection {inspection_id} is already being analyzed"
+
+    video_ids = list(Inspection.objects.get(id=inspection_id).videos.order_by('created_at', 'id').values_list('id', flat=True))
+    if len(video_ids) > 1:
+        pipeline = group(
+            chain(
+                analyze_frames_stage.s({
+                    'inspection_id': inspection_id, 'video_id': video_id,
+                    'lock': lock.as_payload(), 'lock_shared': True,
+                }),
+                persist_results_stage.s(),
+            )
+            for video_id in video_ids
+        )
+    else:
+        pipeline = chain(
+            analyze_frames_stage.s({'inspection_id': inspection_id, 'lock': lock.as_payload()}),
+            persist_results_stage.s(),
+        )
+    start_pipeline(pipeline, lock)
+    return f"Inspection {inspection_id} queued for analysis"
+
+
+def _fail_analysis_stage(task, payload, exc):
+    """Mark the inspection failed and retry only the failing stage"""
+    inspection = Inspection.objects.get(id=payload['inspection_id'])
+    inspection.status = Inspection.Status.FAILED
+    inspection.error_message = str(exc)
+    inspection.save(update_fields=['status', 'error_message', 'updated_at'])
+
+    # Update video status to failed (if exists)
+    video = _analysis_video(inspection, payload)
+    if video:
+        video.status = 'FAILED'
+        video.save()
+
+    if task.request.retries >= task.max_retries:
+        if payload.get('upload_id') and not payload.get('reprocess'):
+            Upload.objects.filter(id=payload['upload_id']).update(
+                status=Upload.Status.FAILED, error_message=str(exc)
+            )
+        release_pipeline_lock(payload)
+
+    logger.error(f"Inspection analysis failed: {exc}")
+    raise task.retry(exc=exc, countdown=60)
+
+
+def _analysis_video(inspection, payload):
+    """Video a pipeline run analyzes: the payload's video, or the inspection's first one"""
+    if payload.get('video_id'):
+        video = inspection.videos.filter(id=payload['video_id']).first()
+        if video:
+            return video
+    return inspection.video
+
+
+def inspection_analysis_progress(inspection):
+    """Mean analysis progress of an inspection's videos"""
+    progress = [video.analysis_progress(inspection.id) for video in inspection.videos.all()]
+    return sum(progress) / len(progress) if progress else 0.0
+
+
+@shared_task(bind=True, max_retries=3)
+def analyze_frames_stage(self, payload):
+    """API stage: run AI analysis over every stored frame of one video of the inspection
+
+    Each frame's analysis is checkpointed on the VideoFrame as soon as it
+    completes, so a retry of the same inspection only analyzes the frames that
+    are still missing, and reanalysis for a new inspection only re-runs the
+    detector engines whose version or configuration changed. Blurred or
+    badly exposed frames are skipped unless no frame passes the quality gate.
+
+    The video's progress and, once done, its frame ids, summary and findings
+    are checkpointed on the video. The run finishing the inspection's last
+    video merges the results of all videos (merge_video_results): frame
+    analyses are saved on the inspection and findings are passed on to the
+    persist stage with frame ids instead of model instances.
+
+    In progressive mode (coaching inspections) a few spread-out keyframes are
+    analyzed first and published as a PARTIAL inspection with a preliminary
+    score; the final result is the same as without progressive mode. A frame
+    policy with a stability window stops the analysis once the category
+    scores stay within its band, and the result covers the frames analyzed.
+    """
+    with pipeline_lease(payload):
+        try:
+            if payload.get('deduplicated_from'):
+                return payload
+
+            inspection = Inspection.objects.get(id=payload['inspection_id'])
+            inspection.status = Inspection.Status.PROCESSING
+            inspection.save(update_fields=['status', 'updated_at'])
+
+            video = _analysis_video(inspection, payload)
+            if not video:
+                raise Exception("No video found for this inspection")
+            payload['video_id'] = video.id
+
+            analyzer = VideoAnalyzer(store_id=video.store_id)
+            plan = plan_frame_analysis(analyzer)
+
+            # Get video frames
+            frames = list(video.frames.filter(is_supplemental=False).order_by('timestamp'))
+            if not frames:
+                raise Exception("No frames found for video analysis")
+
+            usable_frames = [frame for frame in frames if frame.passes_quality_gate]
+            if not usable_frames:
+                # Analyze the sharpest frame rather than producing an empty inspection
+                usable_frames = [max(frames, key=lambda frame: frame.sharpness or 0)]
+            skipped_low_quality = len(frames) - len(usable_frames)
+
+            # Frame checkpoints are only valid for the inspection that produced them
+            checkpoint = video.processing_checkpoint.get('analysis', {})
+            resuming = checkpoint.get('inspection_id') == inspection.id
+            if not resuming:
+                video.update_checkpoint(analysis={'inspection_id': inspection.id, 'frames_analyzed': 0})
+
+            is_last_attempt = self.request.retries >= self.max_retries
+            all_analyses = []
+            frame_findings = []
+            failed_frames = []
+
+            # Analyze the frames not checkpointed yet, in batches of frames_per_call. Frames
+            # analyzed for an earlier inspection only re-run the engines that changed since.
+            pending = [
+                frame for frame in usable_frames
+                if frame.ai_analysis is None or (not resuming and analyzer.stale_engines(frame.ai_analysis))
+            ]
+            # Progressive mode analyzes spread-out keyframes first and publishes a preliminary result
+            # (single-video inspections only, as the preliminary result covers one video)
+            progressive = (
+                settings.PROGRESSIVE_ANALYSIS_ENABLED and inspection.mode == Inspection.Mode.COACHING
+                and inspection.videos.count() == 1
+                and not inspection.uploads.filter(status=Upload.Status.PROCESSING).exclude(videos__inspection=inspection).exists()
+            )
+            # Batches are cut in timestamp order whichever order they run in, so progressive mode
+            # analyzes the same batches (e.g. label mosaics) as a regular run
+            batch_size = plan['frames_per_call']
+            batches = [pending[start:start + batch_size] for start in range(0, len(pending), batch_size)]
+            batch_order = list(range(len(batches)))
+            keyframe_batches = (
+                spread_keyframes(batch_order, math.ceil(settings.PROGRESSIVE_KEYFRAMES / batch_size))
+                if progressive else []
+            )
+            rest = [index for index in batch_order if index not in keyframe_batches]
+            phases = [keyframe_batches, rest] if keyframe_batches and rest else [batch_order]
+            remaining = set(frame.id for frame in pending)
+
+            # Analysis stops early once the category scores stabilize, if the frame policy says so.
+            # Stability is checked on the frames up to the end of each batch in timestamp order, as
+            # soon as that batch and all before it were analyzed - the same checks a regular run
+            # makes after each batch, so where the analysis stops does not depend on the order
+            # batches ran in.
+            policy = frame_policy(video.store.brand, inspection.mode)
+            position = {frame.id: index for index, frame in enumerate(usable_frames)}
+            batch_ends = [position[batch[0].id] for batch in batches[1:]] + [len(usable_frames)]
+            analyzed_batches = set()
+            checked_batches = 0
+            stop_reason = 'all_frames'
+            prefix = []
+
+            for phase_number, phase in enumerate(phases):
+                if stop_reason != 'all_frames':
+                    break
+                for batch_number, batch_index in enumerate(phase):
+                    batch = batches[batch_index]
+                    for frame, frame_analysis in zip(batch, analyze_stored_frames(analyzer, batch, plan)):
+                        if frame_analysis is None or (
+                            _rekognition_call_failed(analyzer, frame_analysis) and not is_last_attempt
+                        ):
+                            # Transient failure - leave the frame unchecked so the retry picks it up
+                            failed_frames.append(frame.frame_number)
+                            continue
+
+                        frame.ai_analysis = frame_analysis
+                        frame.save(update_fields=['ai_analysis'])
+                        remaining.discard(frame.id)
+                    analyzed_batches.add(batch_index)
+
+                    done = [frame for frame in usable_frames
+                            if frame.id not in remaining and frame.frame_number not in failed_frames]
+                    video.update_checkpoint(analysis={
+                        'inspection_id': inspection.id,
+                        'frames_analyzed': len(done),
+                        'progress': len(done) / len(usable_frames),
+                    })
+                    inspection.progress = inspection_analysis_progress(inspection)
+                    if progressive and len(phases) > 1 and phase_number == 0 and batch_number == len(phase) - 1:
+                        publish_preliminary_results(inspection, analyzer, done)
+                    else:
+                        inspection.save(update_fields=['progress', 'updated_at'])
+
+                    # Frames analyzed without a gap from the first frame on; a failed frame ends them
+                    analyzed = len(list(takewhile(lambda frame: frame.id not in remaining, usable_frames)))
+                    while checked_batches in analyzed_batches:
+                        end = min(batch_ends[checked_batches], analyzed)
+                        frames_left = checked_batches < len(batches) - 1 or end < batch_ends[checked_batches]
+                        checked_batches += 1
+                        if frames_left and scores_stable([frame.ai_analysis for frame in usable_frames[:end]], policy):
+                            prefix = usable_frames[:end]
+                            stop_reason = 'scores_stable'
+                            break
+                    if stop_reason != 'all_frames':
+                        break
+
+            prefix_ids = set(frame.id for frame in prefix)
+            for frame in usable_frames:
+                if frame.frame_number in failed_frames:
+                    continue
+                if stop_reason == 'scores_stable' and frame.id not in prefix_ids:
+                    # The scores were stable before its turn
+                    continue
+                frame_analysis = frame.ai_analysis
                 all_analyses.append(frame_analysis)
 
                 # Generate findings for this frame
-                findings = analyzer.generate_findings(frame_analysis, frame)
-                all_findings.extend(findings)
-
-                logger.info(f"Analyzed frame {frame.frame_number} with score {frame_analysis.get('overall_score', 0)}")
-
-            except Exception as e:
-                logger.error(f"Error analyzing frame {frame.frame_number}: {e}")
-                continue
-            finally:
-                # Clean up temp file
-                if temp_frame_path and os.path.exists(temp_frame_path):
-                    os.remove(temp_frame_path)
-
-        # Calculate overall scores
-        scores = calculate_inspection_scores(all_analyses)
-        
-        # Update inspection with results
-        inspection.overall_score = scores['overall_score']
-        inspection.ppe_score = scores['ppe_score']
-        inspection.safety_score = scores['safety_score']
-        inspection.cleanliness_score = scores['cleanliness_score']
-        inspection.food_safety_score = scores['food_safety_score']
-        inspection.equipment_score = scores['equipment_score']
-        inspection.operational_score = scores['operational_score']
-        inspection.food_quality_score = scores['food_quality_score']
-        inspection.staff_behavior_score = scores['staff_behavior_score']
-        inspection.uniform_score = scores['uniform_score']
-        inspection.menu_board_score = scores['menu_board_score']
-        inspection.ai_analysis = {
-            'frame_analyses': all_analyses,
-            'analysis_summary': {
-                'total_frames_analyzed': len(all_analyses),
-                'analysis_timestamp': timezone.now().isoformat(),
-                'analyzer_version': '1.0.0'
-            }
+                frame_findings.append((frame, analyzer.generate_findings(frame_analysis, frame)))
+
+            video.update_checkpoint(analysis={
+                'inspection_id': inspection.id,
+                'frames_analyzed': len(all_analyses),
+                'progress': len(all_analyses) / len(usable_frames),
+            })
+            record_frame_budget(video, analyzed_frames=len(all_analyses), stop_reason=stop_reason)
+            if stop_reason == 'scores_stable':
+                logger.info(
+                    f"Inspection {inspection.id}: scores stable after {len(all_analyses)} "
+                    f"of {len(usable_frames)} frames, stopped analysis early"
+                )
+
+            if failed_frames and not is_last_attempt:
+                raise Exception(f"Analysis failed for frames {failed_frames}, retrying remaining frames")
+
+            video.update_checkpoint(analysis={
+                'inspection_id': inspection.id,
+                'frames_analyzed': len(all_analyses),
+                'progress': 1.0,
+                'completed_at': timezone.now().isoformat(),
+                'frame_ids': [frame.id for frame, _ in frame_findings],
+                'summary': {
+                    'total_frames_analyzed': len(all_analyses),
+                    'frames_skipped_low_quality': skipped_low_quality,
+                    'image_source': 's3_object' if plan['use_s3_object'] else 'bytes',
+                    'label_mosaic': plan['label_mosaic'],
+                    'menu_board_cache_hits': sum(
+                        1 for analysis in all_analyses
+                        if (analysis.get('menu_board_analysis') or {}).get('cache_hit')
+                    ),
+                    'frames_reanalyzed': len(pending),
+                    'analysis_timestamp': timezone.now().isoformat(),
+                    'analyzer_version': '1.0.0',
+                    'engine_versions': {name: engine['version'] for name, engine in ENGINES.items()},
+                },
+                'findings': serialize_findings(track_findings(frame_findings)),
+            })
+
+            # The last video to finish merges the results of all of the inspection's videos
+            findings = merge_video_results(inspection.id)
+            payload['merged'] = findings is not None
+            payload['findings'] = findings or []
+
+            if payload.get('upload_id'):
+                # Raw detections allow re-scoring later without the AI services
+                store_frame_detections(payload['upload_id'], [frame for frame, _ in frame_findings])
+
+                # All of the brand's rules are checked against the findings above in one pass,
+                # after known false positives were suppressed as for the inspection's findings
+                engine = RuleEngine(video.store.brand, coaching_mode=inspection.mode == Inspection.Mode.COACHING)
+                payload['violations'] = engine.evaluate(suppress_frame_findings(video.store_id, frame_findings))
+            return payload
+
+        except Exception as exc:
+            _fail_analysis_stage(self, payload, exc)
+
+
+def spread_keyframes(frames, count):
+    """Up to count frames evenly spread over frames, first and last included"""
+    if len(frames) <= count:
+        return list(frames)
+    if count <= 1:
+        return list(frames[:count])
+    return [frames[round(i * (len(frames) - 1) / (count - 1))] for i in range(count)]
+
+
+def publish_preliminary_results(inspection, analyzer, frames):
+    """Publish scores and top findings of the frames analyzed so far as a PARTIAL inspection
+
+    The preliminary findings are kept in ai_analysis only; Finding rows,
+    recommendations and action items are created from the final result by
+    the persist stage, which also overwrites these scores.
+    """
+    analyses = [frame.ai_analysis for frame in frames]
+    findings = track_findings([(frame, analyzer.generate_findings(frame.ai_analysis, frame)) for frame in frames])
+    findings.sort(
+        key=lambda finding: (SEVERITY_RANKS.get(finding.get('severity'), 0), finding.get('confidence', 0.0)),
+        reverse=True,
+    )
+
+    scores = calculate_inspection_scores(analyses)
+    for field, value in scores.items():
+        setattr(inspection, field, value)
+    inspection.status = Inspection.Status.PARTIAL
+    inspection.save(update_fields=[*scores, 'status', 'progress', 'updated_at'])
+    preliminary = {
+        'frames_analyzed': len(frames),
+        'top_findings': serialize_findings(findings[:settings.PROGRESSIVE_TOP_FINDINGS]),
+        'analysis_timestamp': timezone.now().isoformat(),
+    }
+    # Results of an earlier run are dropped; on-demand range analyses are kept
+    inspection.update_ai_analysis(lambda stored: {
+        **({'supplemental_ranges': stored['supplemental_ranges']} if 'supplemental_ranges' in stored else {}),
+        'preliminary': preliminary,
+    })
+    logger.info(
+        f"Inspection {inspection.id}: preliminary score {inspection.overall_score:.1f} "
+        f"from {len(frames)} keyframes ({inspection.progress:.0%} analyzed)"
+    )
+
+
+# Summary counts added up over an inspection's videos; other keys come from its last analyzed video
+SUMMARY_COUNTS = ['total_frames_analyzed', 'frames_skipped_low_quality', 'menu_board_cache_hits', 'frames_reanalyzed']
+
+
+def merge_video_results(inspection_id):
+    """Merge the checkpointed results of an inspection's videos once all are analyzed
+
+    Runs under a row lock on the inspection, so of several videos finishing
+    at once exactly one merges. Confirmed (PROCESSING) uploads that joined
+    the inspection but have no video yet are waited for; uploads never
+    confirmed are not, and if one is confirmed later its video's run merges
+    again. The merged frame analyses and summary are saved on the
+    inspection; merged_videos in the summary records which video results
+    went into it.
+
+    Returns:
+        list: Serialized findings of all videos, or None when videos are
+            still being analyzed or these results were merged already
+    """
+    from videos.models import VideoFrame
+
+    with transaction.atomic():
+        inspection = Inspection.objects.select_for_update().get(id=inspection_id)
+        videos = list(inspection.videos.order_by('created_at', 'id'))
+        results = {
+            video.id: (video.processing_checkpoint or {}).get('analysis', {})
+            for video in videos
         }
-        inspection.status = Inspection.Status.COMPLETED
-        inspection.save()
 
-        # Update video status
-        video.status = 'COMPLETED'
-        video.save()
+        analyzing = [
+            video.id for video in videos
+            if results[video.id].get('inspection_id') != inspection.id or not results[video.id].get('completed_at')
+        ]
+        uploading = (
+            Upload.objects.filter(inspection=inspection, status=Upload.Status.PROCESSING)
+            .exclude(videos__inspection=inspection)
+        )
+        if analyzing or uploading.exists():
+            logger.info(f"Inspection {inspection.id}: waiting for videos {analyzing} and uploads "
+                        f"{list(uploading.values_list('id', flat=True))}")
+            return None
 
-        # Create findings
-        create_findings_from_analysis(inspection, all_findings)
-        
-        # Generate action items
-        generate_action_items(inspection)
+        merged_videos = {str(video.id): results[video.id]['completed_at'] for video in videos}
+        if (inspection.ai_analysis or {}).get('analysis_summary', {}).get('merged_videos') == merged_videos:
+            return None
 
-        logger.info(f"Inspection {inspection_id} completed with overall score {inspection.overall_score}")
-        return f"Inspection {inspection_id} analyzed successfully"
+        frames = VideoFrame.objects.in_bulk([frame_id for result in results.values() for frame_id in result['frame_ids']])
+        all_analyses = [
+            frames[frame_id].ai_analysis
+            for video in videos for frame_id in results[video.id]['frame_ids'] if frame_id in frames
+        ]
 
-    except Exception as exc:
-        inspection = Inspection.objects.get(id=inspection_id)
-        inspection.status = Inspection.Status.FAILED
-        inspection.error_message = str(exc)
-        inspection.save()
+        summary = dict(results[max(results, key=lambda video_id: results[video_id]['completed_at'])]['summary'])
+        for key in SUMMARY_COUNTS:
+            summary[key] = sum(result['summary'].get(key, 0) for result in results.values())
+        summary['merged_videos'] = merged_videos
 
-        # Update video status to failed (if exists)
-        video = inspection.video
-        if video:
-            video.status = 'FAILED'
-            video.save()
+        ai_analysis = {'frame_analyses': all_analyses, 'analysis_summary': summary}
+        if 'supplemental_ranges' in (inspection.ai_analysis or {}):
+            ai_analysis['supplemental_ranges'] = inspection.ai_analysis['supplemental_ranges']
+        inspection.ai_analysis = ai_analysis
+        inspection.save(update_fields=['ai_analysis', 'updated_at'])
+
+    if len(videos) > 1:
+        logger.info(f"Inspection {inspection.id}: merged results of {len(videos)} videos")
+    return [finding for video in videos for finding in results[video.id]['findings']]
+
+
+def plan_frame_analysis(analyzer):
+    """Decide how frames reach the analyzer for this analysis run
+
+    Rekognition reads frames straight from the bucket (S3Object) when frames
+    are stored in S3 and no local detector (YOLO/OCR) needs the file; the
+    worker only downloads frame bytes when it has to.
+
+    Frames are analyzed in batches when a batch shares work: MOSAIC_TILES at
+    a time in label mosaic mode, so one detect_labels call covers the batch
+    (the mosaic is built from frame bytes, so S3Object references are not
+    used), or OCR_POOL_BATCH_SIZE at a time when the OCR pool reads the batch
+    with one readtext call.
+    """
+    mosaic = settings.REKOGNITION_LABEL_MOSAIC and analyzer.rekognition.client is not None
+    ocr_pool = settings.OCR_POOL_PROCESSES > 0 and analyzer.ocr.pool is not None
+    use_s3_object = (
+        settings.REKOGNITION_USE_S3_OBJECTS
+        and not mosaic
+        and analyzer.rekognition.client is not None
+        and hasattr(default_storage, 'bucket_name')
+        and not analyzer.needs_local_frame()
+    )
+    if mosaic:
+        frames_per_call = MOSAIC_TILES
+    elif ocr_pool:
+        frames_per_call = settings.OCR_POOL_BATCH_SIZE
+    else:
+        frames_per_call = 1
+    return {'use_s3_object': use_s3_object, 'label_mosaic': mosaic, 'frames_per_call': frames_per_call}
 
-        logger.error(f"Inspection analysis failed: {exc}")
-        raise self.retry(exc=exc, countdown=60, max_retries=3)
+
+def stored_frame_s3_image(frame):
+    """S3 reference to a stored frame image, including the storage's key prefix"""
+    key = frame.image.name
+    location = getattr(default_storage, 'location', '')
+    if location:
+        key = f"{location.strip('/')}/{key}"
+    return RekognitionService.s3_image(key, bucket=default_storage.bucket_name)
+
+
+def analyze_stored_frame(analyzer, frame, plan=None):
+    """Run a stored frame through the analyzer, downloading it only if needed
+
+    Detector engines still current in the frame's stored analysis are not
+    run again (see VideoAnalyzer.analyze_frame).
+
+    Returns:
+        dict: Frame analysis, or None if the frame could not be analyzed
+    """
+    if plan and plan['use_s3_object']:
+        try:
+            frame_analysis = analyzer.analyze_frame(
+                None, frame_s3_image=stored_frame_s3_image(frame), previous=frame.ai_analysis
+            )
+            logger.info(f"Analyzed frame {frame.frame_number} from S3 with score {frame_analysis.get('overall_score', 0)}")
+            return frame_analysis
+        except Exception as e:
+            logger.error(f"Error analyzing frame {frame.frame_number}: {e}")
+            return None
+
+    try:
+        frame_analysis = analyzer.analyze_frame(load_stored_frame(frame), previous=frame.ai_analysis)
+        logger.info(f"Analyzed frame {frame.frame_number} with score {frame_analysis.get('overall_score', 0)}")
+        return frame_analysis
+
+    except Exception as e:
+        logger.error(f"Error analyzing frame {frame.frame_number}: {e}")
+        return None
+
+
+def analyze_stored_frames(analyzer, frames, plan):
+    """Analyze a batch of stored frames together when the plan batches frames
+
+    Returns:
+        list: Frame analysis or None per frame, in input order
+    """
+    if plan['frames_per_call'] == 1 or len(frames) == 1:
+        return [analyze_stored_frame(analyzer, frame, plan) for frame in frames]
+
+    loaded = {}
+    for frame in frames:
+        try:
+            loaded[frame.id] = load_stored_frame(frame)
+        except Exception as e:
+            logger.error(f"Error downloading frame {frame.frame_number}: {e}")
+
+    batch = [frame for frame in frames if frame.id in loaded]
+    analyses = {}
+    if batch:
+        try:
+            results = analyzer.analyze_frames(
+                [loaded[frame.id] for frame in batch],
+                label_mosaic=plan['label_mosaic'],
+                previous=[frame.ai_analysis for frame in batch],
+            )
+            analyses = {frame.id: result for frame, result in zip(batch, results)}
+            logger.info(f"Analyzed frames {[frame.frame_number for frame in batch]} as one batch")
+        except Exception as e:
+            logger.error(f"Error analyzing frames {[frame.frame_number for frame in batch]}: {e}")
+
+    return [analyses.get(frame.id) for frame in frames]
+
+
+def store_frame_detections(upload_id, frames):
+    """Replace the upload's Detection rows with the flattened analyses of frames"""
+    detections = [
+        Detection(
+            upload_id=upload_id,
+            type=row['type'],
+            label=row['label'],
+            confidence=row['confidence'],
+            frame_ts_ms=round(frame.timestamp * 1000),
+            bbox_json=row['bbox'],
+        )
+        for frame in frames
+        for row in flatten_frame_analysis(frame.ai_analysis)
+    ]
+    with transaction.atomic():
+        Detection.objects.filter(upload_id=upload_id).delete()
+        Detection.objects.bulk_create(detections, batch_size=settings.DETECTION_BULK_BATCH_SIZE)
+    logger.info(f"Stored {len(detections)} detections for upload {upload_id}")
+
+
+def load_stored_frame(frame):
+    """Read a stored frame into memory as an analyzer Frame; detectors decode it from there"""
+    with default_storage.open(frame.image.name, 'rb') as stored_file:
+        return Frame(data=stored_file.read())
+
+
+def _rekognition_call_failed(analyzer, frame_analysis):
+    """True when Rekognition is configured but its calls failed for this frame"""
+    return analyzer.rekognition.client is not None and not frame_analysis.get('rekognition_available', True)
+
+
+@shared_task(bind=True, max_retries=3)
+def persist_results_stage(self, payload):
+    """DB stage: write scores, findings, action items and rule violations for an analyzed inspection
+
+    Runs for every video of the inspection; only the run that merged the
+    results of all videos (see merge_video_results) writes the inspection's
+    scores and findings. Findings of an earlier merge that nobody reviewed
+    are replaced, so a video joining a completed inspection re-merges it.
+    """
+    with pipeline_lease(payload):
+        try:
+            if payload.get('deduplicated_from'):
+                # Results were cloned from an identical video by the fetch stage
+                release_pipeline_lock(payload)
+                return f"Inspection {payload['inspection_id']} reused analysis of video {payload['deduplicated_from']}"
+
+            if payload.get('merged') is False:
+                # Other videos of the inspection are still being analyzed, or were merged by another run
+                if payload.get('video_id'):
+                    from videos.models import Video
+                    Video.objects.filter(id=payload['video_id']).update(status=Video.Status.COMPLETED)
+                _persist_upload_results(payload)
+                if not payload.get('lock_shared'):
+                    release_pipeline_lock(payload)
+                return f"Video {payload.get('video_id')} of inspection {payload['inspection_id']} analyzed"
+
+            inspection = Inspection.objects.get(id=payload['inspection_id'])
+            all_analyses = inspection.ai_analysis.get('frame_analyses', [])
+
+            # Calculate overall scores
+            scores = calculate_inspection_scores(all_analyses)
+
+            # Update inspection with results
+            for field, value in scores.items():
+                setattr(inspection, field, value)
+            inspection.status = Inspection.Status.COMPLETED
+            inspection.progress = 1.0
+            inspection.save(update_fields=[*scores, 'status', 'progress', 'updated_at'])
+
+            # Update video status
+            inspection.videos.update(status='COMPLETED')
+
+            # Replace findings of an earlier merge, keeping reviewed, manual and supplemental ones
+            stale = inspection.findings.filter(is_manual=False, is_approved=False, is_rejected=False).exclude(
+                frame__is_supplemental=True
+            )
+            ActionItem.objects.filter(finding__in=stale).delete()
+            stale.delete()
+
+            # Create findings
+            findings = create_findings_from_analysis(inspection, deserialize_findings(payload.get('findings', [])))
+
+            # Generate action items
+            generate_action_items(inspection, findings)
+
+            # Materialized scores of every upload, adjusted in place by manager review later
+            build_scorecards(inspection, payload.get('upload_id'))
+
+            _persist_upload_results(payload)
+            release_pipeline_lock(payload)
+
+            logger.info(f"Inspection {inspection.id} completed with overall score {inspection.overall_score}")
+            return f"Inspection {inspection.id} analyzed successfully"
+
+        except Exception as exc:
+            _fail_analysis_stage(self, payload, exc)
+
+
+def _persist_upload_results(payload):
+    """Write the rule violations of the run's upload and mark the upload complete"""
+    if not payload.get('upload_id'):
+        return
+
+    upload = Upload.objects.filter(id=payload['upload_id']).first()
+    if upload and 'violations' in payload:
+        create_violations(upload, payload['violations'])
+    if not payload.get('reprocess'):
+        Upload.objects.filter(id=payload['upload_id']).update(status=Upload.Status.COMPLETE)
+
+
+def rescore_from_detections(inspection):
+    """Recompute an inspection's scores and AI findings from stored detections
+
+    Makes no AI service call: frame analyses are rebuilt from the Detection
+    rows of the uploads of the inspection's videos and recommendations use the
+    fallback templates. Manual findings and findings a manager approved or
+    rejected are kept; the other AI findings and their action items are
+    replaced.
+
+    Returns:
+        bool: False when the inspection has no stored detections
+    """
+    scorer = VideoAnalyzer.for_scoring()
+    analyses = []
+    tracked = []
+    for video in inspection.videos.exclude(upload=None).order_by('created_at', 'id'):
+        rows = Detection.objects.filter(upload_id=video.upload_id).order_by('frame_ts_ms', 'id')
+        frames = {round(frame.timestamp * 1000): frame for frame in video.frames.filter(is_supplemental=False)}
+        video_findings = []
+        for frame_ts_ms, frame_rows in groupby(rows.iterator(), key=attrgetter('frame_ts_ms')):
+            analysis = frame_analysis_from_detections(frame_rows, scorer)
+            frame = frames.get(frame_ts_ms)
+            analyses.append(analysis)
+            video_findings.append((frame, scorer.generate_findings(analysis, frame)))
+        # Objects are tracked within a video
+        tracked.extend(track_findings(video_findings))
+
+    if not analyses:
+        return False
+
+    scores = calculate_inspection_scores(analyses)
+    with transaction.atomic():
+        for field, value in scores.items():
+            setattr(inspection, field, value)
+        inspection.save(update_fields=[*scores, 'updated_at'])
+
+        inspection.findings.filter(is_manual=False, is_approved=False, is_rejected=False).exclude(
+            frame__is_supplemental=True
+        ).delete()
+        inspection.action_items.filter(finding__isnull=True, status=ActionItem.Status.OPEN).delete()
+        findings = create_findings_from_analysis(
+            inspection, tracked, BedrockRecommendationService(enabled=False)
+        )
+        generate_action_items(inspection, findings)
+        build_scorecards(inspection)
+
+    logger.info(f"Re-scored inspection {inspection.id} from {len(analyses)} frames of stored detections")
+    return True
+
+
+def clone_inspection_results(source, inspection, frame_map):
+    """Copy scores, AI analysis and AI findings of source onto a new inspection
+
+    Args:
+        frame_map: source VideoFrame id -> matching frame of the new video
+
+    Manager review state is not copied; action items are regenerated.
+    """
+    score_fields = [f.name for f in Inspection._meta.fields if f.name.endswith('_score')]
+    for field in score_fields:
+        setattr(inspection, field, getattr(source, field))
+    inspection.ai_analysis = source.ai_analysis
+    inspection.status = Inspection.Status.COMPLETED
+    inspection.save()
+
+    Finding.objects.bulk_create([
+        Finding(
+            inspection=inspection,
+            frame=frame_map.get(finding.frame_id),
+            category=finding.category,
+            severity=finding.severity,
+            title=finding.title,
+            description=finding.description,
+            confidence=finding.confidence,
+            bounding_box=finding.bounding_box,
+            label=finding.label,
+            recommended_action=finding.recommended_action,
+            affected_frame_count=finding.affected_frame_count,
+            first_timestamp=finding.first_timestamp,
+            last_timestamp=finding.last_timestamp,
+            average_confidence=finding.average_confidence,
+            estimated_minutes=finding.estimated_minutes,
+        )
+        for finding in source.findings.filter(is_manual=False)
+    ])
+
+    generate_action_items(inspection)
+
+
+def serialize_findings(findings):
+    """Replace frame instances with frame ids so findings can pass between tasks"""
+    serialized = []
+    for finding in findings:
+        finding = dict(finding)
+        frame = finding.pop('frame', None)
+        finding['frame_id'] = frame.id if frame else None
+        serialized.append(finding)
+    return serialized
+
+
+def deserialize_findings(findings):
+    """Re-attach VideoFrame instances to findings serialized by serialize_findings"""
+    from videos.models import VideoFrame
+
+    frame_ids = {f['frame_id'] for f in findings if f.get('frame_id')}
+    frames = VideoFrame.objects.in_bulk(frame_ids)
+
+    deserialized = []
+    for finding in findings:
+        finding = dict(finding)
+        finding['frame'] = frames.get(finding.pop('frame_id', None))
+        deserialized.append(finding)
+    return deserialized
 
 
 def calculate_inspection_scores(frame_analyses):
@@ -272,53 +926,42 @@ def calculate_inspection_scores(frame_analyses):
     }
 
 
-def create_findings_from_analysis(inspection, findings_data):
-    """Create consolidated Finding objects from analysis results with AI-generated recommendations"""
+def create_findings_from_analysis(inspection, findings_data, bedrock_service=None, summary=None):
+    """Create one Finding per tracked object with AI-generated recommendations
+
+    findings_data holds track findings from track_findings; a finding without
+    track fields is treated as a track seen in its own frame only. Findings
+    matching false positives rejected at the store are dropped or downgraded
+    first (see suppression), with the counts recorded in summary.
+
+    Returns:
+        list: The created Findings
+    """
+    created = []
+    findings_data = suppress_known_false_positives(inspection, findings_data, summary)
     if not findings_data:
-        return
+        return created
 
     # Initialize Bedrock service for generating recommendations
-    bedrock_service = BedrockRecommendationService()
-
-    # Group findings by (category, severity, title) for consolidation
-    grouped_findings = {}
+    bedrock_service = bedrock_service or BedrockRecommendationService()
 
     for finding_data in findings_data:
         category = finding_data.get('category', 'OTHER')
         severity = finding_data.get('severity', 'LOW')
         title = finding_data.get('title', 'Unknown Issue')
 
-        # Create unique key for grouping
-        key = (category, severity, title)
-
-        if key not in grouped_findings:
-            grouped_findings[key] = []
+        try:
+            frame = finding_data.get('frame')
+            frame_timestamp = frame.timestamp if frame else None
 
-        grouped_findings[key].append(finding_data)
+            # Track metrics, defaulting to a single-frame track
+            max_confidence = finding_data.get('confidence', 0.0)
+            average_confidence = finding_data.get('average_confidence', max_confidence)
+            affected_frame_count = finding_data.get('affected_frame_count', 1)
+            first_timestamp = finding_data.get('first_timestamp', frame_timestamp)
+            last_timestamp = finding_data.get('last_timestamp', frame_timestamp)
 
-    # Create one consolidated finding per group
-    for (category, severity, title), group_findings in grouped_findings.items():
-        try:
-            # Extract data from all findings in this group
-            frames = [f.get('frame') for f in group_findings if f.get('frame')]
-            confidences = [f.get('confidence', 0.0) for f in group_findings]
-            timestamps = [f.get('frame').timestamp for f in group_findings if f.get('frame')]
-
-            # Find the finding with highest confidence (representative)
-            max_confidence_idx = confidences.index(max(confidences)) if confidences else 0
-            representative_finding = group_findings[max_confidence_idx]
-            representative_frame = representative_finding.get('frame')
-
-            # Calculate consolidated metrics
-            affected_frame_count = len(group_findings)
-            average_confidence = sum(confidences) / len(confidences) if confidences else 0.0
-            max_confidence = max(confidences) if confidences else 0.0
-            first_timestamp = min(timestamps) if timestamps else None
-            last_timestamp = max(timestamps) if timestamps else None
-
-            # Get base description from representative finding
-            description = representative_finding.get('description', '')
-            bounding_box = representative_finding.get('bounding_box')
+            description = finding_data.get('description', '')
 
             # Generate AI-powered recommendation and time estimate
             is_consolidated = affected_frame_count > 1
@@ -334,37 +977,48 @@ def create_findings_from_analysis(inspection, findings_data):
             recommended_action = recommendation['recommended_action']
             estimated_minutes = recommendation['estimated_minutes']
 
-            # Create consolidated finding with AI-generated recommendations
-            Finding.objects.create(
+            # The frame and box are those of the track's most confident detection
+            created.append(Finding.objects.create(
                 inspection=inspection,
-                frame=representative_frame,
+                frame=frame,
                 category=category,
                 severity=severity,
                 title=title,
                 description=description,
                 confidence=max_confidence,
-                bounding_box=bounding_box,
+                bounding_box=finding_data.get('bounding_box'),
+                label=(finding_data.get('label') or '')[:200],
                 recommended_action=recommended_action,
                 estimated_minutes=estimated_minutes,
                 affected_frame_count=affected_frame_count,
                 first_timestamp=first_timestamp,
                 last_timestamp=last_timestamp,
                 average_confidence=average_confidence
-            )
+            ))
 
             logger.info(
-                f"Consolidated {affected_frame_count} findings for '{title}' "
+                f"Tracked '{title}' across {affected_frame_count} frames "
                 f"(confidence: avg={average_confidence:.2f}, max={max_confidence:.2f}, "
                 f"estimated time: {estimated_minutes} minutes)"
             )
 
         except Exception as e:
-            logger.error(f"Error creating consolidated finding for '{title}': {e}")
+            logger.error(f"Error creating finding for '{title}': {e}")
+
+    return created
+
 
+def generate_action_items(inspection, findings=None):
+    """Generate action items based on findings
 
-def generate_action_items(inspection):
-    """Generate action items based on findings"""
-    findings = inspection.findings.all()
+    Args:
+        findings: Only generate items for these findings (default: all of the
+            inspection's findings)
+    """
+    if findings is None:
+        findings = inspection.findings.all()
+    else:
+        findings = inspection.findings.filter(id__in=[finding.id for finding in findings])
     
     # Group findings by category and severity
     critical_findings = findings.filter(severity='CRITICAL')
@@ -422,18 +1076,11 @@ def cleanup_expired_inspections():
     count = 0
     for inspection in expired_inspections:
         try:
-            # Delete associated video frames and files if they exist
-            video = inspection.video
-            for frame in video.frames.all():
-                if frame.image and os.path.exists(frame.image.path):
-                    os.remove(frame.image.path)
-            
-            # Delete video file and thumbnail
-            if video.file and os.path.exists(video.file.path):
-                os.remove(video.file.path)
-            if video.thumbnail and os.path.exists(video.thumbnail.path):
-                os.remove(video.thumbnail.path)
-            
+            # Delete the files of the inspection's videos and their frames,
+            # keeping those shared with deduplicated clones
+            for video in inspection.videos.all():
+                video.delete_media()
+
             # Delete the inspection (cascades to findings, action items, etc.)
             inspection.delete()
             count += 1
@@ -442,4 +1089,35 @@ def cleanup_expired_inspections():
             logger.error(f"Error cleaning up expired inspection {inspection.id}: {e}")
     
     logger.info(f"Cleaned up {count} expired coaching mode inspections")
-    return f"Cleaned up {count} expired inspections"
\ No newline at end of file
+    return f"Cleaned up {count} expired inspections"
+
+@shared_task
+def rescore_inspections_task(after_id=0):
+    """Re-score completed inspections under the current scoring rules
+
+    Each run handles RESCORE_CHUNKS_PER_TASK chunks and then re-queues itself
+    to resume after the last inspection, so no run holds a worker for long.
+    Scores come from stored analyses and detections; no AI service is called.
+    Scoring runs in a pool of RESCORE_PROCESSES processes when the worker
+    allows it (see rescoring.pool_processes).
+    """
+    from .rescoring import InspectionRescorer, pool_processes
+
+    rescorer = InspectionRescorer(
+        chunk_size=settings.RESCORE_CHUNK_SIZE, processes=pool_processes(settings.RESCORE_PROCESSES)
+    )
+    try:
+        next_id = rescorer.run(
+            after_id,
+            max_chunks=settings.RESCORE_CHUNKS_PER_TASK,
+            pause_seconds=settings.RESCORE_PAUSE_SECONDS,
+        )
+    finally:
+        rescorer.shutdown()
+    if next_id is not None:
+        rescore_inspections_task.delay(next_id)
+
+    return (
+        f"Re-scored {rescorer.rows} inspections ({rescorer.updated} changed) "
+        f"at {rescorer.rows_per_second:.0f} rows/s"
+    )
@@ -2,7 +2,7 @@ from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model
 from rest_framework.test import APIClient
 from rest_framework import status
-from unittest.mock import patch, Mock
+from unittest.mock import patch, Mock, MagicMock
 from brands.models import Brand, Store
 from videos.models import Video
 from .models import Inspection, Finding, ActionItem
@@ -634,4 +634,650 @@ class InspectionAnalyticsTest(TestCase):
             status.HTTP_200_OK,
             status.HTTP_404_NOT_FOUND,
             status.HTTP_403_FORBIDDEN  # If user doesn't have permission
-        ])
\ No newline at end of file
+        ])
+
+
+class AnalysisPipelineStageTest(TestCase):
+    """Test the persist stage of the staged analysis pipeline"""
+
+    def setUp(self):
+        self.brand = Brand.objects.create(name="Test Brand")
+        self.store = Store.objects.create(
+            brand=self.brand, name="Test Store", code="TS001",
+            address="123 Test St", city="Test City", state="TS", zip_code="12345"
+        )
+        self.user = User.objects.create_user(username="testuser", store=self.store)
+        self.video = Video.objects.create(
+            uploaded_by=self.user, store=self.store, title="Test Video", file="test.mp4"
+        )
+        self.inspection = create_inspection_with_video(self.video)
+
+    def test_persist_stage_writes_scores_and_findings(self):
+        from videos.models import VideoFrame
+        from .tasks import persist_results_stage, serialize_findings
+
+        frame = VideoFrame.objects.create(
+            video=self.video, frame_number=0, timestamp=1.5, width=640, height=360
+        )
+        self.inspection.ai_analysis = {
+            'frame_analyses': [{
+                'overall_score': 80.0,
+                'ppe_analysis': {'summary': {'total_persons': 2, 'persons_with_face_cover': 1,
+                                             'persons_with_hand_cover': 2}},
+            }],
+        }
+        self.inspection.save()
+        findings = serialize_findings([{
+            'category': 'PPE', 'severity': 'HIGH', 'title': 'Missing Face Covers',
+            'description': '1 person(s) not wearing proper face covers',
+            'confidence': 0.9, 'frame': frame,
+        }])
+
+        persist_results_stage({'inspection_id': self.inspection.id, 'findings': findings})
+
+        self.inspection.refresh_from_db()
+        self.assertEqual(self.inspection.status, Inspection.Status.COMPLETED)
+        self.assertEqual(self.inspection.overall_score, 80.0)
+        self.assertAlmostEqual(self.inspection.ppe_score, 65.0)
+        finding = self.inspection.findings.get()
+        self.assertEqual(finding.frame, frame)
+        self.assertEqual(finding.first_timestamp, 1.5)
+
+    @patch('inspections.tasks.VideoAnalyzer')
+    @patch('inspections.tasks.analyze_stored_frame')
+    def test_analyze_stage_resumes_from_frame_checkpoints(self, mock_analyze_frame, mock_analyzer_class):
+        from videos.models import VideoFrame
+        from .tasks import analyze_frames_stage
+
+        mock_analyzer_class.return_value.generate_findings.return_value = []
+        mock_analyzer_class.return_value.rekognition.client = None
+        mock_analyze_frame.return_value = {'overall_score': 70.0}
+
+        done_frame = VideoFrame.objects.create(
+            video=self.video, frame_number=0, timestamp=0.0, width=640, height=360,
+            ai_analysis={'overall_score': 90.0}
+        )
+        pending_frame = VideoFrame.objects.create(
+            video=self.video, frame_number=1, timestamp=1.0, width=640, height=360
+        )
+        self.video.update_checkpoint(analysis={'inspection_id': self.inspection.id, 'frames_analyzed': 1})
+
+        analyze_frames_stage({'inspection_id': self.inspection.id})
+
+        mock_analyze_frame.assert_called_once()
+        self.assertEqual(mock_analyze_frame.call_args[0][1], pending_frame)
+        pending_frame.refresh_from_db()
+        self.assertEqual(pending_frame.ai_analysis, {'overall_score': 70.0})
+        self.inspection.refresh_from_db()
+        scores = [a['overall_score'] for a in self.inspection.ai_analysis['frame_analyses']]
+        self.assertEqual(scores, [90.0, 70.0])
+
+    @patch('inspections.tasks.VideoAnalyzer')
+    @patch('inspections.tasks.analyze_stored_frame')
+    def test_analyze_stage_ignores_checkpoints_from_other_inspections(self, mock_analyze_frame,
+                                                                      mock_analyzer_class):
+        from videos.models import VideoFrame
+        from .tasks import analyze_frames_stage
+
+        mock_analyzer_class.return_value.generate_findings.return_value = []
+        mock_analyzer_class.return_value.rekognition.client = None
+        mock_analyze_frame.return_value = {'overall_score': 70.0}
+        VideoFrame.objects.create(
+            video=self.video, frame_number=0, timestamp=0.0, width=640, height=360,
+            ai_analysis={'overall_score': 90.0}
+        )
+        self.video.update_checkpoint(analysis={'inspection_id': self.inspection.id + 100, 'frames_analyzed': 1})
+
+        analyze_frames_stage({'inspection_id': self.inspection.id})
+
+        mock_analyze_frame.assert_called_once()
+
+    @override_settings(PROGRESSIVE_KEYFRAMES=2, PROGRESSIVE_TOP_FINDINGS=1)
+    @patch('inspections.tasks.VideoAnalyzer')
+    @patch('inspections.tasks.analyze_stored_frame')
+    def test_progressive_analysis_publishes_keyframes_first(self, mock_analyze_frame, mock_analyzer_class):
+        from ai_services.analyzer import VideoAnalyzer
+        from videos.models import VideoFrame
+        from .tasks import analyze_frames_stage
+
+        mock_analyzer_class.return_value.generate_findings.side_effect = VideoAnalyzer.for_scoring().generate_findings
+        mock_analyzer_class.return_value.rekognition.client = None
+        self.inspection.mode = Inspection.Mode.COACHING
+        self.inspection.save()
+        frames = [
+            VideoFrame.objects.create(video=self.video, frame_number=i, timestamp=float(i), width=640, height=360)
+            for i in range(6)
+        ]
+
+        seen = []
+        preliminary = {}
+
+        def analyze(analyzer, frame, plan):
+            inspection = Inspection.objects.get(id=self.inspection.id)
+            seen.append((frame.frame_number, inspection.status, inspection.progress))
+            if frame.frame_number == 1 and inspection.status == Inspection.Status.PARTIAL:
+                preliminary.update(inspection.ai_analysis['preliminary'], score=inspection.overall_score)
+            spill = {'name': 'spill', 'confidence': 90.0 - frame.frame_number,
+                     'bounding_box': {'Left': 0.1 * frame.frame_number, 'Top': 0.1, 'Width': 0.05, 'Height': 0.05}}
+            return {'overall_score': 60.0 + frame.frame_number * 5, 'cleanliness_analysis': [spill]}
+
+        mock_analyze_frame.side_effect = analyze
+
+        def run():
+            seen.clear()
+            VideoFrame.objects.filter(video=self.video).update(ai_analysis=None)
+            return analyze_frames_stage({'inspection_id': self.inspection.id})
+
+        with override_settings(PROGRESSIVE_ANALYSIS_ENABLED=False):
+            expected_payload = run()
+        self.assertEqual([number for number, _, _ in seen], [0, 1, 2, 3, 4, 5])
+        expected_analyses = Inspection.objects.get(id=self.inspection.id).ai_analysis['frame_analyses']
+
+        payload = run()
+
+        # The first and last frames are analyzed first, then the inspection is PARTIAL
+        self.assertEqual([number for number, _, _ in seen], [0, 5, 1, 2, 3, 4])
+        self.assertEqual(seen[2][1:], (Inspection.Status.PARTIAL, 2 / 6))
+        self.assertEqual(seen[5][1:], (Inspection.Status.PARTIAL, 5 / 6))
+        self.assertEqual(preliminary['score'], 72.5)
+        self.assertEqual(preliminary['frames_analyzed'], 2)
+        self.assertEqual([finding['frame_id'] for finding in preliminary['top_findings']], [frames[0].id])
+
+        # The final result does not depend on the order frames were analyzed in
+        self.inspection.refresh_from_db()
+        self.assertEqual(self.inspection.ai_analysis['frame_analyses'], expected_analyses)
+        self.assertEqual(payload['findings'], expected_payload['findings'])
+        self.assertEqual(self.inspection.progress, 1.0)
+        self.assertEqual(frames[0].id, payload['findings'][0]['frame_id'])
+
+    @override_settings(PROGRESSIVE_KEYFRAMES=4)
+    @patch('inspections.tasks.plan_frame_analysis')
+    @patch('inspections.tasks.VideoAnalyzer')
+    @patch('inspections.tasks.analyze_stored_frames')
+    def test_progressive_analysis_matches_regular_analysis(self, mock_analyze_frames, mock_analyzer_class, mock_plan):
+        from ai_services.analyzer import VideoAnalyzer
+        from videos.models import VideoFrame
+        from .tasks import analyze_frames_stage, calculate_inspection_scores
+
+        mock_plan.return_value = {'use_s3_object': False, 'label_mosaic': True, 'frames_per_call': 2}
+        mock_analyzer_class.return_value.generate_findings.side_effect = VideoAnalyzer.for_scoring().generate_findings
+        mock_analyzer_class.return_value.rekognition.client = None
+        self.inspection.mode = Inspection.Mode.COACHING
+        self.inspection.save()
+        self.brand.inspection_config = {'frame_policy': {'coaching': {
+            'min_frames': 2, 'stability_window': 2, 'stability_band': 1.0,
+        }}}
+        self.brand.save()
+        for i in range(8):
+            VideoFrame.objects.create(video=self.video, frame_number=i, timestamp=float(i), width=640, height=360)
+
+        batches = []
+
+        def analyze(analyzer, frames, plan):
+            # Like a label mosaic, a frame's result depends on the batch it was analyzed in
+            batches.append([frame.frame_number for frame in frames])
+            score = 80.0 if frames[0].frame_number < 4 else 40.0
+            return [
+                {'overall_score': score, 'cleanliness_analysis': [{
+                    'name': 'spill', 'confidence': 90.0 - frames[0].frame_number,
+                    'bounding_box': {'Left': 0.1 * frame.frame_number, 'Top': 0.1, 'Width': 0.05, 'Height': 0.05},
+                }]}
+                for frame in frames
+            ]
+
+        mock_analyze_frames.side_effect = analyze
+
+        def run():
+            batches.clear()
+            VideoFrame.objects.filter(video=self.video).update(ai_analysis=None)
+            payload = analyze_frames_stage({'inspection_id': self.inspection.id})
+            analyses = Inspection.objects.get(id=self.inspection.id).ai_analysis['frame_analyses']
+            return payload['findings'], analyses, calculate_inspection_scores(analyses)
+
+        with override_settings(PROGRESSIVE_ANALYSIS_ENABLED=False):
+            expected = run()
+        self.assertEqual(batches, [[0, 1], [2, 3]])
+
+        result = run()
+
+        # The keyframe batches run first, but batches and the early stop are the same
+        self.assertEqual(batches, [[0, 1], [6, 7], [2, 3]])
+        self.assertEqual(result, expected)
+        self.assertEqual(len(result[1]), 4)
+
+    @override_settings(PROGRESSIVE_KEYFRAMES=4)
+    @patch('inspections.tasks.plan_frame_analysis')
+    @patch('inspections.tasks.VideoAnalyzer')
+    @patch('inspections.tasks.analyze_stored_frames')
+    def test_progressive_analysis_stops_at_same_frame_as_regular_analysis(self, mock_analyze_frames,
+                                                                         mock_analyzer_class, mock_plan):
+        from videos.models import VideoFrame
+        from .tasks import analyze_frames_stage
+
+        scores = [100.0, 0.0, 80.0, 0.0, 80.0, 50.0, 50.0, 50.0]
+        mock_plan.return_value = {'use_s3_object': False, 'label_mosaic': False, 'frames_per_call': 1}
+        mock_analyzer_class.return_value.generate_findings.return_value = []
+        mock_analyzer_class.return_value.rekognition.client = None
+        mock_analyze_frames.side_effect = lambda analyzer, frames, plan: [
+            {'overall_score': scores[frame.frame_number]} for frame in frames
+        ]
+        self.inspection.mode = Inspection.Mode.COACHING
+        self.inspection.save()
+        self.brand.inspection_config = {'frame_policy': {'coaching': {
+            'min_frames': 2, 'stability_window': 2, 'stability_band': 10.0,
+        }}}
+        self.brand.save()
+        for i in range(len(scores)):
+            VideoFrame.objects.create(video=self.video, frame_number=i, timestamp=float(i), width=640, height=360)
+
+        def run():
+            VideoFrame.objects.filter(video=self.video).update(ai_analysis=None)
+            analyze_frames_stage({'inspection_id': self.inspection.id})
+            return Inspection.objects.get(id=self.inspection.id).ai_analysis['frame_analyses']
+
+        with override_settings(PROGRESSIVE_ANALYSIS_ENABLED=False):
+            expected = run()
+        self.assertEqual(len(expected), 5)
+
+        # The keyframes (0, 2, 5, 7) leave gaps that later batches fill one frame at a time
+        self.assertEqual(run(), expected)
+
+    @patch('inspections.tasks.VideoAnalyzer')
+    @patch('inspections.tasks.analyze_stored_frame')
+    def test_analyze_stage_stops_once_scores_are_stable(self, mock_analyze_frame, mock_analyzer_class):
+        from videos.models import VideoFrame
+        from .tasks import analyze_frames_stage
+
+        mock_analyzer_class.return_value.generate_findings.return_value = []
+        mock_analyzer_class.return_value.rekognition.client = None
+        mock_analyze_frame.return_value = {'overall_score': 80.0}
+        self.brand.inspection_config = {'frame_policy': {'enterprise': {
+            'min_frames': 3, 'stability_window': 2, 'stability_band': 1.0,
+        }}}
+        self.brand.save()
+        for i in range(6):
+            VideoFrame.objects.create(video=self.video, frame_number=i, timestamp=float(i), width=640, height=360)
+
+        analyze_frames_stage({'inspection_id': self.inspection.id})
+
+        self.assertEqual(mock_analyze_frame.call_count, 3)
+        self.inspection.refresh_from_db()
+        self.assertEqual(self.inspection.ai_analysis['analysis_summary']['total_frames_analyzed'], 3)
+        self.video.refresh_from_db()
+        self.assertEqual(self.video.metadata['frame_budget']['analyzed_frames'], 3)
+        self.assertEqual(self.video.metadata['frame_budget']['stop_reason'], 'scores_stable')
+
+    @override_settings(FRAME_MIN_SHARPNESS=40.0, FRAME_MIN_BRIGHTNESS=35.0, FRAME_MAX_BRIGHTNESS=225.0)
+    @patch('inspections.tasks.VideoAnalyzer')
+    @patch('inspections.tasks.analyze_stored_frame')
+    def test_analyze_stage_skips_low_quality_frames(self, mock_analyze_frame, mock_analyzer_class):
+        from videos.models import VideoFrame
+        from .tasks import analyze_frames_stage
+
+        mock_analyzer_class.return_value.generate_findings.return_value = []
+        mock_analyzer_class.return_value.rekognition.client = None
+        mock_analyze_frame.return_value = {'overall_score': 70.0}
+        sharp = VideoFrame.objects.create(
+            video=self.video, frame_number=0, timestamp=0.0, width=640, height=360,
+            sharpness=250.0, brightness=120.0
+        )
+        VideoFrame.objects.create(
+            video=self.video, frame_number=1, timestamp=1.0, width=640, height=360,
+            sharpness=5.0, brightness=120.0
+        )
+        VideoFrame.objects.create(
+            video=self.video, frame_number=2, timestamp=2.0, width=640, height=360,
+            sharpness=250.0, brightness=10.0
+        )
+
+        analyze_frames_stage({'inspection_id': self.inspection.id})
+
+        mock_analyze_frame.assert_called_once()
+        self.assertEqual(mock_analyze_frame.call_args[0][1], sharp)
+        self.inspection.refresh_from_db()
+        self.assertEqual(self.inspection.ai_analysis['analysis_summary']['frames_skipped_low_quality'], 2)
+
+    @patch('inspections.tasks.VideoAnalyzer')
+    @patch('inspections.tasks.analyze_stored_frame')
+    def test_multi_video_results_merged_by_last_video(self, mock_analyze_frame, mock_analyzer_class):
+        from videos.models import VideoFrame
+        from .serializers import InspectionSerializer
+        from .tasks import analyze_frames_stage, persist_results_stage
+
+        mock_analyzer_class.return_value.generate_findings.side_effect = lambda analysis, frame: [{
+            'category': 'CLEANLINESS', 'severity': 'MEDIUM', 'title': f'Spill {frame.video.title}',
+            'description': '', 'confidence': 0.8, 'frame': frame,
+        }]
+        mock_analyzer_class.return_value.rekognition.client = None
+        mock_analyze_frame.return_value = {'overall_score': 90.0}
+        dining = Video.objects.create(
+            uploaded_by=self.user, store=self.store, title="Dining", file="dining.mp4", inspection=self.inspection
+        )
+        for video in (self.video, dining):
+            for i in range(2):
+                VideoFrame.objects.create(video=video, frame_number=i, timestamp=float(i), width=640, height=360)
+
+        first = analyze_frames_stage({'inspection_id': self.inspection.id, 'video_id': self.video.id})
+
+        # The other video is still pending, so nothing is merged yet
+        self.assertFalse(first['merged'])
+        self.assertEqual(first['findings'], [])
+        persist_results_stage(first)
+        self.inspection.refresh_from_db()
+        self.assertNotEqual(self.inspection.status, Inspection.Status.COMPLETED)
+        self.assertEqual(self.inspection.progress, 0.5)
+        progress = InspectionSerializer(self.inspection).data['video_progress']
+        self.assertEqual({entry['video_id']: entry['progress'] for entry in progress}, {self.video.id: 1.0, dining.id: 0.0})
+
+        second = analyze_frames_stage({'inspection_id': self.inspection.id, 'video_id': dining.id})
+
+        self.assertTrue(second['merged'])
+        self.assertEqual(len(second['findings']), 2)
+        persist_results_stage(second)
+        self.inspection.refresh_from_db()
+        self.assertEqual(self.inspection.status, Inspection.Status.COMPLETED)
+        self.assertEqual(len(self.inspection.ai_analysis['frame_analyses']), 4)
+        self.assertEqual(self.inspection.ai_analysis['analysis_summary']['total_frames_analyzed'], 4)
+        self.assertEqual(
+            set(self.inspection.findings.values_list('frame__video_id', flat=True)), {self.video.id, dining.id}
+        )
+        self.assertEqual(set(self.inspection.videos.values_list('status', flat=True)), {Video.Status.COMPLETED})
+
+    @patch('inspections.tasks.VideoAnalyzer')
+    @patch('inspections.tasks.analyze_stored_frame')
+    def test_merge_waits_only_for_confirmed_uploads(self, mock_analyze_frame, mock_analyzer_class):
+        from uploads.models import Upload
+        from videos.models import VideoFrame
+        from .tasks import analyze_frames_stage
+
+        mock_analyzer_class.return_value.generate_findings.return_value = []
+        mock_analyzer_class.return_value.rekognition.client = None
+        mock_analyze_frame.return_value = {'overall_score': 90.0}
+        VideoFrame.objects.create(video=self.video, frame_number=0, timestamp=0.0, width=640, height=360)
+        upload = Upload.objects.create(
+            store=self.store, mode=Upload.Mode.ENTERPRISE, s3_key="uploads/storage.mp4",
+            original_filename="storage.mp4", created_by=self.user, inspection=self.inspection
+        )
+
+        # An upload that was never confirmed does not hold the inspection back
+        self.assertTrue(analyze_frames_stage({'inspection_id': self.inspection.id})['merged'])
+
+        upload.status = Upload.Status.PROCESSING
+        upload.save()
+        self.assertFalse(analyze_frames_stage({'inspection_id': self.inspection.id})['merged'])
+
+    @patch('inspections.tasks.default_storage')
+    def test_analyze_stored_frame_passes_s3_reference(self, mock_storage):
+        from videos.models import VideoFrame
+        from .tasks import analyze_stored_frame
+
+        mock_storage.bucket_name = 'test-bucket'
+        mock_storage.location = 'media'
+        analyzer = MagicMock()
+        analyzer.analyze_frame.return_value = {'overall_score': 80.0}
+        frame = VideoFrame.objects.create(
+            video=self.video, frame_number=0, timestamp=0.0, width=640, height=360,
+            image='frames/video_1_frame_0.jpg'
+        )
+
+        result = analyze_stored_frame(analyzer, frame, {'use_s3_object': True})
+
+        self.assertEqual(result, {'overall_score': 80.0})
+        mock_storage.open.assert_not_called()
+        analyzer.analyze_frame.assert_called_once_with(None, frame_s3_image={
+            'S3Object': {'Bucket': 'test-bucket', 'Name': 'media/frames/video_1_frame_0.jpg'}
+        }, previous=None)
+
+    @override_settings(REKOGNITION_USE_S3_OBJECTS=True)
+    @patch('inspections.tasks.default_storage')
+    def test_frame_bytes_fetched_only_for_local_detectors(self, mock_storage):
+        from .tasks import plan_frame_analysis
+
+        mock_storage.bucket_name = 'test-bucket'
+        analyzer = MagicMock()
+        analyzer.needs_local_frame.return_value = False
+        self.assertTrue(plan_frame_analysis(analyzer)['use_s3_object'])
+
+        analyzer.needs_local_frame.return_value = True
+        self.assertFalse(plan_frame_analysis(analyzer)['use_s3_object'])
+
+    @override_settings(REKOGNITION_USE_S3_OBJECTS=True, REKOGNITION_LABEL_MOSAIC=True)
+    @patch('inspections.tasks.default_storage')
+    def test_label_mosaic_batches_frames_from_bytes(self, mock_storage):
+        from videos.models import VideoFrame
+        from .tasks import analyze_stored_frames, plan_frame_analysis
+
+        mock_storage.bucket_name = 'test-bucket'
+        mock_storage.open.return_value.__enter__.return_value.read.return_value = b'frame-bytes'
+        analyzer = MagicMock()
+        analyzer.needs_local_frame.return_value = False
+        analyzer.analyze_frames.side_effect = lambda frames, label_mosaic, previous: [{'overall_score': 75.0} for _ in frames]
+
+        plan = plan_frame_analysis(analyzer)
+        self.assertFalse(plan['use_s3_object'])
+        self.assertEqual(plan['frames_per_call'], 4)
+
+        frames = [
+            VideoFrame.objects.create(
+                video=self.video, frame_number=i, timestamp=float(i), width=640, height=360,
+                image=f'frames/video_1_frame_{i}.jpg'
+            )
+            for i in range(3)
+        ]
+        results = analyze_stored_frames(analyzer, frames, plan)
+
+        self.assertEqual(results, [{'overall_score': 75.0}] * 3)
+        analyzer.analyze_frames.assert_called_once()
+        self.assertTrue(analyzer.analyze_frames.call_args.kwargs['label_mosaic'])
+        analyzer.analyze_frame.assert_not_called()
+        self.assertEqual([frame.data for frame in analyzer.analyze_frames.call_args[0][0]], [b'frame-bytes'] * 3)
+
+    @override_settings(DETECTION_BULK_BATCH_SIZE=2)
+    def test_rescore_from_stored_detections(self):
+        from uploads.models import Upload, Detection
+        from videos.models import VideoFrame
+        from .tasks import calculate_inspection_scores, rescore_from_detections, store_frame_detections
+
+        upload = Upload.objects.create(
+            store=self.store, mode=Upload.Mode.ENTERPRISE, s3_key="uploads/test.mp4",
+            original_filename="test.mp4", created_by=self.user
+        )
+        self.video.upload = upload
+        self.video.save()
+        analysis = {
+            'rekognition_available': True,
+            'ppe_analysis': {'persons': [{'confidence': 99.0, 'bounding_box': {}, 'body_parts': []}]},
+            'cleanliness_analysis': [{'class': 'spill', 'confidence': 0.8,
+                                      'bounding_box': {'x1': 1, 'y1': 2, 'x2': 30, 'y2': 40}}],
+        }
+        frames = [
+            VideoFrame.objects.create(
+                video=self.video, frame_number=i, timestamp=i * 0.5, width=640, height=360, ai_analysis=analysis
+            )
+            for i in range(2)
+        ]
+        store_frame_detections(upload.id, frames)
+        self.assertEqual(Detection.objects.filter(upload=upload, type='cleanliness').count(), 2)
+
+        reviewed = Finding.objects.create(
+            inspection=self.inspection, category='PPE', severity='HIGH', title='Reviewed',
+            description='', confidence=0.9, is_approved=True
+        )
+        Finding.objects.create(
+            inspection=self.inspection, category='PPE', severity='HIGH', title='Stale',
+            description='', confidence=0.9
+        )
+
+        with patch('ai_services.rekognition.boto3.client') as mock_boto3:
+            self.assertTrue(rescore_from_detections(self.inspection))
+            mock_boto3.assert_not_called()
+
+        self.inspection.refresh_from_db()
+        self.assertEqual(self.inspection.ppe_score, calculate_inspection_scores([
+            {'ppe_analysis': {'summary': {'total_persons': 1}}}
+        ])['ppe_score'])
+        titles = set(self.inspection.findings.values_list('title', flat=True))
+        self.assertIn('Reviewed', titles)
+        self.assertNotIn('Stale', titles)
+        spill = self.inspection.findings.get(title='Spill or Mess Detected')
+        self.assertEqual((spill.affected_frame_count, spill.first_timestamp, spill.frame), (2, 0.0, frames[0]))
+        self.assertTrue(Finding.objects.filter(id=reviewed.id).exists())
+
+    @override_settings(RESCORE_CHUNK_SIZE=2, RESCORE_CHUNKS_PER_TASK=1, RESCORE_PAUSE_SECONDS=0, RESCORE_PROCESSES=0)
+    @patch('inspections.tasks.rescore_inspections_task.delay')
+    def test_rescore_job_updates_changed_scores_in_chunks(self, mock_delay):
+        from .tasks import rescore_inspections_task
+
+        stale = []
+        for _ in range(3):
+            inspection = create_inspection_with_video(self.video)
+            inspection.status = Inspection.Status.COMPLETED
+            inspection.overall_score = 10.0
+            inspection.ai_analysis = {'frame_analyses': [{'overall_score': 10.0, 'rekognition_available': False}]}
+            inspection.save()
+            stale.append(inspection)
+
+        # The first run handles one chunk and re-queues itself after its last inspection
+        rescore_inspections_task(0)
+        mock_delay.assert_called_once()
+        rescore_inspections_task(mock_delay.call_args[0][0])
+
+        for inspection in stale:
+            inspection.refresh_from_db()
+            # Without Rekognition only uniform and menu board count, both perfect here
+            self.assertEqual(inspection.overall_score, 100.0)
+        self.assertEqual(mock_delay.call_count, 2)
+
+    def test_rescore_keeps_scores_of_inspections_reanalyzed_meanwhile(self):
+        from uploads.models import Scorecard, Upload
+        from uploads.scorecards import build_scorecard
+        from .rescoring import InspectionRescorer
+
+        inspections = []
+        for name in ['stale', 'reanalyzed']:
+            upload = Upload.objects.create(
+                store=self.store, mode=Upload.Mode.ENTERPRISE, s3_key=f"uploads/{name}.mp4",
+                original_filename=f"{name}.mp4", created_by=self.user
+            )
+            inspection = Inspection.objects.create(
+                title=name, store=self.store, status=Inspection.Status.COMPLETED, overall_score=10.0,
+                ai_analysis={'frame_analyses': [{'overall_score': 10.0, 'rekognition_available': False}]}
+            )
+            Video.objects.create(
+                uploaded_by=self.user, store=self.store, title=name, file=f"{name}.mp4",
+                upload=upload, inspection=inspection
+            )
+            build_scorecard(inspection)
+            inspections.append(inspection)
+        stale, reanalyzed = inspections
+
+        rescorer = InspectionRescorer()
+        score = rescorer._score
+
+        def score_while_reanalyzing(payloads):
+            # The analysis pipeline writes fresh scores while the chunk is being scored
+            reanalyzed.overall_score = 55.0
+            reanalyzed.save(update_fields=['overall_score', 'updated_at'])
+            return score(payloads)
+
+        with patch.object(rescorer, '_score', side_effect=score_while_reanalyzing):
+            rescorer.rescore_chunk()
+
+        stale.refresh_from_db()
+        reanalyzed.refresh_from_db()
+        self.assertEqual(stale.overall_score, 100.0)
+        self.assertEqual(Scorecard.objects.get(upload__videos__inspection=stale).total_score, 100.0)
+        self.assertEqual(reanalyzed.overall_score, 55.0)
+        self.assertEqual(rescorer.updated, 1)
+
+
+class FindingSuppressionTest(TestCase):
+    """Test suppression of findings matching false positives rejected at the store"""
+
+    def setUp(self):
+        self.brand = Brand.objects.create(name="Test Brand")
+        self.store = Store.objects.create(
+            brand=self.brand, name="Test Store", code="TS001",
+            address="123 Test St", city="Test City", state="TS", zip_code="12345"
+        )
+        self.user = User.objects.create_user(username="testuser", store=self.store)
+        self.video = Video.objects.create(
+            uploaded_by=self.user, store=self.store, title="Test Video", file="test.mp4"
+        )
+        self.inspection = create_inspection_with_video(self.video)
+
+    def _sign(self, left=0.1, **fields):
+        return {
+            'category': 'SAFETY', 'severity': 'CRITICAL', 'title': 'Blocked Exit/Pathway',
+            'description': 'Detected blocked exit or pathway: blocked sign', 'confidence': 0.8,
+            'label': 'blocked sign', 'bounding_box': {'Left': left, 'Top': 0.1, 'Width': 0.1, 'Height': 0.1},
+            **fields,
+        }
+
+    def _reject(self, store, times):
+        from django.utils import timezone
+
+        earlier = Inspection.objects.create(title="Earlier", store=store, created_by=self.user)
+        for _ in range(times):
+            finding_data = self._sign()
+            finding_data.pop('confidence')
+            Finding.objects.create(
+                inspection=earlier, confidence=0.8, is_rejected=True, rejected_at=timezone.now(), **finding_data
+            )
+
+    def _create(self, findings_data):
+        from ai_services.bedrock_service import BedrockRecommendationService
+        from .tasks import create_findings_from_analysis
+
+        return create_findings_from_analysis(
+            self.inspection, findings_data, BedrockRecommendationService(enabled=False)
+        )
+
+    def test_repeatedly_rejected_findings_are_dropped(self):
+        self._reject(self.store, times=2)
+
+        created = self._create([self._sign(), self._sign(left=0.8), self._sign(label='exit blocked by cart')])
+
+        # Same region and label are suppressed; another region or label is kept as is
+        self.assertEqual(len(created), 2)
+        self.assertEqual({finding.severity for finding in created}, {'CRITICAL'})
+        self.inspection.refresh_from_db()
+        summary = self.inspection.ai_analysis['analysis_summary']
+        self.assertEqual((summary['findings_suppressed'], summary['findings_downgraded']), (1, 0))
+
+    def test_rules_are_evaluated_on_suppressed_findings(self):
+        from uploads.models import Rule, Violation
+        from uploads.rule_engine import RuleEngine
+        from .suppression import suppress_frame_findings
+
+        rule = Rule.objects.create(
+            brand=self.brand, code="SAFETY", name="Safety", description="Safety",
+            config_json={"type": "safety_check"}
+        )
+        frame = Mock(timestamp=1.0, width=640, height=360)
+        frame.image.name = "frames/f1.jpg"
+        engine = RuleEngine(self.brand)
+
+        self._reject(self.store, times=1)
+        violations = engine.evaluate(suppress_frame_findings(self.store.id, [(frame, [self._sign()])]))
+        # Downgraded from CRITICAL like the finding itself
+        self.assertEqual([(v['rule_id'], v['severity']) for v in violations], [(rule.id, Violation.Severity.HIGH)])
+
+        self._reject(self.store, times=1)
+        violations = engine.evaluate(suppress_frame_findings(self.store.id, [(frame, [self._sign()])]))
+        self.assertEqual(violations, [])
+
+    def test_single_rejection_downgrades_and_other_stores_are_ignored(self):
+        self._reject(self.store, times=1)
+        other_store = Store.objects.create(
+            brand=self.brand, name="Other Store", code="TS002",
+            address="456 Test St", city="Test City", state="TS", zip_code="12345"
+        )
+        self._reject(other_store, times=3)
+
+        created = self._create([self._sign()])
+
+        self.assertEqual([finding.severity for finding in created], ['HIGH'])
+        self.assertEqual(created[0].label, 'blocked sign')
+        self.inspection.refresh_from_db()
+        self.assertEqual(self.inspection.ai_analysis['analysis_summary']['findings_downgraded'], 1)
@@ -10,6 +10,7 @@ from .serializers import (
     InspectionSerializer, InspectionListSerializer, FindingSerializer,
     ActionItemSerializer, ActionItemUpdateSerializer
 )
+from uploads.scorecards import apply_finding_review, review_state
 
 
 class InspectionListView(generics.ListAPIView):
@@ -124,30 +125,43 @@ def start_inspection(request, video_id):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Create inspection with metadata from video
-        inspection = Inspection.objects.create(
-            title=video.title,
-            created_by=video.uploaded_by,
-            store=video.store,
-            mode=mode,
-            status=Inspection.Status.PENDING
-        )
+        # The analysis runs under the video's pipeline lock, so it cannot overlap a reprocess of the video
+        from .tasks import analyze_video
+        from videos.tasks import analysis_lock_kwargs, video_pipeline_lock
+        lock = video_pipeline_lock(video)
+        if not lock.acquire():
+            return Response(
+                {'error': 'Video is already being processed', 'code': 'already_running', 'video_id': video.id},
+                status=status.HTTP_409_CONFLICT
+            )
 
-        # Link video to inspection
-        video.inspection = inspection
-        video.save(update_fields=['inspection'])
+        try:
+            # Create inspection with metadata from video
+            inspection = Inspection.objects.create(
+                title=video.title,
+                created_by=video.uploaded_by,
+                store=video.store,
+                mode=mode,
+                status=Inspection.Status.PENDING
+            )
 
-        # Set expiration based on mode
-        if mode == Inspection.Mode.COACHING:
-            from datetime import timedelta
-            from django.conf import settings
-            retention_days = getattr(settings, 'COACHING_MODE_RETENTION_DAYS', 7)
-            inspection.expires_at = timezone.now() + timedelta(days=retention_days)
-            inspection.save()
+            # Link video to inspection
+            video.inspection = inspection
+            video.save(update_fields=['inspection'])
 
-        # Trigger AI analysis
-        from .tasks import analyze_video
-        analyze_video.delay(inspection.id)
+            # Set expiration based on mode
+            if mode == Inspection.Mode.COACHING:
+                from datetime import timedelta
+                from django.conf import settings
+                retention_days = getattr(settings, 'COACHING_MODE_RETENTION_DAYS', 7)
+                inspection.expires_at = timezone.now() + timedelta(days=retention_days)
+                inspection.save()
+
+            # Trigger AI analysis
+            analyze_video.delay(inspection.id, **analysis_lock_kwargs(lock))
+        except Exception:
+            lock.release()
+            raise
 
         return Response(InspectionSerializer(inspection).data, status=status.HTTP_201_CREATED)
 
@@ -207,6 +221,8 @@ def approve_finding(request, finding_id):
                 status=status.HTTP_403_FORBIDDEN
             )
 
+        previous_state = review_state(finding)
+
         # Approve the finding
         finding.is_approved = True
         finding.is_rejected = False  # Clear rejection if previously rejected
@@ -216,6 +232,7 @@ def approve_finding(request, finding_id):
         finding.rejected_at = None
         finding.rejection_reason = ''
         finding.save()
+        apply_finding_review(finding, previous_state)
 
         return Response(FindingSerializer(finding).data, status=status.HTTP_200_OK)
 
@@ -245,6 +262,8 @@ def reject_finding(request, finding_id):
                 status=status.HTTP_403_FORBIDDEN
             )
 
+        previous_state = review_state(finding)
+
         # Reject the finding
         finding.is_rejected = True
         finding.is_approved = False  # Clear approval if previously approved
@@ -254,6 +273,7 @@ def reject_finding(request, finding_id):
         finding.approved_by = None
         finding.approved_at = None
         finding.save()
+        apply_finding_review(finding, previous_state)
 
         return Response(FindingSerializer(finding).data, status=status.HTTP_200_OK)
 
@@ -298,6 +318,7 @@ def create_manual_finding(request, inspection_id):
             approved_by=request.user,
             approved_at=timezone.now()
         )
+        apply_finding_review(finding)
 
         return Response(FindingSerializer(finding).data, status=status.HTTP_201_CREATED)
 
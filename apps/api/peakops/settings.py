@@ -224,6 +224,35 @@ CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
 
+# Pipeline runs hold a Redis lease lock on the upload/video/inspection they
+# process; stages renew it while running and it expires if a worker dies.
+PIPELINE_LOCK_TTL_SECONDS = config('PIPELINE_LOCK_TTL_SECONDS', default=600, cast=int)
+IDEMPOTENCY_KEY_TTL_SECONDS = config('IDEMPOTENCY_KEY_TTL_SECONDS', default=86400, cast=int)
+
+# Video pipeline stage queues - each stage gets its own queue so I/O bound
+# (S3 transfers, DB writes), CPU bound (ffprobe/ffmpeg) and API bound (AI
+# analysis) worker pools can be sized independently. Stages hand temp files
+# to each other through MEDIA_ROOT/temp, which must be shared by the pools.
+VIDEO_PIPELINE_QUEUES = {
+    'fetch': config('VIDEO_PIPELINE_FETCH_QUEUE', default='video_fetch'),
+    'probe': config('VIDEO_PIPELINE_PROBE_QUEUE', default='video_probe'),
+    'extract': config('VIDEO_PIPELINE_EXTRACT_QUEUE', default='video_extract'),
+    'store': config('VIDEO_PIPELINE_STORE_QUEUE', default='video_store'),
+    'analyze': config('VIDEO_PIPELINE_ANALYZE_QUEUE', default='video_analyze'),
+    'persist': config('VIDEO_PIPELINE_PERSIST_QUEUE', default='video_persist'),
+}
+
+CELERY_TASK_ROUTES = {
+    'videos.tasks.fetch_video_stage': {'queue': VIDEO_PIPELINE_QUEUES['fetch']},
+    'videos.tasks.probe_video_stage': {'queue': VIDEO_PIPELINE_QUEUES['probe']},
+    'videos.tasks.extract_frames_stage': {'queue': VIDEO_PIPELINE_QUEUES['extract']},
+    'videos.tasks.store_frames_stage': {'queue': VIDEO_PIPELINE_QUEUES['store']},
+    'inspections.tasks.analyze_frames_stage': {'queue': VIDEO_PIPELINE_QUEUES['analyze']},
+    'inspections.tasks.persist_results_stage': {'queue': VIDEO_PIPELINE_QUEUES['persist']},
+    'videos.tasks.analyze_video_range_task': {'queue': VIDEO_PIPELINE_QUEUES['analyze']},
+    'inspections.tasks.rescore_inspections_task': {'queue': config('RESCORE_QUEUE', default='maintenance')},
+}
+
 # Celery Beat Schedule for automated tasks
 CELERY_BEAT_SCHEDULE = {
     # Daily retention cleanup at 2 AM
@@ -266,6 +295,68 @@ COACHING_MODE_RETENTION_DAYS = config('COACHING_MODE_RETENTION_DAYS', default=7,
 ENABLE_AWS_REKOGNITION = config('ENABLE_AWS_REKOGNITION', default=True, cast=bool)
 ENABLE_YOLO_DETECTION = config('ENABLE_YOLO_DETECTION', default=False, cast=bool)
 ENABLE_OCR_DETECTION = config('ENABLE_OCR_DETECTION', default=True, cast=bool)
+
+# Run EasyOCR in a dedicated pool of this many processes (0 = in the worker
+# itself). Each pool process keeps a warm reader and gets frames through shared
+# memory. The Celery worker must be allowed to start child processes.
+OCR_POOL_PROCESSES = config('OCR_POOL_PROCESSES', default=0, cast=int)
+OCR_POOL_BATCH_SIZE = config('OCR_POOL_BATCH_SIZE', default=4, cast=int)
+OCR_POOL_TIMEOUT_SECONDS = config('OCR_POOL_TIMEOUT_SECONDS', default=120, cast=int)
+
+# Only OCR the text lines Rekognition detect_text found (padded by this
+# fraction of the line height and merged); frames without text skip EasyOCR.
+OCR_REGION_GATING = config('OCR_REGION_GATING', default=True, cast=bool)
+OCR_REGION_PADDING = config('OCR_REGION_PADDING', default=0.5, cast=float)
+
+# Reuse a store's last menu board result when the board region's perceptual
+# hash is within MAX_DISTANCE bits and the result is younger than MAX_AGE_HOURS.
+MENU_BOARD_CACHE_ENABLED = config('MENU_BOARD_CACHE_ENABLED', default=True, cast=bool)
+MENU_BOARD_CACHE_MAX_DISTANCE = config('MENU_BOARD_CACHE_MAX_DISTANCE', default=6, cast=int)
+MENU_BOARD_CACHE_MAX_AGE_HOURS = config('MENU_BOARD_CACHE_MAX_AGE_HOURS', default=168, cast=int)
+MENU_BOARD_CACHE_MAX_ENTRIES = config('MENU_BOARD_CACHE_MAX_ENTRIES', default=8, cast=int)
+
+# Findings of the same object in consecutive frames are merged into one track:
+# boxes match on IoU, else on centroid distance relative to the box diagonal,
+# and a track survives MAX_MISSED_FRAMES analyzed frames without a match.
+TRACKING_IOU_THRESHOLD = config('TRACKING_IOU_THRESHOLD', default=0.3, cast=float)
+TRACKING_MAX_CENTROID_DISTANCE = config('TRACKING_MAX_CENTROID_DISTANCE', default=0.5, cast=float)
+TRACKING_MAX_MISSED_FRAMES = config('TRACKING_MAX_MISSED_FRAMES', default=1, cast=int)
+
+# Findings matching ones managers rejected at the same store (category, title,
+# object label and box region on a GRID x GRID grid) are downgraded one
+# severity level, and dropped once rejected MIN_REJECTIONS times within the
+# lookback window.
+FINDING_SUPPRESSION_ENABLED = config('FINDING_SUPPRESSION_ENABLED', default=True, cast=bool)
+FINDING_SUPPRESSION_LOOKBACK_DAYS = config('FINDING_SUPPRESSION_LOOKBACK_DAYS', default=90, cast=int)
+FINDING_SUPPRESSION_MIN_REJECTIONS = config('FINDING_SUPPRESSION_MIN_REJECTIONS', default=2, cast=int)
+FINDING_SUPPRESSION_GRID = config('FINDING_SUPPRESSION_GRID', default=4, cast=int)
+
+# Coaching mode analyzes PROGRESSIVE_KEYFRAMES spread-out frames first (rounded
+# up to whole analysis batches) and publishes a preliminary score and its top
+# findings (status PARTIAL) before the remaining frames refine the result.
+PROGRESSIVE_ANALYSIS_ENABLED = config('PROGRESSIVE_ANALYSIS_ENABLED', default=True, cast=bool)
+PROGRESSIVE_KEYFRAMES = config('PROGRESSIVE_KEYFRAMES', default=4, cast=int)
+PROGRESSIVE_TOP_FINDINGS = config('PROGRESSIVE_TOP_FINDINGS', default=5, cast=int)
+
+# Rows per INSERT when the analysis stage stores an upload's raw detections
+DETECTION_BULK_BATCH_SIZE = config('DETECTION_BULK_BATCH_SIZE', default=1000, cast=int)
+
+# Historical re-scoring job: inspections per chunk (one bulk_update each),
+# chunks per task run before it re-queues itself, and a pause between chunks
+# to keep the load on a live database low.
+RESCORE_CHUNK_SIZE = config('RESCORE_CHUNK_SIZE', default=500, cast=int)
+RESCORE_CHUNKS_PER_TASK = config('RESCORE_CHUNKS_PER_TASK', default=20, cast=int)
+RESCORE_PAUSE_SECONDS = config('RESCORE_PAUSE_SECONDS', default=0.1, cast=float)
+
+# Scoring processes of a re-scoring task run. Only a worker whose tasks run in
+# its main process (-P solo or threads, as the maintenance worker does) can
+# start them; prefork pool children score in-process.
+RESCORE_PROCESSES = config('RESCORE_PROCESSES', default=2, cast=int)
+
+# Let Rekognition read frames from S3 (Image.S3Object) instead of sending bytes
+# through the worker, when no local detector needs the frame. The bucket must
+# be in AWS_S3_REGION_NAME.
+REKOGNITION_USE_S3_OBJECTS = config('REKOGNITION_USE_S3_OBJECTS', default=True, cast=bool)
 ENABLE_BEDROCK_RECOMMENDATIONS = config('ENABLE_BEDROCK_RECOMMENDATIONS', default=False, cast=bool)
 
 # AWS Rekognition Configuration
@@ -274,6 +365,12 @@ REKOGNITION_OBJECTS_MIN_CONFIDENCE = config('REKOGNITION_OBJECTS_MIN_CONFIDENCE'
 REKOGNITION_MAX_LABELS = config('REKOGNITION_MAX_LABELS', default=50, cast=int)
 REKOGNITION_TEXT_MIN_CONFIDENCE = config('REKOGNITION_TEXT_MIN_CONFIDENCE', default=80, cast=int)
 
+# Tile up to four frames into one mosaic per detect_labels call (objects and
+# people). Cuts label calls 4x at some cost in small-object recall; compare
+# with `manage.py benchmark_pipeline --sections mosaic` before enabling.
+REKOGNITION_LABEL_MOSAIC = config('REKOGNITION_LABEL_MOSAIC', default=False, cast=bool)
+REKOGNITION_MOSAIC_TILE_SIZE = config('REKOGNITION_MOSAIC_TILE_SIZE', default=960, cast=int)
+
 # Operational Compliance Settings
 MAX_PEOPLE_IN_KITCHEN = config('MAX_PEOPLE_IN_KITCHEN', default=10, cast=int)
 MAX_PEOPLE_IN_LINE = config('MAX_PEOPLE_IN_LINE', default=15, cast=int)
@@ -299,6 +396,44 @@ if DEMO_MODE:
 FRAME_SAMPLING_FPS = config('FRAME_SAMPLING_FPS', default=2.5, cast=float)
 MAX_FRAMES_PER_VIDEO = config('MAX_FRAMES_PER_VIDEO', default=20, cast=int)
 
+# 'adaptive' spends the frame budget where the picture changes and drops
+# near-duplicate frames; 'fixed' samples at regular intervals
+FRAME_SAMPLING_STRATEGY = config('FRAME_SAMPLING_STRATEGY', default='adaptive')
+ADAPTIVE_SAMPLING_CANDIDATE_FACTOR = config('ADAPTIVE_SAMPLING_CANDIDATE_FACTOR', default=4, cast=int)
+ADAPTIVE_SAMPLING_MIN_HASH_DISTANCE = config('ADAPTIVE_SAMPLING_MIN_HASH_DISTANCE', default=6, cast=int)
+ADAPTIVE_SAMPLING_SCENE_CUT_THRESHOLD = config('ADAPTIVE_SAMPLING_SCENE_CUT_THRESHOLD', default=0.3, cast=float)
+
+# Frame budget policy per mode, overridable per brand under
+# inspection_config['frame_policy'][mode] (see videos/frame_policy.py).
+# Budgets by duration, daily per-brand caps and early termination on stable
+# scores are off unless configured here or by the brand.
+FRAME_POLICY_DEFAULTS = {
+    'enterprise': {},
+    'coaching': {},
+}
+
+# On-demand range analysis (POST /api/videos/<id>/analyze-range/): frames
+# per second extracted from the range, longest range accepted, and lifetime
+# of the presigned URL ffmpeg seeks in
+RANGE_ANALYSIS_FPS = config('RANGE_ANALYSIS_FPS', default=5.0, cast=float)
+RANGE_ANALYSIS_MAX_SECONDS = config('RANGE_ANALYSIS_MAX_SECONDS', default=30.0, cast=float)
+RANGE_ANALYSIS_URL_EXPIRY_SECONDS = config('RANGE_ANALYSIS_URL_EXPIRY_SECONDS', default=900, cast=int)
+
+# Frame quality gate, measured on a 160px wide downscale: Laplacian variance
+# below FRAME_MIN_SHARPNESS is blurred, mean luma outside the range is too
+# dark or blown out. Low quality frames are not sent to the analyzer.
+FRAME_MIN_SHARPNESS = config('FRAME_MIN_SHARPNESS', default=40.0, cast=float)
+FRAME_MIN_BRIGHTNESS = config('FRAME_MIN_BRIGHTNESS', default=35.0, cast=float)
+FRAME_MAX_BRIGHTNESS = config('FRAME_MAX_BRIGHTNESS', default=225.0, cast=float)
+
+# Frame profile: analysis frames are bounded JPEGs (Rekognition accepts
+# JPEG/PNG only); previews for the web UI may be JPEG or WEBP
+FRAME_MAX_DIMENSION = config('FRAME_MAX_DIMENSION', default=1920, cast=int)
+FRAME_JPEG_QUALITY = config('FRAME_JPEG_QUALITY', default=85, cast=int)
+FRAME_PREVIEW_MAX_DIMENSION = config('FRAME_PREVIEW_MAX_DIMENSION', default=480, cast=int)
+FRAME_PREVIEW_FORMAT = config('FRAME_PREVIEW_FORMAT', default='WEBP')
+FRAME_PREVIEW_QUALITY = config('FRAME_PREVIEW_QUALITY', default=70, cast=int)
+
 # Webhook settings
 WEBHOOK_TIMEOUT_SECONDS = config('WEBHOOK_TIMEOUT_SECONDS', default=30, cast=int)
 WEBHOOK_RETRY_ATTEMPTS = config('WEBHOOK_RETRY_ATTEMPTS', default=3, cast=int)
@@ -126,6 +126,9 @@ class Command(BaseCommand):
                 if not dry_run:
                     # Delete frame image files
                     for frame in frames:
+                        # Deduplicated uploads share frame images with the video they were cloned from
+                        if VideoFrame.objects.filter(image=frame.image.name).exclude(video=video).exists():
+                            continue
                         try:
                             if frame.image and hasattr(frame.image, 'path'):
                                 import os
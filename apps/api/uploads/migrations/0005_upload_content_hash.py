@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 02:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('uploads', '0004_rename_inspection_to_enterprise'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='upload',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, help_text='SHA-256 of the video content', max_length=64),
+        ),
+    ]
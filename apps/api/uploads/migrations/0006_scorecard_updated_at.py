@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 03:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('uploads', '0005_upload_content_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scorecard',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 4.2.30 on 2026-10-19 03:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inspections', '0012_inspection_progress_partial'),
+        ('uploads', '0006_scorecard_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='upload',
+            name='inspection',
+            field=models.ForeignKey(blank=True, help_text="Multi-video inspection this upload's video joins (null: the pipeline creates one)", null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='uploads', to='inspections.inspection'),
+        ),
+    ]
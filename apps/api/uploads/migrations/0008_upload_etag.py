@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('uploads', '0007_upload_inspection'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='upload',
+            name='etag',
+            field=models.CharField(blank=True, db_index=True, help_text='S3 ETag of the uploaded object', max_length=100),
+        ),
+    ]
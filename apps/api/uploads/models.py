@@ -22,11 +22,21 @@ class Upload(models.Model):
     file_type = models.CharField(max_length=100, default='video/mp4', help_text="MIME type of the file")
     upload_url = models.URLField(max_length=2000, blank=True, help_text="Presigned upload URL")
     file_size = models.BigIntegerField(null=True, blank=True, help_text="File size in bytes")
+    content_hash = models.CharField(max_length=64, blank=True, db_index=True, help_text="SHA-256 of the video content")
+    etag = models.CharField(max_length=100, blank=True, db_index=True, help_text="S3 ETag of the uploaded object")
     metadata = models.JSONField(default=dict, help_text="Video metadata from FFmpeg")
     error_message = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    inspection = models.ForeignKey(
+        'inspections.Inspection',
+        on_delete=models.SET_NULL,
+        related_name='uploads',
+        null=True,
+        blank=True,
+        help_text="Multi-video inspection this upload's video joins (null: the pipeline creates one)"
+    )
     expires_at = models.DateTimeField(null=True, blank=True, help_text="When this upload expires (coaching mode)")
 
     class Meta:
@@ -132,6 +142,7 @@ class Scorecard(models.Model):
     uniform_score = models.FloatField(null=True, blank=True)
     menu_board_score = models.FloatField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         db_table = 'scorecards'
@@ -0,0 +1,183 @@
+"""
+Declarative compliance rules.
+
+A Rule's config_json describes which findings violate it:
+
+    {
+        "category": "CLEANLINESS",        # finding category, or a list
+        "label": ["spill", "wet floor"],  # words in the finding title/description
+        "finding_severity": ["HIGH"],     # finding severity, or a list
+        "min_confidence": 0.7,
+        "min_consecutive_frames": 3,      # present in >= 3 consecutive frames
+        "severity": "high",               # violation severity (default: the finding's)
+        "coaching_severity": "medium"     # violation severity in coaching mode
+    }
+
+At least one of category or label is required. The legacy {"type": ...}
+configs (ppe_detection, safety_check, cleanliness_check) are translated to
+the equivalent category rule.
+
+Rules compile once into conditions over a DetectionTable, a column-per-field
+view of every finding in a video. Each distinct condition is evaluated once
+per table into a bitmask of matching rows and shared by all rules using it,
+so a rule costs a few integer ANDs. A rule without a temporal condition is
+violated once per matching finding; a temporal rule once per run of
+consecutive frames, with the run's most confident finding as evidence.
+"""
+
+LEGACY_RULE_TYPES = {
+    'ppe_detection': {'category': 'PPE', 'coaching_severity': 'medium'},
+    'safety_check': {'category': 'SAFETY'},
+    'cleanliness_check': {'category': 'CLEANLINESS', 'coaching_severity': 'medium'},
+}
+
+SEVERITIES = {'low', 'medium', 'high', 'critical'}
+
+
+def _as_values(value):
+    return [value] if isinstance(value, str) else list(value)
+
+
+def _bits(mask):
+    """Row indexes set in a bitmask, ascending"""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class DetectionTable:
+    """Findings of a whole video as columns, with memoized condition masks"""
+
+    def __init__(self, frame_findings):
+        self.frames = []
+        self.findings = []
+        self.frame_index = []
+        self.category = []
+        self.severity = []
+        self.text = []
+        self.confidence = []
+
+        for index, (frame, findings) in enumerate(frame_findings):
+            for finding in findings:
+                self.frames.append(frame)
+                self.findings.append(finding)
+                self.frame_index.append(index)
+                self.category.append(finding.get('category', 'OTHER'))
+                self.severity.append(finding.get('severity', 'LOW'))
+                self.text.append(f"{finding.get('title', '')} {finding.get('description', '')}".lower())
+                self.confidence.append(finding.get('confidence', 0.0))
+
+        self._masks = {}
+        self._indexes = {}
+
+    def __len__(self):
+        return len(self.findings)
+
+    def _value_index(self, column):
+        """value -> bitmask of rows holding it"""
+        if column not in self._indexes:
+            index = {}
+            for row, value in enumerate(getattr(self, column)):
+                index[value] = index.get(value, 0) | (1 << row)
+            self._indexes[column] = index
+        return self._indexes[column]
+
+    def mask(self, condition):
+        """Bitmask of the rows matching a compiled condition"""
+        if condition not in self._masks:
+            kind, value = condition
+            if kind in ('category', 'severity'):
+                index = self._value_index(kind)
+                mask = 0
+                for item in value:
+                    mask |= index.get(item, 0)
+            elif kind == 'label':
+                mask = 0
+                for row, text in enumerate(self.text):
+                    if any(label in text for label in value):
+                        mask |= 1 << row
+            elif kind == 'min_confidence':
+                mask = 0
+                for row, confidence in enumerate(self.confidence):
+                    if confidence >= value:
+                        mask |= 1 << row
+            else:
+                raise ValueError(f"Unknown condition {kind}")
+            self._masks[condition] = mask
+        return self._masks[condition]
+
+
+class CompiledRule:
+    """A Rule's conditions, ready to run against DetectionTables"""
+
+    def __init__(self, rule, conditions, min_consecutive_frames=1, severity=None, coaching_severity=None):
+        self.rule = rule
+        self.conditions = conditions
+        self.min_consecutive_frames = min_consecutive_frames
+        self.severity = severity
+        self.coaching_severity = coaching_severity
+
+    def matching_rows(self, table):
+        """Evidence rows: every matching row, or the best row of each long enough run"""
+        mask = (1 << len(table)) - 1
+        for condition in self.conditions:
+            mask &= table.mask(condition)
+            if not mask:
+                return []
+
+        rows = list(_bits(mask))
+        if self.min_consecutive_frames <= 1:
+            return rows
+
+        evidence = []
+        run = []
+        for row in rows + [None]:
+            if row is not None and run and table.frame_index[row] - table.frame_index[run[-1]] <= 1:
+                run.append(row)
+                continue
+            if run and table.frame_index[run[-1]] - table.frame_index[run[0]] + 1 >= self.min_consecutive_frames:
+                evidence.append(max(run, key=lambda r: table.confidence[r]))
+            run = [row]
+        return evidence
+
+
+def compile_rule(rule):
+    """Compile a Rule's config_json
+
+    Raises:
+        ValueError: If the config has no category/label selector or an
+            invalid value
+    """
+    config = dict(rule.config_json or {})
+    if config.get('type') in LEGACY_RULE_TYPES:
+        config = {**LEGACY_RULE_TYPES[config['type']], **config}
+
+    if 'category' not in config and 'label' not in config:
+        raise ValueError(f"Rule {rule.code} selects no findings (needs category or label)")
+
+    conditions = []
+    if 'category' in config:
+        conditions.append(('category', frozenset(value.upper() for value in _as_values(config['category']))))
+    if 'finding_severity' in config:
+        conditions.append(('severity', frozenset(value.upper() for value in _as_values(config['finding_severity']))))
+    if 'label' in config:
+        conditions.append(('label', tuple(sorted(value.lower() for value in _as_values(config['label'])))))
+    if 'min_confidence' in config:
+        conditions.append(('min_confidence', float(config['min_confidence'])))
+
+    for key in ('severity', 'coaching_severity'):
+        if config.get(key) is not None and config[key].lower() not in SEVERITIES:
+            raise ValueError(f"Rule {rule.code} has unknown {key} {config[key]!r}")
+
+    min_consecutive_frames = int(config.get('min_consecutive_frames', 1))
+    if min_consecutive_frames < 1:
+        raise ValueError(f"Rule {rule.code} needs min_consecutive_frames >= 1")
+
+    return CompiledRule(
+        rule,
+        conditions,
+        min_consecutive_frames=min_consecutive_frames,
+        severity=config.get('severity'),
+        coaching_severity=config.get('coaching_severity'),
+    )
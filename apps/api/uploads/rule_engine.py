@@ -0,0 +1,75 @@
+"""
+Evaluation of a brand's compliance rules against analyzed frames.
+
+Every active Rule of the brand, compiled from its declarative config (see
+rule_dsl), is checked against the findings of the analyzed frames in one
+pass, and the resulting violations are written with a single bulk insert.
+"""
+import logging
+
+from django.db import transaction
+
+from .models import Rule, Violation
+from .rule_dsl import DetectionTable, compile_rule
+
+logger = logging.getLogger(__name__)
+
+VIOLATION_SEVERITIES = {
+    'critical': Violation.Severity.HIGH,
+    'high': Violation.Severity.HIGH,
+    'medium': Violation.Severity.MED,
+    'low': Violation.Severity.LOW,
+}
+
+
+class RuleEngine:
+    """All active rules of a brand, compiled once and evaluated together"""
+
+    def __init__(self, brand, coaching_mode=False):
+        self.coaching_mode = coaching_mode
+        self.rules = []
+        for rule in Rule.objects.filter(brand=brand, is_active=True):
+            try:
+                self.rules.append(compile_rule(rule))
+            except (ValueError, TypeError, AttributeError) as e:
+                logger.warning(f"Skipping rule {rule.code} of brand {brand.id}: {e}")
+
+    def evaluate(self, frame_findings):
+        """Violations of every rule in the (frame, findings) pairs
+
+        Returns:
+            list: Violation field dicts ready for create_violations
+        """
+        table = DetectionTable(frame_findings)
+        violations = []
+        for compiled in self.rules:
+            for row in compiled.matching_rows(table):
+                violations.append(self._violation(compiled, table.frames[row], table.findings[row]))
+        return violations
+
+    def _violation(self, compiled, frame, finding):
+        if self.coaching_mode and compiled.coaching_severity:
+            severity = compiled.coaching_severity
+        else:
+            severity = compiled.severity or finding.get('severity', 'high')
+        return {
+            'rule_id': compiled.rule.id,
+            'severity': VIOLATION_SEVERITIES.get(severity.lower(), Violation.Severity.HIGH),
+            'evidence_frame_ts_ms': int(frame.timestamp * 1000),
+            'evidence_s3_key': frame.image.name if frame.image else '',
+            'notes': finding.get('description', ''),
+        }
+
+
+def create_violations(upload, violations):
+    """Replace the upload's open violations with the given ones in one insert
+
+    Reviewed (approved or dismissed) violations are kept.
+    """
+    with transaction.atomic():
+        upload.violations.filter(status=Violation.Status.OPEN).delete()
+        created = Violation.objects.bulk_create([
+            Violation(upload=upload, **violation) for violation in violations
+        ])
+    logger.info(f"Recorded {len(created)} rule violations for upload {upload.id}")
+    return created
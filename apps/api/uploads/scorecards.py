@@ -0,0 +1,400 @@
+"""
+Materialized scorecard of an upload.
+
+The persist stage writes one Scorecard per upload from its inspection's AI
+scores; the uploads of a multi-video inspection share its scores. Manager
+review adjusts them: analyzed frames covered by rejected AI findings are
+re-scored with calculate_inspection_scores without the detections behind
+those findings, and manual findings take a deduction by severity.
+
+The review state (per-frame score changes and manual deductions) is kept in
+scores_json, so a single review only re-scores the frames of the reviewed
+finding. Reading an upload's scores stays a single row fetch by upload.
+"""
+import logging
+
+from django.conf import settings
+from django.db import transaction
+
+from inspections.models import Finding
+from .models import Scorecard
+
+logger = logging.getLogger(__name__)
+
+# Points a manual finding's severity takes off its category and the total
+MANUAL_FINDING_DEDUCTIONS = {
+    Finding.Severity.CRITICAL: 20.0,
+    Finding.Severity.HIGH: 10.0,
+    Finding.Severity.MEDIUM: 5.0,
+    Finding.Severity.LOW: 2.0,
+}
+
+# Points a menu board issue takes off the board's compliance score, as in
+# OCRService._analyze_menu_compliance; other issue types take 10
+MENU_ISSUE_DEDUCTIONS = {'missing_required_info': 20.0}
+
+CATEGORY_SCORE_FIELDS = [
+    'ppe_score', 'safety_score', 'cleanliness_score', 'food_safety_score', 'equipment_score',
+    'operational_score', 'food_quality_score', 'staff_behavior_score', 'uniform_score', 'menu_board_score',
+]
+
+# Category scores with their own Scorecard column; all of them are in scores_json
+SCORECARD_COLUMNS = ['ppe_score', 'safety_score', 'cleanliness_score', 'uniform_score', 'menu_board_score']
+
+
+def review_state(finding):
+    """The part of a finding's review that affects the scores"""
+    return finding.is_manual, finding.is_rejected
+
+
+def analyzed_frames(inspection, **filters):
+    """Frames whose analyses an inspection's AI scores were calculated from
+
+    Args:
+        filters: Further VideoFrame filters, e.g. to select a video's time span
+    """
+    from videos.models import VideoFrame
+
+    frames = []
+    for video in inspection.videos.order_by('created_at', 'id'):
+        video_frames = VideoFrame.objects.filter(video=video, **filters)
+        checkpoint = (video.processing_checkpoint or {}).get('analysis', {})
+        if checkpoint.get('inspection_id') == inspection.id and 'frame_ids' in checkpoint:
+            by_id = video_frames.in_bulk(checkpoint['frame_ids'])
+            frames.extend(by_id[frame_id] for frame_id in checkpoint['frame_ids'] if frame_id in by_id)
+        else:
+            # Cloned and older inspections: every analyzed frame counted
+            frames.extend(video_frames.filter(is_supplemental=False).exclude(ai_analysis=None).order_by('timestamp'))
+    return frames
+
+
+def _generates(scorer, analysis, finding):
+    """True when analysis yields a finding with the title (and label) of finding"""
+    return any(
+        generated.get('category') == finding.category and generated.get('title') == finding.title
+        and (not finding.label or generated.get('label', '') == finding.label)
+        for generated in scorer.generate_findings(analysis, None)
+    )
+
+
+def _without_missing_face_covers(ppe_analysis, finding, scorer):
+    summary = ppe_analysis['summary']
+    return {**ppe_analysis, 'summary': {**summary, 'persons_with_face_cover': summary.get('total_persons', 0)}}
+
+
+def _without_overcrowding(people_analysis, finding, scorer):
+    people_count = min(people_analysis.get('people_count', 0), settings.MAX_PEOPLE_IN_KITCHEN)
+    return {**people_analysis, 'people_count': people_count}
+
+
+def _without_uniform_issue(uniform_analysis, finding, scorer):
+    compliant = [obj for obj in uniform_analysis.get('uniform_objects', []) if obj.get('compliance_status') == 'compliant']
+    return {**uniform_analysis, 'uniform_objects': compliant, 'compliance_score': 100.0}
+
+
+def _without_menu_issues(menu_analysis, finding, scorer):
+    issues, dropped = [], []
+    for issue in menu_analysis.get('compliance_issues', []):
+        generates = _generates(scorer, {'menu_board_analysis': {'compliance_issues': [issue]}}, finding)
+        (dropped if generates else issues).append(issue)
+    restored = sum(MENU_ISSUE_DEDUCTIONS.get(issue.get('type'), 10.0) for issue in dropped)
+    compliance_score = min(100.0, menu_analysis.get('compliance_score', 100.0) + restored)
+    return {**menu_analysis, 'compliance_issues': issues, 'compliance_score': compliance_score}
+
+
+# Frame-level results, by analysis key, and how to take the part behind a
+# finding out of them; the rest of the result (e.g. the hand cover count of
+# the PPE summary) still counts. Text analysis does not affect the scores.
+FRAME_RESULT_REVIEWS = {
+    'ppe_analysis': _without_missing_face_covers,
+    'people_analysis': _without_overcrowding,
+    'uniform_analysis': _without_uniform_issue,
+    'menu_board_analysis': _without_menu_issues,
+}
+
+
+def without_finding(analysis, finding, scorer):
+    """A frame analysis without the detections a finding was generated from
+
+    Detected objects the finding comes from are dropped; frame-level results
+    that yield it only lose the part behind it (see FRAME_RESULT_REVIEWS).
+    """
+    result = dict(analysis)
+    for key, value in analysis.items():
+        if isinstance(value, list):
+            result[key] = [item for item in value if not _generates(scorer, {key: [item]}, finding)]
+        elif key in FRAME_RESULT_REVIEWS and value and _generates(scorer, {key: value}, finding):
+            result[key] = FRAME_RESULT_REVIEWS[key](value, finding, scorer)
+    return result
+
+
+def _covers(finding, frame):
+    """True when frame is in the time span of finding on the finding's video"""
+    first = finding.first_timestamp if finding.first_timestamp is not None else finding.frame.timestamp
+    last = finding.last_timestamp if finding.last_timestamp is not None else finding.frame.timestamp
+    return frame.video_id == finding.frame.video_id and first <= frame.timestamp <= last
+
+
+def _frame_changes(frame, rejected, scorer):
+    """Score changes of one analyzed frame without the rejected findings covering it"""
+    from inspections.rescoring import score_frame_analyses
+
+    reviewed = frame.ai_analysis
+    for finding in rejected:
+        if _covers(finding, frame):
+            reviewed = without_finding(reviewed, finding, scorer)
+    if reviewed is frame.ai_analysis:
+        return {}
+
+    before, after = score_frame_analyses([frame.ai_analysis]), score_frame_analyses([reviewed])
+    return {field: after[field] - before[field] for field in before if after[field] != before[field]}
+
+
+def _manual_deductions(finding):
+    """Points a manual finding takes off each score field"""
+    points = MANUAL_FINDING_DEDUCTIONS.get(finding.severity, 0.0)
+    category_field = f'{finding.category.lower()}_score'
+    # Findings of other categories only count towards the total
+    fields = [category_field, 'overall_score'] if category_field in CATEGORY_SCORE_FIELDS else ['overall_score']
+    return {field: -points for field in fields} if points else {}
+
+
+def _rejected_findings(inspection, **filters):
+    return list(
+        inspection.findings.filter(is_manual=False, is_rejected=True, frame__isnull=False, **filters)
+        .select_related('frame')
+    )
+
+
+def review_of(inspection):
+    """Review state of an inspection, built from all of its reviewed findings
+
+    Returns:
+        dict: Analyzed frame count, score changes per re-scored frame id and
+        deductions per manual finding id
+    """
+    from ai_services.analyzer import VideoAnalyzer
+
+    rejected = _rejected_findings(inspection)
+    frames = analyzed_frames(inspection)
+    frame_changes = {}
+    if rejected:
+        scorer = VideoAnalyzer.for_scoring()
+        for frame in frames:
+            changes = _frame_changes(frame, rejected, scorer)
+            if changes:
+                frame_changes[str(frame.id)] = changes
+
+    manual = {}
+    for finding in inspection.findings.filter(is_manual=True, is_rejected=False).only('id', 'category', 'severity'):
+        deductions = _manual_deductions(finding)
+        if deductions:
+            manual[str(finding.id)] = deductions
+
+    return {'frames': len(frames), 'frame_changes': frame_changes, 'manual': manual}
+
+
+def update_review(review, finding):
+    """Review state after one finding's review, re-scoring only its frames
+
+    Frames in the finding's time span are re-scored without every AI finding
+    rejected on them now, so the state does not depend on the order reviews
+    were applied in.
+    """
+    from ai_services.analyzer import VideoAnalyzer
+
+    review = {**review, 'frame_changes': dict(review['frame_changes']), 'manual': dict(review['manual'])}
+    if finding.is_manual:
+        deductions = _manual_deductions(finding) if not finding.is_rejected else {}
+        review['manual'].pop(str(finding.id), None)
+        if deductions:
+            review['manual'][str(finding.id)] = deductions
+        return review
+    if not finding.frame_id:
+        return review
+
+    first = finding.first_timestamp if finding.first_timestamp is not None else finding.frame.timestamp
+    last = finding.last_timestamp if finding.last_timestamp is not None else finding.frame.timestamp
+    frames = analyzed_frames(finding.inspection, video_id=finding.frame.video_id, timestamp__range=(first, last))
+    rejected = _rejected_findings(finding.inspection, frame__video_id=finding.frame.video_id)
+    scorer = VideoAnalyzer.for_scoring()
+    for frame in frames:
+        changes = _frame_changes(frame, rejected, scorer)
+        review['frame_changes'].pop(str(frame.id), None)
+        if changes:
+            review['frame_changes'][str(frame.id)] = changes
+    return review
+
+
+def review_adjustments(review):
+    """Points manager review changes each AI score by
+
+    Frame changes count with the frame's share of the analyzed frames, as
+    the AI scores are averages over them.
+
+    Returns:
+        dict: Points per score field, without zero entries
+    """
+    adjustments = {}
+    # Summed in id order so an incrementally updated state adds up like a rebuilt one
+    for _, changes in sorted(review['frame_changes'].items(), key=lambda item: int(item[0])):
+        for field, points in changes.items():
+            adjustments[field] = adjustments.get(field, 0.0) + points / review['frames']
+    for _, deductions in sorted(review['manual'].items(), key=lambda item: int(item[0])):
+        for field, points in deductions.items():
+            adjustments[field] = adjustments.get(field, 0.0) + points
+    return {field: points for field, points in adjustments.items() if points}
+
+
+def _clamp(score):
+    return max(0.0, min(100.0, score))
+
+
+def _scorecard_fields(inspection_id, ai_scores, review):
+    """Scorecard column values for AI scores and a review state"""
+    adjustments = review_adjustments(review)
+    scores = {field: _clamp(ai_scores[field] + adjustments.get(field, 0.0)) for field in ai_scores}
+    return {
+        'scores_json': {
+            'inspection_id': inspection_id,
+            'ai_scores': ai_scores,
+            'adjustments': adjustments,
+            'scores': scores,
+            'review': review,
+        },
+        'total_score': scores['overall_score'],
+        **{field: scores[field] for field in SCORECARD_COLUMNS},
+    }
+
+
+def ai_scores_of(inspection):
+    """AI scores of an inspection, per score field"""
+    return {field: getattr(inspection, field) or 0.0 for field in ['overall_score', *CATEGORY_SCORE_FIELDS]}
+
+
+def build_scorecard(inspection, upload_id=None, review=None):
+    """Write the scorecard of an inspection's upload from its scores and reviewed findings
+
+    Args:
+        upload_id: Upload to score; defaults to the upload of the inspection's video
+        review: review_of() the inspection, if already known
+
+    Returns:
+        Scorecard or None when the inspection has no upload
+    """
+    if upload_id is None:
+        video = inspection.video
+        upload_id = video.upload_id if video else None
+        if upload_id is None:
+            return None
+
+    if review is None:
+        review = review_of(inspection)
+
+    scorecard, _ = Scorecard.objects.update_or_create(
+        upload_id=upload_id, defaults=_scorecard_fields(inspection.id, ai_scores_of(inspection), review)
+    )
+    return scorecard
+
+
+def inspection_upload_ids(inspection):
+    """Uploads of an inspection's videos, each of which has a scorecard"""
+    return sorted(set(inspection.videos.exclude(upload=None).values_list('upload_id', flat=True)))
+
+
+def build_scorecards(inspection, upload_id=None):
+    """Write the scorecards of every upload of an inspection
+
+    Args:
+        upload_id: Upload to score even if no video links to it yet
+
+    Returns:
+        list: Scorecards
+    """
+    upload_ids = set(inspection_upload_ids(inspection))
+    if upload_id is not None:
+        upload_ids.add(upload_id)
+    if not upload_ids:
+        return []
+    review = review_of(inspection)
+    return [build_scorecard(inspection, scored_id, review) for scored_id in sorted(upload_ids)]
+
+
+def refresh_scorecards(inspections):
+    """Rewrite the scorecards of inspections whose AI scores changed, in bulk
+
+    Meant to run in the transaction that wrote the scores. Stored review
+    states are kept, except that inspections with rejected AI findings are
+    re-scored from scratch, as the scoring rules may have changed. Missing
+    scorecards are created.
+    """
+    from django.utils import timezone
+    from videos.models import Video
+
+    by_id = {inspection.id: inspection for inspection in inspections}
+    scored = sorted(set(
+        Video.objects.filter(inspection_id__in=by_id, upload__isnull=False).values_list('inspection_id', 'upload_id')
+    ))
+    if not scored:
+        return
+
+    scorecards = Scorecard.objects.select_for_update().in_bulk([upload_id for _, upload_id in scored], field_name='upload_id')
+    rejected = set(
+        Finding.objects.filter(inspection_id__in=by_id, is_manual=False, is_rejected=True)
+        .values_list('inspection_id', flat=True)
+    )
+    reviews = {}
+    updated, created = [], []
+    now = timezone.now()
+    for inspection_id, upload_id in scored:
+        inspection = by_id[inspection_id]
+        scorecard = scorecards.get(upload_id)
+        if inspection_id not in reviews:
+            stored = scorecard.scores_json.get('review') if scorecard else None
+            reviews[inspection_id] = review_of(inspection) if stored is None or inspection_id in rejected else stored
+
+        fields = _scorecard_fields(inspection_id, ai_scores_of(inspection), reviews[inspection_id])
+        if scorecard is None:
+            created.append(Scorecard(upload_id=upload_id, **fields))
+            continue
+        for field, value in fields.items():
+            setattr(scorecard, field, value)
+        scorecard.updated_at = now
+        updated.append(scorecard)
+
+    Scorecard.objects.bulk_update(updated, ['scores_json', 'total_score', *SCORECARD_COLUMNS, 'updated_at'])
+    Scorecard.objects.bulk_create(created)
+
+
+def apply_finding_review(finding, previous_state=None):
+    """Update the scorecards of the inspection's uploads for one reviewed or added finding
+
+    The scorecards are locked before the review state is read, so concurrent
+    reviews of an inspection apply one after the other. Only the reviewed
+    finding's frames are re-scored; scorecards without a stored review state
+    are rebuilt.
+
+    Args:
+        finding: Saved finding after the review
+        previous_state: review_state() of the finding before the review,
+            None for a new finding
+    """
+    if review_state(finding) == previous_state:
+        return
+
+    inspection = finding.inspection
+    upload_ids = inspection_upload_ids(inspection)
+    if not upload_ids:
+        return
+
+    with transaction.atomic():
+        scorecards = list(Scorecard.objects.select_for_update().filter(upload_id__in=upload_ids).order_by('upload_id'))
+        stored = scorecards[0].scores_json.get('review') if len(scorecards) == len(upload_ids) else None
+        if stored is None:
+            review = review_of(inspection)
+        else:
+            review = update_review(stored, finding)
+        for upload_id in upload_ids:
+            build_scorecard(inspection, upload_id, review)
+
+    logger.info(f"Scorecards of inspection {inspection.id} updated for finding {finding.id}: {review_adjustments(review)}")
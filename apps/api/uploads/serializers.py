@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import Upload
+from .models import Upload, Scorecard
 
 
 class UploadSerializer(serializers.ModelSerializer):
@@ -9,7 +9,19 @@ class UploadSerializer(serializers.ModelSerializer):
         model = Upload
         fields = [
             'id', 'store', 'mode', 's3_key', 'status', 
-            'duration_s', 'original_filename', 'file_type',
+            'duration_s', 'original_filename', 'file_type', 'content_hash', 'inspection',
             'created_at', 'updated_at', 'created_by'
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at', 'created_by']
\ No newline at end of file
+        read_only_fields = ['id', 'content_hash', 'inspection', 'created_at', 'updated_at', 'created_by']
+
+
+class ScorecardSerializer(serializers.ModelSerializer):
+    """Serializer for Scorecard model"""
+
+    class Meta:
+        model = Scorecard
+        fields = [
+            'upload', 'total_score', 'ppe_score', 'safety_score', 'cleanliness_score',
+            'uniform_score', 'menu_board_score', 'scores_json', 'created_at', 'updated_at'
+        ]
+        read_only_fields = fields
@@ -284,6 +284,93 @@ class ViolationTest(TestCase):
         self.assertIsNotNone(violation.reviewed_at)
 
 
+class RuleEngineTest(TestCase):
+    def setUp(self):
+        self.brand = Brand.objects.create(name="Test Brand")
+        self.store = Store.objects.create(
+            brand=self.brand, name="Test Store", code="TS001",
+            address="123 Test St", city="Test City", state="TS", zip_code="12345"
+        )
+        self.user = User.objects.create_user(username="testuser", store=self.store)
+        self.upload = Upload.objects.create(
+            store=self.store, mode=Upload.Mode.ENTERPRISE, s3_key="uploads/test.mp4",
+            original_filename="test.mp4", created_by=self.user
+        )
+        self.ppe_rule = Rule.objects.create(
+            brand=self.brand, code="PPE", name="PPE", description="PPE",
+            config_json={"type": "ppe_detection"}
+        )
+        self.safety_rule = Rule.objects.create(
+            brand=self.brand, code="SAFETY", name="Safety", description="Safety",
+            config_json={"type": "safety_check"}
+        )
+        Rule.objects.create(
+            brand=self.brand, code="OFF", name="Inactive", description="Inactive",
+            config_json={"type": "cleanliness_check"}, is_active=False
+        )
+
+    def _frame_findings(self):
+        frame = MagicMock(timestamp=2.5)
+        frame.image.name = "frames/f2.jpg"
+        return [(frame, [
+            {'category': 'PPE', 'severity': 'HIGH', 'description': 'No face cover'},
+            {'category': 'SAFETY', 'severity': 'CRITICAL', 'description': 'Blocked exit'},
+            {'category': 'CLEANLINESS', 'severity': 'MEDIUM', 'description': 'Spill'},
+        ])]
+
+    def test_evaluates_all_active_rules_in_one_pass(self):
+        from .rule_engine import RuleEngine
+
+        violations = RuleEngine(self.brand, coaching_mode=True).evaluate(self._frame_findings())
+
+        self.assertEqual(
+            sorted((v['rule_id'], v['severity']) for v in violations),
+            sorted([(self.ppe_rule.id, Violation.Severity.MED), (self.safety_rule.id, Violation.Severity.HIGH)]),
+        )
+        self.assertEqual(violations[0]['evidence_frame_ts_ms'], 2500)
+        self.assertEqual(violations[0]['evidence_s3_key'], "frames/f2.jpg")
+
+    def test_create_violations_replaces_open_violations(self):
+        from .rule_engine import RuleEngine, create_violations
+
+        reviewed = Violation.objects.create(
+            upload=self.upload, rule=self.ppe_rule, severity=Violation.Severity.LOW,
+            evidence_frame_ts_ms=0, evidence_s3_key="x", status=Violation.Status.DISMISSED
+        )
+        violations = RuleEngine(self.brand).evaluate(self._frame_findings())
+
+        create_violations(self.upload, violations)
+        create_violations(self.upload, violations)
+
+        self.assertEqual(self.upload.violations.filter(status=Violation.Status.OPEN).count(), 2)
+        self.assertTrue(Violation.objects.filter(id=reviewed.id).exists())
+
+    def test_declarative_rule_with_temporal_condition(self):
+        from .rule_engine import RuleEngine
+
+        Rule.objects.create(
+            brand=self.brand, code="SPILL", name="Lingering spill", description="Spill",
+            config_json={"label": "spill", "min_confidence": 0.5, "min_consecutive_frames": 3, "severity": "high"}
+        )
+        Rule.objects.create(brand=self.brand, code="JUNK", name="Junk", description="No selector",
+                            config_json={"min_confidence": 0.8})
+        frames = [MagicMock(timestamp=float(index)) for index in range(6)]
+        spill = {'category': 'CLEANLINESS', 'severity': 'MEDIUM', 'title': 'Spill or Mess Detected'}
+        confidences = [0.6, 0.9, 0.7, None, 0.8, 0.8]
+        frame_findings = [
+            (frame, [{**spill, 'confidence': confidence}] if confidence else [])
+            for frame, confidence in zip(frames, confidences)
+        ]
+
+        engine = RuleEngine(self.brand)
+        spill_rule = next(compiled for compiled in engine.rules if compiled.rule.code == "SPILL")
+        violations = [v for v in engine.evaluate(frame_findings) if v['rule_id'] == spill_rule.rule.id]
+
+        # Frames 0-2 form a long enough run, frames 4-5 do not; the run's peak is the evidence
+        self.assertEqual(len(engine.rules), 3)
+        self.assertEqual([(v['evidence_frame_ts_ms'], v['severity']) for v in violations], [(1000, Violation.Severity.HIGH)])
+
+
 class ScorecardTest(TestCase):
     def setUp(self):
         self.brand = Brand.objects.create(name="Test Brand")
@@ -327,6 +414,154 @@ class ScorecardTest(TestCase):
         self.assertEqual(scorecard.ppe_score, 90.0)
         self.assertEqual(str(scorecard), "Scorecard for Test Store - enterprise (uploaded) - 85.5%")
 
+    def _scored_inspection(self):
+        from inspections.models import Inspection, Finding
+        from inspections.rescoring import score_frame_analyses
+        from videos.models import Video, VideoFrame
+
+        inspection = Inspection.objects.create(
+            title="Test", created_by=self.user, store=self.store, status=Inspection.Status.COMPLETED,
+        )
+        video = Video.objects.create(
+            uploaded_by=self.user, store=self.store, title="Test Video", file="test.mp4",
+            upload=self.upload, inspection=inspection
+        )
+        ppe = {'summary': {'total_persons': 2, 'persons_with_face_cover': 1, 'persons_with_hand_cover': 2}}
+        spill = {'name': 'Spill', 'confidence': 80.0, 'bounding_box': {'Left': 0.1, 'Top': 0.1, 'Width': 0.2, 'Height': 0.2}}
+        frames = [
+            VideoFrame.objects.create(
+                video=video, frame_number=i, timestamp=float(i), width=640, height=360,
+                ai_analysis={'ppe_analysis': ppe, 'cleanliness_analysis': [spill] if i else []}
+            )
+            for i in range(3)
+        ]
+        for field, value in score_frame_analyses([frame.ai_analysis for frame in frames]).items():
+            setattr(inspection, field, value)
+        inspection.save()
+        finding = Finding.objects.create(
+            inspection=inspection, category=Finding.Category.PPE, severity=Finding.Severity.HIGH,
+            title="Missing Face Covers", description="1 person(s) not wearing proper face covers", confidence=0.9,
+            frame=frames[0], first_timestamp=0.0, last_timestamp=1.0, affected_frame_count=2
+        )
+        return inspection, finding
+
+    def test_scorecard_follows_manager_review(self):
+        from inspections.rescoring import score_frame_analyses
+        from uploads.scorecards import build_scorecard
+
+        inspection, finding = self._scored_inspection()
+        build_scorecard(inspection)
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+
+        def scores():
+            response = client.get(f'/api/uploads/scorecard/{self.upload.id}/')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return response.data['total_score'], response.data['ppe_score']
+
+        ai_scores = (inspection.overall_score, inspection.ppe_score)
+        self.assertEqual(scores(), ai_scores)
+
+        # A rejected AI finding is re-scored out of the frames it covers, approving it again restores it
+        client.post(f'/api/inspections/findings/{finding.id}/reject/', {'reason': 'Not a person'})
+        ppe = finding.frame.ai_analysis['ppe_analysis']
+        covered = {'summary': {**ppe['summary'], 'persons_with_face_cover': 2}}
+        reviewed = score_frame_analyses([
+            {'ppe_analysis': covered, 'cleanliness_analysis': []},
+            {'ppe_analysis': covered, 'cleanliness_analysis': [{'name': 'Spill', 'confidence': 80.0}]},
+            {'ppe_analysis': ppe, 'cleanliness_analysis': [{'name': 'Spill', 'confidence': 80.0}]},
+        ])
+        self.assertEqual(scores(), (reviewed['overall_score'], reviewed['ppe_score']))
+        self.assertEqual(Scorecard.objects.get(upload=self.upload).cleanliness_score, inspection.cleanliness_score)
+        client.post(f'/api/inspections/findings/{finding.id}/approve/')
+        self.assertEqual(scores(), ai_scores)
+
+        response = client.post(f'/api/inspections/{inspection.id}/findings/create/', {
+            'category': 'SAFETY', 'severity': 'CRITICAL', 'title': 'Blocked exit', 'description': 'Boxes at the exit',
+        })
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(scores(), (ai_scores[0] - 20.0, ai_scores[1]))
+        scorecard = Scorecard.objects.get(upload=self.upload)
+        self.assertEqual(scorecard.safety_score, 80.0)
+
+        # The scorecard after review matches one rebuilt from scratch
+        reviewed_json = scorecard.scores_json
+        build_scorecard(inspection)
+        self.assertEqual(Scorecard.objects.get(upload=self.upload).scores_json, reviewed_json)
+
+    def test_rejection_keeps_rest_of_frame_level_results(self):
+        from inspections.models import Inspection, Finding
+        from videos.models import Video, VideoFrame
+        from uploads import scorecards
+
+        inspection = Inspection.objects.create(
+            title="Test", created_by=self.user, store=self.store, status=Inspection.Status.COMPLETED,
+            ppe_score=50.0, menu_board_score=70.0,
+        )
+        video = Video.objects.create(
+            uploaded_by=self.user, store=self.store, title="Test Video", file="test.mp4",
+            upload=self.upload, inspection=inspection
+        )
+        frames = [
+            VideoFrame.objects.create(
+                video=video, frame_number=i, timestamp=float(i), width=640, height=360, ai_analysis={
+                    'ppe_analysis': {'summary': {'total_persons': 2, 'persons_with_face_cover': 1,
+                                                 'persons_with_hand_cover': 1}},
+                    'menu_board_analysis': {'compliance_score': 70.0, 'compliance_issues': [
+                        {'type': 'missing_required_info', 'description': 'Missing prices', 'severity': 'medium'},
+                        {'type': 'insufficient_content', 'description': 'Too little content', 'severity': 'low'},
+                    ]},
+                }
+            )
+            for i in range(4)
+        ]
+        scorecards.build_scorecard(inspection)
+
+        def reject(title):
+            finding = Finding.objects.create(
+                inspection=inspection, category=Finding.Category.PPE if 'Face' in title else Finding.Category.MENU_BOARD,
+                severity=Finding.Severity.MEDIUM, title=title, description=title, confidence=0.8,
+                frame=frames[0], first_timestamp=0.0, last_timestamp=1.0,
+            )
+            previous_state = scorecards.review_state(finding)
+            finding.is_rejected = True
+            finding.save()
+            with patch.object(scorecards, '_frame_changes', wraps=scorecards._frame_changes) as frame_changes:
+                scorecards.apply_finding_review(finding, previous_state)
+            # Only the frames of the reviewed finding are re-scored
+            self.assertEqual(frame_changes.call_count, 2)
+
+        # Face covers no longer count against two of four frames, hand covers still do
+        reject("Missing Face Covers")
+        scorecard = Scorecard.objects.get(upload=self.upload)
+        self.assertAlmostEqual(scorecard.ppe_score, 50.0 + (85.0 - 50.0) / 2)
+        self.assertEqual(scorecard.menu_board_score, 70.0)
+
+        # The board's other issue keeps its deduction
+        reject("Menu Board: Insufficient Content")
+        scorecard = Scorecard.objects.get(upload=self.upload)
+        self.assertAlmostEqual(scorecard.menu_board_score, 70.0 + 10.0 / 2)
+        self.assertAlmostEqual(scorecard.ppe_score, 67.5)
+
+        reviewed_json = scorecard.scores_json
+        scorecards.build_scorecard(inspection)
+        self.assertEqual(Scorecard.objects.get(upload=self.upload).scores_json, reviewed_json)
+
+    def test_scorecard_of_other_store_is_forbidden(self):
+        from uploads.scorecards import build_scorecard
+
+        inspection, _ = self._scored_inspection()
+        build_scorecard(inspection)
+        other_store = Store.objects.create(
+            brand=self.brand, name="Other Store", code="TS002",
+            address="456 Test St", city="Test City", state="TS", zip_code="12345"
+        )
+        client = APIClient()
+        client.force_authenticate(user=User.objects.create_user(username="other", store=other_store))
+
+        response = client.get(f'/api/uploads/scorecard/{self.upload.id}/')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
 
 class TaskManagementTest(TestCase):
     def setUp(self):
@@ -542,4 +777,186 @@ class RetentionPolicyTest(TestCase):
         
         self.assertEqual(expired_inspections, 1)
         self.assertEqual(expired_coaching, 1)
-        self.assertEqual(Upload.objects.count(), 3)  # Total uploads created
\ No newline at end of file
+        self.assertEqual(Upload.objects.count(), 3)  # Total uploads created
+
+class FakeRedis:
+    """In-memory stand-in for the Redis commands used by core.locks"""
+
+    def __init__(self):
+        self.data = {}
+
+    def set(self, key, value, nx=False, px=None, ex=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def eval(self, script, numkeys, key, token, *args):
+        from core.locks import RELEASE_SCRIPT
+        if self.data.get(key) != token:
+            return 0
+        if script == RELEASE_SCRIPT:
+            del self.data[key]
+        return 1
+
+
+class PipelineLockTest(TestCase):
+    def setUp(self):
+        self.brand = Brand.objects.create(name="Test Brand")
+        self.store = Store.objects.create(
+            brand=self.brand,
+            name="Test Store",
+            code="TS001",
+            address="123 Test St",
+            city="Test City",
+            state="TS",
+            zip_code="12345"
+        )
+        self.user = User.objects.create_user(
+            username="testuser",
+            store=self.store
+        )
+        self.upload = Upload.objects.create(
+            store=self.store,
+            mode=Upload.Mode.COACHING,
+            s3_key="uploads/test.mp4",
+            original_filename="test.mp4",
+            created_by=self.user
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+        self.redis = FakeRedis()
+        patcher = patch('core.locks.get_redis_client', return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_lock_is_owned_by_token(self):
+        """Only the holder of the token can renew or release a lock"""
+        from core.locks import PipelineLock
+
+        lock = PipelineLock.for_resource('upload', self.upload.id)
+        other = PipelineLock.for_resource('upload', self.upload.id)
+
+        self.assertTrue(lock.acquire())
+        self.assertTrue(lock.acquire())  # re-entrant for the same token
+        self.assertFalse(other.acquire())
+        self.assertFalse(other.renew())
+
+        other.release()
+        self.assertTrue(lock.is_held())
+
+        lock.release()
+        self.assertTrue(other.acquire())
+
+    def test_lock_fails_open_without_redis(self):
+        """An unreachable Redis never blocks processing"""
+        import redis
+        from core.locks import PipelineLock
+
+        self.redis.set = MagicMock(side_effect=redis.ConnectionError('down'))
+        self.assertTrue(PipelineLock.for_resource('upload', self.upload.id).acquire())
+
+    @patch('videos.tasks.process_video_upload.delay')
+    def test_confirm_upload_rejects_running_upload(self, mock_delay):
+        """Confirming an upload twice returns 409 instead of starting a second run"""
+        url = f'/api/uploads/confirm/{self.upload.id}/'
+
+        response = self.client.post(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.client.post(url)
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data['code'], 'already_running')
+        self.assertEqual(mock_delay.call_count, 1)
+
+    @patch('videos.tasks.process_video_upload.delay')
+    def test_confirm_upload_releases_lock_when_enqueue_fails(self, mock_delay):
+        """A failed enqueue does not leave the upload locked for the next attempt"""
+        url = f'/api/uploads/confirm/{self.upload.id}/'
+        mock_delay.side_effect = [Exception('broker down'), None]
+
+        response = self.client.post(url)
+        self.assertEqual(response.status_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        response = self.client.post(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    @patch('inspections.tasks.analyze_video.delay')
+    @patch('videos.tasks.reprocess_video_from_s3.delay')
+    def test_full_and_frames_only_reprocess_share_lock(self, mock_reprocess, mock_analyze):
+        """A failed enqueue releases the lock, a running full reprocess blocks a frames-only one"""
+        from videos.models import Video, VideoFrame
+
+        video = Video.objects.create(
+            uploaded_by=self.user, store=self.store, title="test.mp4", file="test.mp4", upload=self.upload
+        )
+        url = f'/api/videos/{video.id}/reprocess/'
+        mock_reprocess.side_effect = [Exception('broker down'), None]
+
+        response = self.client.post(url)
+        self.assertEqual(response.status_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        response = self.client.post(url)
+        self.assertEqual(response.data['processing_type'], 'full')
+
+        # Frames stored by the running reprocess make the next request a frames-only one
+        VideoFrame.objects.create(video=video, frame_number=0, timestamp=0.0, width=640, height=360)
+        response = self.client.post(url)
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data['code'], 'already_running')
+        mock_analyze.assert_not_called()
+
+    @patch('videos.tasks.process_video_upload.delay')
+    def test_confirm_upload_replays_idempotent_response(self, mock_delay):
+        """A retried request with the same Idempotency-Key gets the original response"""
+        url = f'/api/uploads/confirm/{self.upload.id}/'
+
+        first = self.client.post(url, HTTP_IDEMPOTENCY_KEY='abc')
+        second = self.client.post(url, HTTP_IDEMPOTENCY_KEY='abc')
+
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.data['id'], self.upload.id)
+        self.assertEqual(mock_delay.call_count, 1)
+
+    @patch('videos.tasks.build_video_pipeline')
+    def test_process_video_upload_skips_locked_upload(self, mock_build):
+        """The task does not start a pipeline while another run holds the lock"""
+        from core.locks import PipelineLock
+        from videos.tasks import process_video_upload
+
+        PipelineLock.for_resource('upload', self.upload.id).acquire()
+
+        result = process_video_upload(self.upload.id)
+
+        self.assertIn('already being processed', result)
+        mock_build.assert_not_called()
+
+    @patch('videos.tasks.build_video_pipeline')
+    def test_process_video_upload_adopts_caller_lock(self, mock_build):
+        """A token handed over by the API view lets the task run under its lock"""
+        from core.locks import PipelineLock
+        from videos.tasks import process_video_upload
+
+        lock = PipelineLock.for_resource('upload', self.upload.id)
+        lock.acquire()
+
+        process_video_upload(self.upload.id, lock_token=lock.token)
+
+        self.assertEqual(mock_build.call_args.kwargs['lock'].token, lock.token)
+
+    def test_pipeline_lease_stops_superseded_run(self):
+        """Stages of a run whose lock was taken over stop the chain"""
+        from celery.exceptions import Ignore
+        from core.locks import PipelineLock, pipeline_lease
+
+        stale = PipelineLock.for_resource('upload', self.upload.id)
+        PipelineLock.for_resource('upload', self.upload.id).acquire()
+
+        with self.assertRaises(Ignore):
+            with pipeline_lease({'lock': stale.as_payload()}):
+                pass
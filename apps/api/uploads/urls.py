@@ -12,6 +12,7 @@ urlpatterns = [
     path('request-presigned-url/', views.request_presigned_url, name='request-presigned-url'),
     path('confirm/<int:upload_id>/', views.confirm_upload, name='confirm-upload'),
     path('reprocess/<int:upload_id>/', views.reprocess_upload, name='reprocess-upload'),
+    path('scorecard/<int:upload_id>/', views.upload_scorecard, name='upload-scorecard'),
     path('retention/status/', views.retention_status, name='retention-status'),
     path('retention/cleanup/', views.trigger_manual_cleanup, name='manual-cleanup'),
     path('', include(router.urls)),
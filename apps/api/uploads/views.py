@@ -7,8 +7,10 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from .models import Upload
-from .serializers import UploadSerializer
+from .models import Upload, Scorecard
+from .serializers import UploadSerializer, ScorecardSerializer
+from brands.models import Store
+from core.locks import PipelineLock, get_idempotent_response, store_idempotent_response
 
 
 @api_view(['GET'])
@@ -22,8 +24,16 @@ def health_check(request):
 def request_presigned_url(request):
     """
     Generate a presigned URL for direct S3 upload
+
+    Several videos (e.g. kitchen, dining and storage) can make up one
+    inspection: set multi_video on the first upload to create the inspection
+    up front, and pass the returned inspection_id with the others. The
+    inspection is completed once all of its uploads are analyzed.
     """
     try:
+        from inspections.models import Inspection
+        from videos.tasks import create_pending_inspection, upload_inspection_mode
+
         # Extract file information from request
         filename = request.data.get('filename')
         file_type = request.data.get('file_type', 'video/mp4')
@@ -35,6 +45,20 @@ def request_presigned_url(request):
                 {'error': 'filename and store_id are required'}, 
                 status=status.HTTP_400_BAD_REQUEST
             )
+
+        inspection = None
+        if request.data.get('inspection_id'):
+            inspection = Inspection.objects.filter(id=request.data['inspection_id'], store_id=store_id).first()
+            if not inspection or inspection.mode != upload_inspection_mode(mode):
+                return Response(
+                    {'error': 'Inspection not found for this store and mode'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        elif request.data.get('multi_video') in (True, 'true', '1'):
+            inspection = create_pending_inspection(
+                request.data.get('title') or filename, request.user, Store.objects.get(id=store_id),
+                upload_inspection_mode(mode)
+            )
         
         # Generate unique S3 key
         file_extension = filename.split('.')[-1] if '.' in filename else 'mp4'
@@ -69,7 +93,8 @@ def request_presigned_url(request):
             original_filename=filename,
             file_type=file_type,
             upload_url=presigned_url,
-            created_by=request.user
+            created_by=request.user,
+            inspection=inspection
         )
         
         return Response({
@@ -77,6 +102,7 @@ def request_presigned_url(request):
             'presigned_url': presigned_url,
             's3_key': s3_key,
             'expires_at': (datetime.now() + timedelta(hours=1)).isoformat(),
+            'inspection_id': inspection.id if inspection else None,
         })
         
     except Exception as e:
@@ -91,20 +117,51 @@ def request_presigned_url(request):
 def confirm_upload(request, upload_id):
     """
     Confirm that upload to S3 was successful and trigger processing
+
+    Repeating a request with the same Idempotency-Key header returns the
+    original response; confirming an upload whose pipeline is still running
+    returns 409. Set force_reanalysis to analyze the video even when an
+    identical one was already analyzed for the brand.
     """
     try:
         upload = Upload.objects.get(id=upload_id, created_by=request.user)
 
-        # Update upload status
-        upload.status = Upload.Status.PROCESSING
-        upload.save()
+        idempotency_key = request.headers.get('Idempotency-Key')
+        if idempotency_key:
+            idempotency_key = f"confirm_upload:{upload.id}:{idempotency_key}"
+            cached = get_idempotent_response(idempotency_key)
+            if cached is not None:
+                return Response(cached)
 
-        # Trigger Celery task for processing
-        from videos.tasks import process_video_upload
-        process_video_upload.delay(upload.id)
+        lock = PipelineLock.for_resource('upload', upload.id)
+        if not lock.acquire():
+            return Response(
+                {'error': 'Upload is already being processed', 'code': 'already_running', 'upload_id': upload.id},
+                status=status.HTTP_409_CONFLICT
+            )
+
+        try:
+            # Update upload status
+            upload.status = Upload.Status.PROCESSING
+            upload.save()
+
+            # Trigger Celery task for processing
+            from videos.tasks import process_video_upload
+            force_reanalysis = request.data.get('force_reanalysis') in (True, 'true', '1')
+            process_video_upload.delay(
+                upload.id,
+                lock_token=lock.token,
+                idempotency_key=idempotency_key,
+                force_reanalysis=force_reanalysis
+            )
+        except Exception:
+            lock.release()
+            raise
 
         # Return the full serialized upload object
         serializer = UploadSerializer(upload)
+        if idempotency_key:
+            store_idempotent_response(idempotency_key, serializer.data)
         return Response(serializer.data)
 
     except Upload.DoesNotExist:
@@ -133,14 +190,8 @@ def reprocess_upload(request, upload_id):
 
         upload = Upload.objects.get(id=upload_id, created_by=request.user)
 
-        if upload.status == Upload.Status.PROCESSING:
-            return Response(
-                {'error': 'Upload is already being processed'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-
-        # Find the associated Video
-        video = Video.objects.filter(
+        # Find the associated Video (legacy videos are matched by filename)
+        video = upload.videos.order_by('-created_at').first() or Video.objects.filter(
             store=upload.store,
             title=upload.original_filename
         ).order_by('-created_at').first()
@@ -152,7 +203,7 @@ def reprocess_upload(request, upload_id):
             )
 
         # Get existing frames
-        frames = list(video.frames.all())
+        frames = list(video.frames.filter(is_supplemental=False))
 
         if not frames:
             return Response(
@@ -160,14 +211,27 @@ def reprocess_upload(request, upload_id):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Delete existing inspections for this video
-        Inspection.objects.filter(video=video).delete()
+        lock = PipelineLock.for_resource('upload', upload.id)
+        if not lock.acquire():
+            return Response(
+                {'error': 'Upload is already being processed', 'code': 'already_running', 'upload_id': upload.id},
+                status=status.HTTP_409_CONFLICT
+            )
+
+        try:
+            # Delete existing inspections for this video
+            Inspection.objects.filter(video=video).delete()
 
-        # Re-run analysis based on upload mode
-        if upload.mode == Upload.Mode.ENTERPRISE:
-            inspection = apply_inspection_rules(video, frames)
-        else:
-            inspection = apply_coaching_rules(video, frames)
+            # Re-run analysis based on upload mode
+            if upload.mode == Upload.Mode.ENTERPRISE:
+                inspection = apply_inspection_rules(video, frames, lock=lock)
+            else:
+                inspection = apply_coaching_rules(video, frames, lock=lock)
+        except Exception:
+            lock.release()
+            raise
+        if inspection is None:
+            lock.release()
 
         return Response({
             'message': 'Video analysis restarted',
@@ -189,6 +253,28 @@ def reprocess_upload(request, upload_id):
         )
 
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def upload_scorecard(request, upload_id):
+    """
+    Get the materialized scorecard of an upload, kept current with manager review
+    """
+    scorecard = Scorecard.objects.select_related('upload').filter(upload_id=upload_id).first()
+    if scorecard is None:
+        return Response(
+            {'error': 'Scorecard not found'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+
+    if request.user.role != 'ADMIN' and scorecard.upload.store_id != request.user.store_id:
+        return Response(
+            {'error': 'Permission denied'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+
+    return Response(ScorecardSerializer(scorecard).data)
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def retention_status(request):
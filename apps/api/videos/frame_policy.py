@@ -0,0 +1,120 @@
+"""
+Frame budget policies per brand and mode.
+
+How many frames a video is sampled at, and when its analysis may stop, is a
+policy: FRAME_SAMPLING_FPS and MAX_FRAMES_PER_VIDEO, overridden per mode by
+FRAME_POLICY_DEFAULTS and per brand by
+brand.inspection_config['frame_policy'][mode]. Policy keys:
+
+    sampling_fps: Sampling rate of short videos
+    max_frames: Frames per video at most
+    frames_per_minute: Budget by duration (0 disables), at least min_frames
+    min_frames: Frames a video always gets, and analyzes before stopping early
+    daily_frame_cap: Frames the brand may extract per day (0 disables); never
+        cuts a video below min_frames
+    stability_window: Stop analyzing once the category scores stayed within
+        stability_band points over this many analyzed frames (0 disables)
+    stability_band: Score band in points
+
+The planned and analyzed frame counts and the reasons are recorded in
+video.metadata['frame_budget'].
+"""
+import math
+
+from django.conf import settings
+from django.utils import timezone
+
+POLICY_KEYS = [
+    'sampling_fps', 'max_frames', 'frames_per_minute', 'min_frames',
+    'daily_frame_cap', 'stability_window', 'stability_band',
+]
+
+
+def frame_policy(brand, mode):
+    """Frame budget policy of a brand for a mode ('enterprise' or 'coaching')"""
+    mode = (mode or 'enterprise').lower()
+    policy = {
+        'sampling_fps': float(settings.FRAME_SAMPLING_FPS),
+        'max_frames': int(settings.MAX_FRAMES_PER_VIDEO),
+        'frames_per_minute': 0,
+        'min_frames': 1,
+        'daily_frame_cap': 0,
+        'stability_window': 0,
+        'stability_band': 0.0,
+    }
+    policy.update(settings.FRAME_POLICY_DEFAULTS.get(mode, {}))
+    if brand is not None:
+        overrides = ((brand.inspection_config or {}).get('frame_policy') or {}).get(mode) or {}
+        policy.update({key: value for key, value in overrides.items() if key in POLICY_KEYS})
+    return policy
+
+
+def video_mode(video):
+    """Mode of the upload or inspection a video belongs to"""
+    if video.upload_id:
+        return video.upload.mode
+    if video.inspection_id:
+        return video.inspection.mode
+    return 'enterprise'
+
+
+def frames_extracted_today(brand_id, exclude_video=None):
+    """Frames stored today for the brand's videos"""
+    from .models import VideoFrame
+
+    start_of_day = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+    frames = VideoFrame.objects.filter(video__store__brand_id=brand_id, created_at__gte=start_of_day)
+    if exclude_video is not None:
+        frames = frames.exclude(video=exclude_video)
+    return frames.count()
+
+
+def frame_budget(policy, duration, video=None):
+    """Frames a video of the given duration may be sampled at
+
+    Returns:
+        tuple: (max_frames, reason) with reason 'max_frames',
+            'duration_budget' or 'daily_cap'
+    """
+    budget, reason = int(policy['max_frames']), 'max_frames'
+
+    if policy['frames_per_minute']:
+        by_duration = max(int(policy['min_frames']), math.ceil(duration / 60.0 * policy['frames_per_minute']))
+        if by_duration < budget:
+            budget, reason = by_duration, 'duration_budget'
+
+    if policy['daily_frame_cap'] and video is not None:
+        remaining = int(policy['daily_frame_cap']) - frames_extracted_today(video.store.brand_id, video)
+        remaining = max(int(policy['min_frames']), remaining)
+        if remaining < budget:
+            budget, reason = remaining, 'daily_cap'
+
+    return budget, reason
+
+
+def scores_stable(analyses, policy):
+    """True when the category scores stayed in the policy's band over its window
+
+    Args:
+        analyses: Frame analyses in the order they were analyzed
+    """
+    from inspections.tasks import calculate_inspection_scores
+
+    window = int(policy['stability_window'])
+    if not window or len(analyses) < max(int(policy['min_frames']), window + 1):
+        return False
+
+    band = float(policy['stability_band'])
+    current = calculate_inspection_scores(analyses)
+    for count in range(len(analyses) - window, len(analyses)):
+        earlier = calculate_inspection_scores(analyses[:count])
+        if any(abs(earlier[field] - score) > band for field, score in current.items()):
+            return False
+    return True
+
+
+def record_frame_budget(video, **fields):
+    """Merge fields into video.metadata['frame_budget']"""
+    metadata = video.metadata or {}
+    video.metadata = {**metadata, 'frame_budget': {**metadata.get('frame_budget', {}), **fields}}
+    video.save(update_fields=['metadata', 'updated_at'])
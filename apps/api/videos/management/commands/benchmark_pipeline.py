@@ -0,0 +1,247 @@
+import os
+import subprocess
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from PIL import Image
+
+from ai_services.analyzer import VideoAnalyzer
+from ai_services.mosaic import MOSAIC_TILES
+from ai_services.rekognition import RekognitionService
+from videos.frame_profile import encode_frame_renditions, preview_extension
+from videos.sampling import plan_adaptive_frame_timestamps
+from videos.tasks import extract_video_metadata, plan_frame_timestamps
+
+SECTIONS = ('sampling', 'encoding', 'mosaic')
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark frame sampling, encoding and label mosaics on a set of local video clips '
+        '(requires ffmpeg; the mosaic benchmark calls Rekognition)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('clips', nargs='+', help='Video files or directories of clips')
+        parser.add_argument(
+            '--sections',
+            default=','.join(SECTIONS),
+            help=f'Comma separated benchmarks to run ({", ".join(SECTIONS)})',
+        )
+        parser.add_argument(
+            '--frames-per-clip',
+            type=int,
+            default=5,
+            help='Frames to encode per clip in the encoding and mosaic benchmarks',
+        )
+        parser.add_argument(
+            '--bandwidth-mbps',
+            type=float,
+            default=50.0,
+            help='Network bandwidth used to estimate S3 and Rekognition transfer time',
+        )
+
+    def handle(self, *args, **options):
+        clips = self.find_clips(options['clips'])
+        if not clips:
+            raise CommandError('No video clips found')
+
+        sections = [name.strip() for name in options['sections'].split(',') if name.strip()]
+        unknown = set(sections) - set(SECTIONS)
+        if unknown:
+            raise CommandError(f'Unknown sections: {", ".join(sorted(unknown))}')
+
+        if 'sampling' in sections:
+            self.benchmark_sampling(clips)
+        if 'encoding' in sections:
+            self.benchmark_encoding(clips, options['frames_per_clip'], options['bandwidth_mbps'])
+        if 'mosaic' in sections:
+            self.benchmark_mosaic(clips, options['frames_per_clip'])
+
+    def find_clips(self, paths):
+        clips = []
+        for path in paths:
+            if os.path.isdir(path):
+                clips.extend(
+                    os.path.join(path, name) for name in sorted(os.listdir(path))
+                    if name.lower().endswith(('.mp4', '.mov', '.m4v', '.webm', '.avi'))
+                )
+            elif os.path.exists(path):
+                clips.append(path)
+        return clips
+
+    def extract_frame(self, clip, timestamp, path):
+        """Write the frame at timestamp with ffmpeg's default JPEG output; False on failure"""
+        result = subprocess.run(
+            ['ffmpeg', '-ss', str(timestamp), '-i', clip, '-vframes', '1', '-y', path],
+            capture_output=True
+        )
+        return result.returncode == 0 and os.path.exists(path)
+
+    def benchmark_sampling(self, clips):
+        """Compare fixed interval and adaptive sampling frame and Rekognition call counts"""
+        calls_per_frame = VideoAnalyzer.REKOGNITION_CALLS_PER_FRAME
+        total_fixed = total_adaptive = 0
+        total_seconds = 0.0
+
+        self.stdout.write(self.style.SUCCESS('\nFrame sampling'))
+        self.stdout.write(f"{'clip':40} {'duration':>8} {'fixed':>6} {'adaptive':>8} {'dupes':>6} {'blurry':>6} {'secs':>6}")
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for clip in clips:
+                duration = float(extract_video_metadata(clip).get('duration', 0))
+                fixed = plan_frame_timestamps(duration)
+
+                start = time.time()
+                adaptive, stats = plan_adaptive_frame_timestamps(clip, duration, os.path.join(temp_dir, 'bench'))
+                elapsed = time.time() - start
+                if adaptive is None:
+                    self.stdout.write(self.style.WARNING(f'{clip}: could not decode candidate frames, skipped'))
+                    continue
+
+                total_fixed += len(fixed)
+                total_adaptive += len(adaptive)
+                total_seconds += elapsed
+                self.stdout.write(
+                    f"{os.path.basename(clip)[:40]:40} {duration:8.1f} {len(fixed):6d} {len(adaptive):8d} "
+                    f"{stats['dropped_near_duplicates']:6d} {stats['windows_skipped_low_quality']:6d} {elapsed:6.2f}"
+                )
+
+        if not total_fixed:
+            return
+
+        cut = 100.0 * (total_fixed - total_adaptive) / total_fixed
+        self.stdout.write(
+            f'\nRekognition calls: fixed {total_fixed * calls_per_frame}, '
+            f'adaptive {total_adaptive * calls_per_frame} ({cut:.1f}% fewer), '
+            f'sampling overhead {total_seconds:.2f}s'
+        )
+
+    def benchmark_encoding(self, clips, frames_per_clip, bandwidth_mbps):
+        """Compare ffmpeg's default frame output with the configured frame profile
+
+        Transfer time counts one S3 PUT, one S3 GET and one Rekognition
+        payload per Rekognition call for every frame.
+        """
+        transfers_per_frame = 2 + VideoAnalyzer.REKOGNITION_CALLS_PER_FRAME
+        bytes_per_second = bandwidth_mbps * 1_000_000 / 8
+        raw_bytes = profile_bytes = preview_bytes = 0
+        encode_seconds = 0.0
+        frames = 0
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for clip in clips:
+                duration = float(extract_video_metadata(clip).get('duration', 0))
+                for number, timestamp in enumerate(plan_frame_timestamps(duration)[:frames_per_clip]):
+                    raw_path = os.path.join(temp_dir, f'raw_{number}.jpg')
+                    if not self.extract_frame(clip, timestamp, raw_path):
+                        continue
+
+                    frame_path = os.path.join(temp_dir, f'frame_{number}.jpg')
+                    preview_path = os.path.join(temp_dir, f'frame_{number}_preview.{preview_extension()}')
+                    start = time.time()
+                    with Image.open(raw_path) as img:
+                        img.load()
+                    encode_frame_renditions(img, frame_path, preview_path)
+                    encode_seconds += time.time() - start
+
+                    raw_bytes += os.path.getsize(raw_path)
+                    profile_bytes += os.path.getsize(frame_path)
+                    preview_bytes += os.path.getsize(preview_path)
+                    frames += 1
+
+        if not frames:
+            self.stdout.write(self.style.WARNING('No frames could be extracted for the encoding benchmark'))
+            return
+
+        raw_transfer = raw_bytes * transfers_per_frame / bytes_per_second / frames
+        profile_transfer = (
+            (profile_bytes * transfers_per_frame + preview_bytes * 2) / bytes_per_second / frames
+        )
+        encode_per_frame = encode_seconds / frames
+
+        self.stdout.write(self.style.SUCCESS('\nFrame encoding'))
+        self.stdout.write(
+            f'Bytes per frame: ffmpeg default {raw_bytes // frames:,}, '
+            f'profile {profile_bytes // frames:,}, preview {preview_bytes // frames:,}'
+        )
+        self.stdout.write(
+            f'Per frame latency at {bandwidth_mbps:g} Mbps: ffmpeg default {raw_transfer:.3f}s, '
+            f'profile {profile_transfer + encode_per_frame:.3f}s '
+            f'(encode {encode_per_frame:.3f}s + transfer {profile_transfer:.3f}s)'
+        )
+
+    def benchmark_mosaic(self, clips, frames_per_clip):
+        """Compare per-frame and mosaic detect_labels on call count and agreement
+
+        Per-frame results are the reference: recall is the share of
+        (frame, label) pairs it found that the mosaic also found, precision the
+        share of mosaic pairs it confirms. People counts are compared per frame.
+        """
+        rekognition = RekognitionService()
+        if rekognition.client is None:
+            raise CommandError('The mosaic benchmark needs Rekognition enabled and AWS credentials configured')
+
+        images = []
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for clip in clips:
+                duration = float(extract_video_metadata(clip).get('duration', 0))
+                for number, timestamp in enumerate(plan_frame_timestamps(duration)[:frames_per_clip]):
+                    raw_path = os.path.join(temp_dir, 'raw.jpg')
+                    if not self.extract_frame(clip, timestamp, raw_path):
+                        continue
+                    frame_path = os.path.join(temp_dir, 'frame.jpg')
+                    with Image.open(raw_path) as img:
+                        img.load()
+                    encode_frame_renditions(img, frame_path, os.path.join(temp_dir, f'preview.{preview_extension()}'))
+                    with open(frame_path, 'rb') as f:
+                        images.append(f.read())
+
+        if not images:
+            self.stdout.write(self.style.WARNING('No frames could be extracted for the mosaic benchmark'))
+            return
+
+        start = time.time()
+        reference = [
+            {'objects': rekognition.detect_objects(image), 'people': rekognition.detect_people(image)}
+            for image in images
+        ]
+        per_frame_seconds = time.time() - start
+
+        start = time.time()
+        mosaic = []
+        for offset in range(0, len(images), MOSAIC_TILES):
+            mosaic.extend(rekognition.detect_labels_mosaic(images[offset:offset + MOSAIC_TILES]))
+        mosaic_seconds = time.time() - start
+
+        # Frames of mosaics with labels that cannot be attributed get their own calls, as in the pipeline
+        fallback_frames = sum(1 for result in mosaic if result is None)
+        mosaic = [result or expected for result, expected in zip(mosaic, reference)]
+
+        def label_pairs(results):
+            return {
+                (index, label['Name'])
+                for index, result in enumerate(results)
+                for label in result['objects']['all_labels']
+            }
+
+        expected, found = label_pairs(reference), label_pairs(mosaic)
+        matched = len(expected & found)
+        recall = 100.0 * matched / len(expected) if expected else 100.0
+        precision = 100.0 * matched / len(found) if found else 100.0
+        people_error = sum(
+            abs(a['people']['people_count'] - b['people']['people_count']) for a, b in zip(reference, mosaic)
+        ) / len(images)
+
+        self.stdout.write(self.style.SUCCESS('\nLabel mosaic'))
+        self.stdout.write(
+            f'detect_labels calls for {len(images)} frames: per frame {len(images) * 2} '
+            f'({per_frame_seconds:.2f}s), mosaic {-(-len(images) // MOSAIC_TILES) + fallback_frames * 2} '
+            f'({mosaic_seconds:.2f}s, {fallback_frames} frames fell back to per-frame calls)'
+        )
+        self.stdout.write(
+            f'Label agreement: recall {recall:.1f}%, precision {precision:.1f}%, '
+            f'mean people count error {people_error:.2f}'
+        )
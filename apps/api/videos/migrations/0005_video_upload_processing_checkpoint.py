@@ -0,0 +1,30 @@
+# Generated by Django 4.2.30 on 2026-10-19 02:33
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('uploads', '0004_rename_inspection_to_enterprise'),
+        ('videos', '0004_video_one_video_per_inspection_v1'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='video',
+            name='processing_checkpoint',
+            field=models.JSONField(blank=True, default=dict, help_text='Completed pipeline stages and frames, used to resume processing on retry'),
+        ),
+        migrations.AddField(
+            model_name='video',
+            name='upload',
+            field=models.ForeignKey(blank=True, help_text='Upload this video was processed from', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='videos', to='uploads.upload'),
+        ),
+        migrations.AddField(
+            model_name='videoframe',
+            name='ai_analysis',
+            field=models.JSONField(blank=True, help_text='Checkpointed AI analysis for this frame', null=True),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-19 02:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0005_video_upload_processing_checkpoint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='videoframe',
+            name='brightness',
+            field=models.FloatField(blank=True, help_text='Mean luma 0-255 of the downscaled frame', null=True),
+        ),
+        migrations.AddField(
+            model_name='videoframe',
+            name='sharpness',
+            field=models.FloatField(blank=True, help_text='Laplacian variance of the downscaled frame', null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 02:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0006_videoframe_quality_scores'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='videoframe',
+            name='preview',
+            field=models.ImageField(blank=True, help_text='Small rendition for the web UI', upload_to='frames/previews/'),
+        ),
+    ]
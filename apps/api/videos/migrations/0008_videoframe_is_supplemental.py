@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 03:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0007_videoframe_preview'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='videoframe',
+            name='is_supplemental',
+            field=models.BooleanField(default=False, help_text="Extracted by an on-demand range analysis; not part of the inspection's scores"),
+        ),
+    ]
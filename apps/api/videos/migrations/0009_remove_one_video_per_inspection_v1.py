@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-19 03:40
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0008_videoframe_is_supplemental'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='video',
+            name='one_video_per_inspection_v1',
+        ),
+    ]
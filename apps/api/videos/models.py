@@ -13,7 +13,7 @@ class Video(models.Model):
         WATCH = 'WATCH', 'Watch Stage'
         TRY = 'TRY', 'Try Stage'
 
-    # Inspection relationship - videos now belong to inspections (future: many videos per inspection)
+    # Inspection relationship - an inspection may cover several videos (e.g. kitchen, dining, storage)
     inspection = models.ForeignKey(
         'inspections.Inspection',
         on_delete=models.CASCADE,
@@ -23,6 +23,15 @@ class Video(models.Model):
         help_text="Inspection this video belongs to (null for videos pending inspection creation)"
     )
 
+    upload = models.ForeignKey(
+        'uploads.Upload',
+        on_delete=models.SET_NULL,
+        related_name='videos',
+        null=True,
+        blank=True,
+        help_text="Upload this video was processed from"
+    )
+
     uploaded_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     store = models.ForeignKey('brands.Store', on_delete=models.CASCADE)
     title = models.CharField(max_length=200)
@@ -34,6 +43,11 @@ class Video(models.Model):
     status = models.CharField(max_length=20, choices=Status.choices, default=Status.UPLOADED)
     error_message = models.TextField(blank=True)
     metadata = models.JSONField(default=dict, help_text="Video metadata from FFmpeg")
+    processing_checkpoint = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text="Completed pipeline stages and frames, used to resume processing on retry"
+    )
     
     # Demo functionality fields
     is_demo = models.BooleanField(default=False, help_text="Whether this is a demo video")
@@ -55,26 +69,61 @@ class Video(models.Model):
     class Meta:
         db_table = 'videos'
         ordering = ['-created_at']
-        constraints = [
-            # Enforce 1:1 relationship for now (remove later for multi-video support)
-            models.UniqueConstraint(
-                fields=['inspection'],
-                condition=models.Q(inspection__isnull=False),
-                name='one_video_per_inspection_v1'
-            )
-        ]
 
     def __str__(self):
         return f"{self.title} - {self.store.name}"
 
+    def update_checkpoint(self, **changes):
+        """Merge completed-stage markers into the processing checkpoint and save"""
+        self.processing_checkpoint = {**(self.processing_checkpoint or {}), **changes}
+        self.save(update_fields=['processing_checkpoint', 'updated_at'])
+
+    def analysis_progress(self, inspection_id):
+        """Share of this video's frames analyzed for an inspection, 0 to 1"""
+        checkpoint = (self.processing_checkpoint or {}).get('analysis', {})
+        if checkpoint.get('inspection_id') != inspection_id:
+            return 0.0
+        if checkpoint.get('completed_at'):
+            return 1.0
+        return checkpoint.get('progress', 0.0)
+
+    def delete_media(self):
+        """Delete the stored files of the video and its frames
+
+        Deduplicated videos share frame images, previews and the thumbnail with
+        the video they were cloned from; files another video still references
+        are kept.
+        """
+        other_videos = Video.objects.exclude(id=self.id)
+        other_frames = VideoFrame.objects.exclude(video=self)
+
+        for frame in self.frames.all():
+            if frame.image and not other_frames.filter(image=frame.image.name).exists():
+                frame.image.storage.delete(frame.image.name)
+            if frame.preview and not other_frames.filter(preview=frame.preview.name).exists():
+                frame.preview.storage.delete(frame.preview.name)
+
+        if self.thumbnail and not other_videos.filter(thumbnail=self.thumbnail.name).exists():
+            self.thumbnail.storage.delete(self.thumbnail.name)
+        if self.file and not other_videos.filter(file=self.file.name).exists():
+            self.file.storage.delete(self.file.name)
+
 
 class VideoFrame(models.Model):
     video = models.ForeignKey(Video, on_delete=models.CASCADE, related_name='frames')
     timestamp = models.FloatField(help_text="Timestamp in seconds")
     frame_number = models.IntegerField()
     image = models.ImageField(upload_to='frames/')
+    preview = models.ImageField(upload_to='frames/previews/', blank=True, help_text="Small rendition for the web UI")
     width = models.IntegerField()
     height = models.IntegerField()
+    ai_analysis = models.JSONField(null=True, blank=True, help_text="Checkpointed AI analysis for this frame")
+    sharpness = models.FloatField(null=True, blank=True, help_text="Laplacian variance of the downscaled frame")
+    brightness = models.FloatField(null=True, blank=True, help_text="Mean luma 0-255 of the downscaled frame")
+    is_supplemental = models.BooleanField(
+        default=False,
+        help_text="Extracted by an on-demand range analysis; not part of the inspection's scores"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -83,4 +132,10 @@ class VideoFrame(models.Model):
         unique_together = ['video', 'frame_number']
 
     def __str__(self):
-        return f"{self.video.title} - Frame {self.frame_number}"
\ No newline at end of file
+        return f"{self.video.title} - Frame {self.frame_number}"
+
+    @property
+    def passes_quality_gate(self):
+        """False for blurred or badly exposed frames that are not worth analyzing"""
+        from .sampling import is_usable_quality
+        return is_usable_quality(self.sharpness, self.brightness)
\ No newline at end of file
@@ -0,0 +1,159 @@
+"""
+On-demand analysis of a time range of a stored video.
+
+Inspectors taking a closer look at a few seconds of an inspection get frames
+extracted at RANGE_ANALYSIS_FPS for just that range. ffmpeg seeks on the
+input (-ss before -i) into the stored source, read over a presigned URL so
+only the bytes around the range are fetched, and decodes the range in a
+single pass. The frames are stored as supplemental VideoFrames, analyzed
+with the same engines as the regular frames, and their findings are added to
+the inspection. Supplemental frames never count towards the inspection's
+scores.
+"""
+import glob
+import logging
+import os
+import subprocess
+
+import boto3
+from django.conf import settings
+from django.db.models import Max
+from django.utils import timezone
+from PIL import Image
+
+from .frame_profile import encode_frame_renditions, preview_extension
+from .sampling import frame_quality
+
+logger = logging.getLogger(__name__)
+
+
+def video_source(video):
+    """Location ffmpeg can seek in: a presigned S3 URL, or the local file of legacy videos"""
+    from .tasks import find_upload_for_video
+
+    upload = find_upload_for_video(video)
+    if upload:
+        s3_client = boto3.client(
+            's3',
+            aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+            aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+            region_name=settings.AWS_S3_REGION_NAME
+        )
+        return s3_client.generate_presigned_url(
+            'get_object',
+            Params={'Bucket': settings.AWS_STORAGE_BUCKET_NAME, 'Key': upload.s3_key},
+            ExpiresIn=settings.RANGE_ANALYSIS_URL_EXPIRY_SECONDS,
+        )
+    try:
+        return video.file.path
+    except NotImplementedError:
+        return video.file.url
+
+
+def extract_range_frames(video, source, start, end, first_frame_number):
+    """Decode the frames of [start, end) at RANGE_ANALYSIS_FPS in one ffmpeg pass
+
+    Frames are re-encoded to the frame profile like regular frames and
+    numbered from first_frame_number on.
+
+    Returns:
+        list: extract_frames_to_disk() style dicts
+    """
+    temp_dir = os.path.join(settings.MEDIA_ROOT, 'temp')
+    os.makedirs(temp_dir, exist_ok=True)
+    prefix = os.path.join(temp_dir, f"video_{video.id}_range_{first_frame_number}")
+
+    fps = float(settings.RANGE_ANALYSIS_FPS)
+    cmd = [
+        'ffmpeg', '-ss', f"{start:.3f}", '-i', source, '-t', f"{end - start:.3f}",
+        '-vf', f"fps={fps}", '-q:v', '2', '-y', f"{prefix}_%05d.jpg"
+    ]
+    result = subprocess.run(cmd, capture_output=True)
+    if result.returncode != 0:
+        for path in glob.glob(f"{prefix}_*.jpg"):
+            os.remove(path)
+        raise Exception(f"Range extraction failed: {result.stderr.decode(errors='ignore')[-200:]}")
+
+    extracted = []
+    for index, path in enumerate(sorted(glob.glob(f"{prefix}_*.jpg"))):
+        frame_number = first_frame_number + index
+        frame_path = os.path.join(temp_dir, f"video_{video.id}_frame_{frame_number}.jpg")
+        preview_path = os.path.join(temp_dir, f"video_{video.id}_frame_{frame_number}_preview.{preview_extension()}")
+
+        with Image.open(path) as img:
+            img.load()
+        os.remove(path)
+        width, height = encode_frame_renditions(img, frame_path, preview_path)
+
+        extracted.append({
+            'path': frame_path,
+            'preview_path': preview_path,
+            'timestamp': round(start + index / fps, 3),
+            'frame_number': frame_number,
+            'width': width,
+            'height': height,
+            **frame_quality(img),
+        })
+    return extracted
+
+
+def analyze_video_range(video, start, end):
+    """Extract, analyze and attach supplemental frames of [start, end) to the video's inspection
+
+    Returns:
+        dict: The range record appended to the inspection's
+            ai_analysis['supplemental_ranges']
+    """
+    from inspections.tasks import (
+        VideoAnalyzer, analyze_stored_frames, create_findings_from_analysis, plan_frame_analysis,
+        track_findings,
+    )
+    from .tasks import store_extracted_frames
+
+    inspection = video.inspection
+    first_frame_number = (video.frames.aggregate(last=Max('frame_number'))['last'] or -1) + 1
+
+    extracted = extract_range_frames(video, video_source(video), start, end, first_frame_number)
+    frames = store_extracted_frames(video, extracted, supplemental=True)
+    if not frames:
+        raise Exception(f"No frames extracted between {start}s and {end}s")
+
+    usable_frames = [frame for frame in frames if frame.passes_quality_gate]
+    if not usable_frames:
+        usable_frames = [max(frames, key=lambda frame: frame.sharpness or 0)]
+
+    analyzer = VideoAnalyzer(store_id=video.store_id)
+    plan = plan_frame_analysis(analyzer)
+    frame_findings = []
+    failed_frames = []
+    batch_size = plan['frames_per_call']
+    for offset in range(0, len(usable_frames), batch_size):
+        batch = usable_frames[offset:offset + batch_size]
+        for frame, frame_analysis in zip(batch, analyze_stored_frames(analyzer, batch, plan)):
+            if frame_analysis is None:
+                failed_frames.append(frame.frame_number)
+                continue
+            frame.ai_analysis = frame_analysis
+            frame.save(update_fields=['ai_analysis'])
+            frame_findings.append((frame, analyzer.generate_findings(frame_analysis, frame)))
+
+    record = {
+        'start': start,
+        'end': end,
+        'frame_ids': [frame.id for frame in frames],
+        'frames_analyzed': len(frame_findings),
+        'frames_failed': failed_frames,
+    }
+    findings = create_findings_from_analysis(inspection, track_findings(frame_findings), summary=record)
+    record['finding_ids'] = [finding.id for finding in findings]
+    record['analysis_timestamp'] = timezone.now().isoformat()
+
+    inspection.update_ai_analysis(lambda stored: {
+        **stored, 'supplemental_ranges': [*stored.get('supplemental_ranges', []), record],
+    })
+
+    logger.info(
+        f"Inspection {inspection.id}: analyzed {len(frame_findings)} supplemental frames "
+        f"of video {video.id} between {start}s and {end}s, {len(findings)} findings"
+    )
+    return record
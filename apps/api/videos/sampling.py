@@ -0,0 +1,247 @@
+"""
+Adaptive frame sampling for uploaded videos.
+
+Instead of spending the whole frame budget at fixed intervals, candidate
+frames are decoded at low resolution in a single ffmpeg pass and scored by
+scene change (grayscale histogram difference to the previous candidate) and
+perceptual-hash distance (dHash Hamming distance to the last kept frame).
+Near-duplicates of the last kept frame are dropped, so a static shot costs a
+few frames while a fast pan gets the full budget.
+
+Before that, a quality gate groups candidates into sampling windows and keeps
+only the sharpest well-exposed frame of each window (Laplacian variance and
+mean brightness of the downscaled decode); windows where every frame is
+blurred or badly exposed are skipped.
+"""
+import glob
+import logging
+import os
+import subprocess
+
+from django.conf import settings
+from PIL import Image, ImageFilter, ImageStat
+
+logger = logging.getLogger(__name__)
+
+HASH_SIZE = 8
+HASH_BITS = HASH_SIZE * HASH_SIZE
+HISTOGRAM_BINS = 16
+CANDIDATE_WIDTH = 160
+
+# 3x3 Laplacian, offset so negative responses are not clipped to zero
+LAPLACIAN = ImageFilter.Kernel((3, 3), [0, 1, 0, 1, -4, 1, 0, 1, 0], scale=1, offset=128)
+
+
+def dhash(image, hash_size=HASH_SIZE):
+    """Difference hash of an image as an int of hash_size * hash_size bits"""
+    gray = image.convert('L').resize((hash_size + 1, hash_size), Image.BILINEAR)
+    pixels = list(gray.getdata())
+
+    bits = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            bits = (bits << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return bits
+
+
+def hamming_distance(a, b):
+    return bin(a ^ b).count('1')
+
+
+def gray_histogram(image, bins=HISTOGRAM_BINS):
+    """Normalized grayscale histogram with the given number of bins"""
+    counts = image.convert('L').histogram()
+    step = 256 // bins
+    binned = [sum(counts[i:i + step]) for i in range(0, 256, step)]
+    total = float(sum(binned)) or 1.0
+    return [count / total for count in binned]
+
+
+def histogram_distance(a, b):
+    """Scene change score between two normalized histograms, 0 (same) to 1 (disjoint)"""
+    return sum(abs(x - y) for x, y in zip(a, b)) / 2
+
+
+def frame_quality(image):
+    """Sharpness (Laplacian variance) and brightness (mean luma) of an image
+
+    Measured on a CANDIDATE_WIDTH-wide downscale so scores are comparable
+    between candidate decodes and full resolution frames.
+    """
+    gray = image.convert('L')
+    if gray.width > CANDIDATE_WIDTH:
+        gray = gray.resize((CANDIDATE_WIDTH, max(1, round(gray.height * CANDIDATE_WIDTH / gray.width))))
+
+    return {
+        'sharpness': round(ImageStat.Stat(gray.filter(LAPLACIAN)).var[0], 2),
+        'brightness': round(ImageStat.Stat(gray).mean[0], 2),
+    }
+
+
+def is_usable_quality(sharpness, brightness):
+    """True when a frame is sharp and well exposed enough to be worth analyzing
+
+    Frames without scores (stored before the quality gate existed) pass.
+    """
+    if sharpness is None or brightness is None:
+        return True
+    return (
+        sharpness >= settings.FRAME_MIN_SHARPNESS
+        and settings.FRAME_MIN_BRIGHTNESS <= brightness <= settings.FRAME_MAX_BRIGHTNESS
+    )
+
+
+def describe_frame(image, timestamp):
+    """Sampling features of a candidate frame"""
+    return {
+        'timestamp': timestamp,
+        'hash': dhash(image),
+        'histogram': gray_histogram(image),
+        **frame_quality(image),
+    }
+
+
+def best_frame_per_window(candidates, window_size):
+    """Keep the sharpest usable candidate of each window of window_size candidates
+
+    Returns:
+        tuple: (chosen candidates in time order, number of windows skipped
+            because none of their frames was usable)
+    """
+    chosen = []
+    skipped = 0
+    for start in range(0, len(candidates), window_size):
+        usable = [
+            c for c in candidates[start:start + window_size]
+            if is_usable_quality(c['sharpness'], c['brightness'])
+        ]
+        if usable:
+            chosen.append(max(usable, key=lambda c: c['sharpness']))
+        else:
+            skipped += 1
+    return chosen, skipped
+
+
+def select_frames(candidates, max_frames, min_hash_distance=None, scene_cut_threshold=None):
+    """Pick the candidate frames worth storing and analyzing
+
+    A candidate is kept when it differs from the last kept frame by at least
+    min_hash_distance hash bits, or when it starts a new scene. If more frames
+    qualify than the budget allows, the ones with the largest change win; the
+    first frame is always kept and the result stays in time order.
+
+    Args:
+        candidates: describe_frame() dicts in time order
+
+    Returns:
+        tuple: (kept candidates, stats dict)
+    """
+    if min_hash_distance is None:
+        min_hash_distance = settings.ADAPTIVE_SAMPLING_MIN_HASH_DISTANCE
+    if scene_cut_threshold is None:
+        scene_cut_threshold = settings.ADAPTIVE_SAMPLING_SCENE_CUT_THRESHOLD
+
+    kept = []
+    near_duplicates = 0
+    previous = None
+    for candidate in candidates:
+        if not kept:
+            score = 1.0
+        else:
+            distance = hamming_distance(kept[-1]['hash'], candidate['hash'])
+            scene_change = histogram_distance(previous['histogram'], candidate['histogram'])
+            if distance < min_hash_distance and scene_change < scene_cut_threshold:
+                near_duplicates += 1
+                previous = candidate
+                continue
+            score = max(distance / HASH_BITS, scene_change)
+
+        kept.append({**candidate, 'score': score})
+        previous = candidate
+
+    over_budget = max(len(kept) - max_frames, 0)
+    if over_budget:
+        first, rest = kept[0], kept[1:]
+        best = sorted(rest, key=lambda c: c['score'], reverse=True)[:max_frames - 1]
+        kept = [first] + sorted(best, key=lambda c: c['timestamp'])
+
+    stats = {
+        'strategy': 'adaptive',
+        'candidates': len(candidates),
+        'kept': len(kept),
+        'dropped_near_duplicates': near_duplicates,
+        'dropped_over_budget': over_budget,
+    }
+    return kept, stats
+
+
+def candidate_rate(duration, max_frames=None, sampling_fps=None):
+    """Frames per second to decode candidates at for a video of the given duration"""
+    max_frames = int(max_frames or settings.MAX_FRAMES_PER_VIDEO)
+    sampling_fps = float(sampling_fps or settings.FRAME_SAMPLING_FPS)
+    factor = int(settings.ADAPTIVE_SAMPLING_CANDIDATE_FACTOR)
+    return min(sampling_fps * factor, max_frames * factor / duration)
+
+
+def extract_candidate_frames(video_path, duration, temp_prefix, max_frames=None, sampling_fps=None):
+    """Decode low resolution candidate frames in one ffmpeg pass
+
+    Returns:
+        list: describe_frame() dicts in time order, empty if decoding failed
+    """
+    rate = candidate_rate(duration, max_frames, sampling_fps)
+    pattern = f"{temp_prefix}_candidate_%05d.jpg"
+    cmd = [
+        'ffmpeg', '-i', video_path,
+        '-vf', f"fps={rate},scale={CANDIDATE_WIDTH}:-2",
+        '-q:v', '5', '-y', pattern
+    ]
+
+    candidates = []
+    try:
+        result = subprocess.run(cmd, capture_output=True)
+        if result.returncode != 0:
+            logger.warning(f"Candidate frame extraction failed: {result.stderr.decode(errors='ignore')[-200:]}")
+            return []
+
+        for index, path in enumerate(sorted(glob.glob(f"{temp_prefix}_candidate_*.jpg"))):
+            timestamp = index / rate
+            if timestamp >= duration:
+                break
+            with Image.open(path) as img:
+                candidates.append(describe_frame(img, timestamp))
+    finally:
+        for path in glob.glob(f"{temp_prefix}_candidate_*.jpg"):
+            os.remove(path)
+
+    return candidates
+
+
+def plan_adaptive_frame_timestamps(video_path, duration, temp_prefix, max_frames=None, sampling_fps=None):
+    """Frame timestamps chosen by content change, plus sampling stats
+
+    Args:
+        max_frames: Frame budget; defaults to MAX_FRAMES_PER_VIDEO
+        sampling_fps: Sampling rate of short videos; defaults to FRAME_SAMPLING_FPS
+
+    Returns:
+        tuple: (timestamps, stats), or (None, None) if candidates could not be decoded
+    """
+    if duration <= 0:
+        return [], {'strategy': 'adaptive', 'candidates': 0, 'windows': 0, 'windows_skipped_low_quality': 0,
+                    'kept': 0, 'dropped_near_duplicates': 0, 'dropped_over_budget': 0}
+
+    candidates = extract_candidate_frames(video_path, duration, temp_prefix, max_frames, sampling_fps)
+    if not candidates:
+        return None, None
+
+    window_size = int(settings.ADAPTIVE_SAMPLING_CANDIDATE_FACTOR)
+    best, windows_skipped = best_frame_per_window(candidates, window_size)
+    kept, stats = select_frames(best, int(max_frames or settings.MAX_FRAMES_PER_VIDEO))
+    stats.update({
+        'candidates': len(candidates),
+        'windows': -(-len(candidates) // window_size),
+        'windows_skipped_low_quality': windows_skipped,
+    })
+    return [round(c['timestamp'], 3) for c in kept], stats
@@ -5,7 +5,7 @@ from .models import Video, VideoFrame
 class VideoFrameSerializer(serializers.ModelSerializer):
     class Meta:
         model = VideoFrame
-        fields = '__all__'
+        exclude = ('ai_analysis',)
 
 
 class VideoSerializer(serializers.ModelSerializer):
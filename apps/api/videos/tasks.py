@@ -1,167 +1,437 @@
 import os
+import base64
 import subprocess
 import json
+import hashlib
 import logging
 import boto3
-from celery import shared_task
+from celery import shared_task, chain
 from django.conf import settings
 from django.core.files.base import ContentFile
 from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Count, Q
 from PIL import Image
 from .models import Video, VideoFrame
-from uploads.models import Upload
+from .frame_policy import frame_budget, frame_policy, video_mode
+from .range_analysis import analyze_video_range
+from .sampling import plan_adaptive_frame_timestamps, frame_quality
+from .frame_profile import encode_frame_renditions, preview_extension
+from uploads.models import Upload, Detection
+from inspections.models import Inspection
+from core.locks import PipelineLock, pipeline_lease, release_pipeline_lock, claim_idempotency_key
 
 logger = logging.getLogger(__name__)
 
 
 @shared_task(bind=True)
-def process_video_upload(self, upload_id):
+def process_video_upload(self, upload_id, lock_token=None, idempotency_key=None, force_reanalysis=False):
     """
-    Enhanced video processing with rule engine integration
+    Process an uploaded video through the staged pipeline.
+
+    Thin wrapper kept for existing callers - the work itself runs as a chain
+    of stage tasks so I/O and CPU bound stages land on separate worker pools.
+    The run holds the upload's pipeline lock; callers that already acquired
+    it (the API views) pass its token along. force_reanalysis processes the
+    video even when an identical one was already analyzed for the brand.
     """
-    try:
-        upload = Upload.objects.get(id=upload_id)
-        upload.status = Upload.Status.PROCESSING
-        upload.save()
-
-        # Download video from S3 to temp location
-        video_path = download_from_s3(upload.s3_key)
-
-        # Extract video metadata
-        metadata = extract_video_metadata(video_path)
-        upload.duration_s = int(float(metadata.get('duration', 0)))
-        upload.metadata = metadata
-        upload.save()
-
-        # Create Video record for compatibility
-        video = Video.objects.create(
-            title=upload.original_filename,
-            description=f"Upload from {upload.store.name}",
-            store=upload.store,
-            uploaded_by=upload.created_by,
-            status=Video.Status.PROCESSING,
-            duration=upload.duration_s,
-            metadata=metadata
-        )
+    if not claim_task_idempotency_key(self, idempotency_key):
+        return f"Upload {upload_id} already queued (duplicate request)"
 
-        # Set the file field to point to S3 key for signed URL generation
-        video.file.name = upload.s3_key
-        video.save()
+    lock = PipelineLock.for_resource('upload', upload_id, token=lock_token)
+    if not lock.acquire():
+        return f"Upload {upload_id} is already being processed"
 
-        # Generate thumbnail
-        thumbnail_path = generate_thumbnail(video_path, video.id)
-        if thumbnail_path:
-            video.thumbnail = thumbnail_path
-            video.save()
+    start_pipeline(build_video_pipeline(upload_id, lock=lock, force_reanalysis=force_reanalysis), lock)
+    return f"Upload {upload_id} queued for processing"
 
-        # Extract frames for analysis
-        frames = extract_frames_from_s3_video(video, video_path)
 
-        # Apply rule engine for automated analysis
-        if upload.mode == Upload.Mode.ENTERPRISE:
-            inspection = apply_inspection_rules(video, frames)
-        else:
-            inspection = apply_coaching_rules(video, frames)
+@shared_task(bind=True)
+def reprocess_video_from_s3(self, video_id, lock_token=None, idempotency_key=None):
+    """
+    Fully reprocess a video that failed initial processing.
 
-        # Clean up temp file
-        if os.path.exists(video_path):
-            os.remove(video_path)
+    Resumes from the video's processing checkpoint: frames already stored in
+    S3 are kept and only the stages and frames still missing are run again.
+    """
+    if not claim_task_idempotency_key(self, idempotency_key):
+        return f"Video {video_id} already queued for reprocessing (duplicate request)"
 
-        upload.status = Upload.Status.COMPLETE
-        upload.save()
+    video = Video.objects.get(id=video_id)
 
-        video.status = Video.Status.COMPLETED
-        video.save()
+    # Find the Upload record to get S3 key
+    upload = find_upload_for_video(video)
 
-        return f"Upload {upload_id} processed successfully with {len(frames)} frames analyzed"
+    if not upload:
+        video.status = Video.Status.FAILED
+        video.error_message = "No Upload record found - cannot locate video in S3"
+        video.save()
+        return f"Video {video_id} could not be reprocessed: no Upload record"
 
-    except Exception as exc:
-        upload = Upload.objects.get(id=upload_id)
-        upload.status = Upload.Status.FAILED
-        upload.error_message = str(exc)
-        upload.save()
+    lock = PipelineLock.for_resource('upload', upload.id, token=lock_token)
+    if not lock.acquire():
+        return f"Video {video_id} is already being processed"
 
-        # Clean up temp file on error
-        try:
-            if 'video_path' in locals() and os.path.exists(video_path):
-                os.remove(video_path)
-        except Exception:
-            pass
+    video.status = Video.Status.PROCESSING
+    video.error_message = ''
+    video.save()
 
-        raise self.retry(exc=exc, countdown=60, max_retries=3)
+    start_pipeline(build_video_pipeline(upload.id, video_id=video.id, lock=lock), lock)
+    return f"Video {video_id} queued for full reprocessing"
 
 
 @shared_task(bind=True)
-def reprocess_video_from_s3(self, video_id):
-    """
-    Fully reprocess a video that failed initial processing.
-    Downloads from S3, extracts frames, and runs AI analysis.
+def analyze_video_range_task(self, video_id, start, end, lock_token=None):
+    """Analyze a time range of a video on demand and attach the results to its inspection
+
+    Runs under the video's range analysis lock, acquired by the caller.
     """
+    lock = PipelineLock.for_resource('video_range', video_id, token=lock_token)
+    if not lock.acquire():
+        return f"Video {video_id} range is already being analyzed"
+
     try:
-        video = Video.objects.get(id=video_id)
-        video.status = Video.Status.PROCESSING
-        video.error_message = ''
-        video.save()
+        with lock.keep_alive():
+            record = analyze_video_range(Video.objects.get(id=video_id), start, end)
+    finally:
+        lock.release()
+    return f"Video {video_id} range {start}-{end}s analyzed: {len(record['finding_ids'])} findings"
 
-        # Find the Upload record to get S3 key
-        upload = Upload.objects.filter(
-            store=video.store,
-            original_filename=video.title
-        ).order_by('-created_at').first()
 
-        if not upload:
-            raise Exception("No Upload record found - cannot locate video in S3")
+def claim_task_idempotency_key(task, idempotency_key=None):
+    """Claim the caller's idempotency key, or the task id for redelivered messages
 
-        # Download from S3
-        video_path = download_from_s3(upload.s3_key)
+    Returns:
+        bool: False when this request was already handled
+    """
+    key = idempotency_key or task.request.id
+    if not key:
+        return True
+    return claim_idempotency_key(f"{task.name}:{key}")
 
-        # Extract metadata
-        metadata = extract_video_metadata(video_path)
-        video.duration = metadata.get('duration', 0)
-        video.metadata = metadata
-        video.save()
 
-        # Generate thumbnail
-        thumbnail_path = generate_thumbnail(video_path, video.id)
-        if thumbnail_path:
-            video.thumbnail = thumbnail_path
-            video.save()
+def start_pipeline(pipeline, lock):
+    """Enqueue a pipeline, releasing its lock if it could not be queued"""
+    try:
+        pipeline.apply_async()
+    except Exception:
+        lock.release()
+        raise
 
-        # Delete old frames if any
-        video.frames.all().delete()
 
-        # Extract frames
-        frames = extract_frames_from_s3_video(video, video_path)
+def find_upload_for_video(video):
+    """Return the Upload a video was processed from
 
-        # Apply AI analysis
-        if upload.mode == Upload.Mode.ENTERPRISE:
-            apply_inspection_rules(video, frames)
-        else:
-            apply_coaching_rules(video, frames)
+    Legacy videos without an upload link are matched by store and filename.
+    """
+    if video.upload_id:
+        return video.upload
 
-        # Clean up temp file
-        if os.path.exists(video_path):
-            os.remove(video_path)
+    return Upload.objects.filter(
+        store=video.store,
+        original_filename=video.title
+    ).order_by('-created_at').first()
 
-        video.status = Video.Status.COMPLETED
-        video.save()
 
-        return f"Video {video_id} fully reprocessed with {len(frames)} frames"
+def video_pipeline_lock(video, upload=None):
+    """Pipeline lock of a video: its upload's, or the video's own for legacy videos without one
 
-    except Exception as exc:
-        video = Video.objects.get(id=video_id)
-        video.status = Video.Status.FAILED
-        video.error_message = str(exc)
-        video.save()
+    Every run that processes or re-analyzes a video's frames takes this
+    lock, so full and frames-only reprocessing of a video exclude each other.
+    """
+    upload = upload or find_upload_for_video(video)
+    if upload:
+        return PipelineLock.for_resource('upload', upload.id)
+    return PipelineLock.for_resource('video', video.id)
 
-        # Clean up temp file on error
+
+def build_video_pipeline(upload_id, video_id=None, lock=None, force_reanalysis=False):
+    """
+    Build the processing chain for an upload:
+    fetch -> probe -> extract -> store -> analyze -> persist.
+
+    Each stage is routed to its own queue (see CELERY_TASK_ROUTES) and passes
+    a small JSON payload to the next one. Passing video_id reprocesses an
+    existing Video instead of creating a new one; passing lock hands the
+    run's pipeline lock to the stages, the last of which releases it.
+    """
+    from inspections.tasks import analyze_frames_stage, persist_results_stage
+
+    payload = {
+        'upload_id': upload_id,
+        'video_id': video_id,
+        'reprocess': video_id is not None,
+        'force_reanalysis': force_reanalysis,
+    }
+    if lock:
+        payload['lock'] = lock.as_payload()
+    return chain(
+        fetch_video_stage.s(payload),
+        probe_video_stage.s(),
+        extract_frames_stage.s(),
+        store_frames_stage.s(),
+        analyze_frames_stage.s(),
+        persist_results_stage.s(),
+    )
+
+
+def _fail_pipeline_stage(task, payload, exc):
+    """Record a stage failure and retry only that stage"""
+    logger.error(f"Video pipeline stage {task.name} failed for upload {payload.get('upload_id')}: {exc}")
+
+    if task.request.retries >= task.max_retries:
+        if payload.get('video_id'):
+            Video.objects.filter(id=payload['video_id']).update(
+                status=Video.Status.FAILED, error_message=str(exc)
+            )
+        if not payload.get('reprocess'):
+            Upload.objects.filter(id=payload['upload_id']).update(
+                status=Upload.Status.FAILED, error_message=str(exc)
+            )
+        _cleanup_temp_files(payload)
+        release_pipeline_lock(payload)
+
+    raise task.retry(exc=exc, countdown=60)
+
+
+def _cleanup_temp_files(payload):
+    """Remove temp video and frame files referenced by a pipeline payload"""
+    paths = [payload.get('video_path')]
+    for frame in payload.get('extracted_frames', []):
+        paths.extend([frame['path'], frame.get('preview_path')])
+
+    for path in paths:
         try:
-            if 'video_path' in locals() and os.path.exists(video_path):
-                os.remove(video_path)
-        except Exception:
+            if path and os.path.exists(path):
+                os.remove(path)
+        except OSError:
             pass
 
-        raise self.retry(exc=exc, countdown=60, max_retries=3)
+
+def _pipeline_video(upload, payload):
+    """Return the Video being processed, reusing one left by an earlier attempt"""
+    if payload.get('video_id'):
+        return Video.objects.get(id=payload['video_id'])
+    return upload.videos.order_by('-created_at').first()
+
+
+def pending_frame_plan(video):
+    """Planned (frame_number, timestamp) pairs that are not stored or skipped yet"""
+    checkpoint = video.processing_checkpoint or {}
+    frame_plan = checkpoint.get('frame_plan')
+    if frame_plan is None:
+        frame_plan = plan_frame_timestamps(video.duration or 0)
+
+    done = set(video.frames.values_list('frame_number', flat=True))
+    done.update(checkpoint.get('frames_skipped', []))
+
+    return [(number, timestamp) for number, timestamp in enumerate(frame_plan) if number not in done]
+
+
+@shared_task(bind=True, max_retries=3)
+def fetch_video_stage(self, payload):
+    """I/O stage: download the source video from S3 to shared temp storage
+
+    Skipped when a previous attempt already stored every planned frame. If
+    the brand already has an analyzed video with the same content, its frames
+    and results are cloned and the remaining stages pass the payload through
+    untouched. Identical content is first recognized from the object's S3
+    metadata, so a duplicate is not downloaded; otherwise the download is
+    hashed as it streams and matched again by hash.
+    """
+    with pipeline_lease(payload):
+        try:
+            upload = Upload.objects.get(id=payload['upload_id'])
+            if not payload.get('reprocess'):
+                upload.status = Upload.Status.PROCESSING
+                upload.save(update_fields=['status', 'updated_at'])
+
+            payload['video_path'] = None
+            video = _pipeline_video(upload, payload)
+            if video:
+                payload['video_id'] = video.id
+                if video.processing_checkpoint.get('probed') and not pending_frame_plan(video):
+                    logger.info(f"Video {video.id} frames already stored, skipping download")
+                    return payload
+
+            deduplicate = (not video and not payload.get('reprocess') and not payload.get('force_reanalysis')
+                           and not upload.inspection_id)
+            if deduplicate:
+                record_s3_object(upload)
+                source = find_duplicate_video(upload)
+                if source:
+                    return _reuse_duplicate_video(upload, source, payload)
+
+            payload['video_path'], content_hash = download_and_hash_from_s3(upload.s3_key)
+            if upload.content_hash != content_hash:
+                upload.content_hash = content_hash
+                upload.save(update_fields=['content_hash', 'updated_at'])
+
+            if deduplicate:
+                source = find_duplicate_video(upload)
+                if source:
+                    os.remove(payload['video_path'])
+                    payload['video_path'] = None
+                    return _reuse_duplicate_video(upload, source, payload)
+
+            return payload
+
+        except Exception as exc:
+            _fail_pipeline_stage(self, payload, exc)
+
+
+def _reuse_duplicate_video(upload, source, payload):
+    """Clone source's analysis for upload and mark the payload as deduplicated"""
+    video = clone_analyzed_video(source, upload)
+    payload['video_id'] = video.id
+    payload['inspection_id'] = video.inspection_id
+    payload['deduplicated_from'] = source.id
+    logger.info(f"Upload {upload.id} matches video {source.id}, reused its analysis")
+    return payload
+
+
+@shared_task(bind=True, max_retries=3)
+def probe_video_stage(self, payload):
+    """CPU stage: run ffprobe, create or update the Video record and its thumbnail"""
+    with pipeline_lease(payload):
+        try:
+            if payload.get('deduplicated_from'):
+                return payload
+
+            upload = Upload.objects.select_related('store').get(id=payload['upload_id'])
+            video_path = payload['video_path']
+
+            if payload.get('video_id'):
+                video = Video.objects.get(id=payload['video_id'])
+                if video.processing_checkpoint.get('probed'):
+                    return payload
+
+                metadata = extract_video_metadata(video_path)
+                video.duration = metadata.get('duration', 0)
+                video.metadata = metadata
+                video.upload = upload
+                video.save()
+            else:
+                metadata = extract_video_metadata(video_path)
+                upload.duration_s = int(float(metadata.get('duration', 0)))
+                upload.metadata = metadata
+                upload.save()
+
+                # Create Video record for compatibility
+                video = Video.objects.create(
+                    upload=upload,
+                    title=upload.original_filename,
+                    description=f"Upload from {upload.store.name}",
+                    store=upload.store,
+                    uploaded_by=upload.created_by,
+                    status=Video.Status.PROCESSING,
+                    duration=upload.duration_s,
+                    metadata=metadata
+                )
+
+                # Set the file field to point to S3 key for signed URL generation
+                video.file.name = upload.s3_key
+                video.save()
+                payload['video_id'] = video.id
+
+            thumbnail_path = generate_thumbnail(video_path, video.id)
+            if thumbnail_path:
+                video.thumbnail = thumbnail_path
+                video.save()
+
+            video.update_checkpoint(probed=True)
+            return payload
+
+        except Exception as exc:
+            _fail_pipeline_stage(self, payload, exc)
+
+
+@shared_task(bind=True, max_retries=3)
+def extract_frames_stage(self, payload):
+    """CPU stage: decode the frames not stored yet with ffmpeg into temp files"""
+    with pipeline_lease(payload):
+        try:
+            if payload.get('deduplicated_from'):
+                return payload
+
+            payload['extracted_frames'] = []
+            if not payload.get('video_path'):
+                return payload
+
+            video = Video.objects.get(id=payload['video_id'])
+            if 'frame_plan' not in video.processing_checkpoint:
+                video.update_checkpoint(frame_plan=plan_video_frames(video, payload['video_path']))
+
+            pending = pending_frame_plan(video)
+            extracted = extract_frames_to_disk(video, payload['video_path'], pending)
+            payload['extracted_frames'] = extracted
+
+            # Frames ffmpeg could not decode will not succeed on retry either
+            extracted_numbers = {frame['frame_number'] for frame in extracted}
+            skipped = [number for number, _ in pending if number not in extracted_numbers]
+            if skipped:
+                video.update_checkpoint(
+                    frames_skipped=sorted(set(video.processing_checkpoint.get('frames_skipped', []) + skipped))
+                )
+
+            # The source video is no longer needed once frames are on disk
+            if os.path.exists(payload['video_path']):
+                os.remove(payload['video_path'])
+            payload['video_path'] = None
+
+            return payload
+
+        except Exception as exc:
+            _fail_pipeline_stage(self, payload, exc)
+
+
+@shared_task(bind=True, max_retries=3)
+def store_frames_stage(self, payload):
+    """I/O stage: upload extracted frames to S3 and link the video to an inspection
+
+    Frames already stored by an earlier attempt are skipped; frames whose temp
+    files are gone (e.g. the retry ran on another host) are re-extracted.
+    """
+    with pipeline_lease(payload):
+        try:
+            if payload.get('deduplicated_from'):
+                return payload
+
+            upload = Upload.objects.get(id=payload['upload_id'])
+            video = Video.objects.get(id=payload['video_id'])
+
+            stored_numbers = set(video.frames.values_list('frame_number', flat=True))
+            to_store = [f for f in payload.get('extracted_frames', []) if f['frame_number'] not in stored_numbers]
+
+            missing = [f for f in to_store if not os.path.exists(f['path'])]
+            if missing:
+                video_path = download_from_s3(upload.s3_key)
+                try:
+                    extract_frames_to_disk(video, video_path, [(f['frame_number'], f['timestamp']) for f in missing])
+                finally:
+                    if os.path.exists(video_path):
+                        os.remove(video_path)
+
+            store_extracted_frames(video, to_store)
+            payload['extracted_frames'] = []
+            payload['frame_count'] = video.frames.filter(is_supplemental=False).count()
+
+            # Join the multi-video inspection the upload was created for, or reuse the inspection
+            # from an interrupted attempt; completed ones are kept as history
+            inspection = video.inspection
+            if upload.inspection_id:
+                inspection = upload.inspection
+                if video.inspection_id != inspection.id:
+                    video.inspection = inspection
+                    video.save(update_fields=['inspection'])
+            elif not inspection or inspection.status == Inspection.Status.COMPLETED:
+                inspection = create_inspection_for_video(video, upload_inspection_mode(upload.mode))
+            payload['inspection_id'] = inspection.id
+
+            return payload
+
+        except Exception as exc:
+            _fail_pipeline_stage(self, payload, exc)
 
 
 def extract_video_metadata(video_path):
@@ -229,6 +499,61 @@ def generate_thumbnail(video_path, video_id):
 
 def download_from_s3(s3_key):
     """Download video file from S3 to temporary location"""
+    return download_and_hash_from_s3(s3_key)[0]
+
+
+def head_s3_object(s3_key):
+    """Fetch an S3 object's metadata without downloading it
+
+    Returns:
+        dict: etag, size and, when S3 stored a full-object SHA-256 checksum,
+        sha256 as a hex digest (empty otherwise)
+    """
+    s3_client = boto3.client(
+        's3',
+        aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+        aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+        region_name=settings.AWS_S3_REGION_NAME
+    )
+    response = s3_client.head_object(
+        Bucket=settings.AWS_STORAGE_BUCKET_NAME, Key=s3_key, ChecksumMode='ENABLED'
+    )
+
+    # Multipart uploads report a checksum of part checksums ("<digest>-<parts>"),
+    # which is not comparable with a hash of the content
+    checksum = response.get('ChecksumSHA256', '')
+    sha256 = base64.b64decode(checksum).hex() if checksum and '-' not in checksum else ''
+    return {
+        'etag': response.get('ETag', '').strip('"'),
+        'size': response.get('ContentLength'),
+        'sha256': sha256,
+    }
+
+
+def record_s3_object(upload):
+    """Save the ETag, size and (if available) content hash of upload's S3 object
+
+    Failures are logged and ignored; the content is then matched by the hash
+    computed while downloading.
+    """
+    try:
+        head = head_s3_object(upload.s3_key)
+    except Exception as e:
+        logger.warning(f"Could not read S3 metadata of upload {upload.id}: {e}")
+        return
+
+    upload.etag = head['etag']
+    upload.file_size = head['size'] or upload.file_size
+    upload.content_hash = head['sha256'] or upload.content_hash
+    upload.save(update_fields=['etag', 'file_size', 'content_hash', 'updated_at'])
+
+
+def download_and_hash_from_s3(s3_key):
+    """Stream a video from S3 to a temporary file, hashing it on the way
+
+    Returns:
+        tuple: (temp file path, SHA-256 hex digest of the content)
+    """
     try:
         s3_client = boto3.client(
             's3',
@@ -246,13 +571,14 @@ def download_from_s3(s3_key):
         temp_path = os.path.join(temp_dir, f"temp_{filename}")
 
         # Download file
-        s3_client.download_file(
-            settings.AWS_STORAGE_BUCKET_NAME,
-            s3_key,
-            temp_path
-        )
+        response = s3_client.get_object(Bucket=settings.AWS_STORAGE_BUCKET_NAME, Key=s3_key)
+        digest = hashlib.sha256()
+        with open(temp_path, 'wb') as f:
+            for chunk in response['Body'].iter_chunks(chunk_size=1024 * 1024):
+                digest.update(chunk)
+                f.write(chunk)
 
-        return temp_path
+        return temp_path, digest.hexdigest()
 
     except Exception as e:
         raise Exception(f"Failed to download from S3: {str(e)}")
@@ -260,34 +586,121 @@ def download_from_s3(s3_key):
 
 def extract_frames_from_s3_video(video, video_path):
     """Extract frames from downloaded S3 video and upload to S3"""
-    try:
-        # Create temp directory for frames
+    frame_plan = list(enumerate(plan_video_frames(video, video_path)))
+    return store_extracted_frames(video, extract_frames_to_disk(video, video_path, frame_plan))
+
+
+def plan_video_frames(video, video_path):
+    """Choose the frame timestamps for a video per FRAME_SAMPLING_STRATEGY
+
+    The frame budget comes from the video's frame policy (see frame_policy).
+    Kept/dropped counts are saved in video.metadata['frame_sampling'], the
+    budget and planned frame count in video.metadata['frame_budget']. Falls
+    back to fixed interval sampling if adaptive candidates cannot be decoded.
+    """
+    duration = video.duration or 0
+    timestamps = stats = None
+
+    mode = video_mode(video)
+    policy = frame_policy(video.store.brand, mode)
+    max_frames, budget_reason = frame_budget(policy, duration, video)
+
+    if settings.FRAME_SAMPLING_STRATEGY == 'adaptive':
         temp_dir = os.path.join(settings.MEDIA_ROOT, 'temp')
         os.makedirs(temp_dir, exist_ok=True)
+        timestamps, stats = plan_adaptive_frame_timestamps(
+            video_path, duration, os.path.join(temp_dir, f"video_{video.id}"),
+            max_frames=max_frames, sampling_fps=policy['sampling_fps'],
+        )
 
-        duration = video.duration or 0
-        if duration <= 0:
-            return []
+    if timestamps is None:
+        timestamps = plan_frame_timestamps(duration, max_frames, policy['sampling_fps'])
+        stats = {
+            'strategy': 'fixed',
+            'candidates': len(timestamps),
+            'kept': len(timestamps),
+            'dropped_near_duplicates': 0,
+            'dropped_over_budget': 0,
+        }
 
-        # Configure frame sampling based on settings
-        max_frames = int(settings.MAX_FRAMES_PER_VIDEO)
-        sampling_fps = float(settings.FRAME_SAMPLING_FPS)
+    video.metadata = {
+        **(video.metadata or {}),
+        'frame_sampling': stats,
+        'frame_budget': {
+            'mode': mode,
+            'policy': policy,
+            'budget_frames': max_frames,
+            'budget_reason': budget_reason,
+            'planned_frames': len(timestamps),
+        },
+    }
+    video.save(update_fields=['metadata', 'updated_at'])
+    logger.info(f"Video {video.id} frame sampling: {stats}, budget {max_frames} ({budget_reason})")
+    return timestamps
+
+
+def plan_frame_timestamps(duration, max_frames=None, sampling_fps=None):
+    """Plan the frame sampling timestamps for a video of the given duration
+
+    Args:
+        max_frames: Frame budget; defaults to MAX_FRAMES_PER_VIDEO
+        sampling_fps: Sampling rate of short videos; defaults to FRAME_SAMPLING_FPS
+    """
+    if duration <= 0:
+        return []
+
+    # Configure frame sampling based on settings
+    max_frames = int(max_frames or settings.MAX_FRAMES_PER_VIDEO)
+    sampling_fps = float(sampling_fps or settings.FRAME_SAMPLING_FPS)
+
+    # Calculate frame timestamps
+    if duration <= max_frames / sampling_fps:
+        # Short video: sample at specified FPS
+        interval = 1.0 / sampling_fps
+    else:
+        # Long video: distribute frames evenly
+        interval = duration / max_frames
+
+    timestamps = []
+    timestamp = 0
+    while timestamp < duration and len(timestamps) < max_frames:
+        timestamps.append(timestamp)
+        timestamp += interval
+
+    return timestamps
 
-        frames = []
-        frame_count = 0
 
-        # Calculate frame timestamps
-        if duration <= max_frames / sampling_fps:
-            # Short video: sample at specified FPS
-            interval = 1.0 / sampling_fps
-        else:
-            # Long video: distribute frames evenly
-            interval = duration / max_frames
+def extract_frames_to_disk(video, video_path, frame_plan=None):
+    """Extract sampled frames from a local video into temp files
 
-        timestamp = 0
-        while timestamp < duration and frame_count < max_frames:
-            frame_filename = f"video_{video.id}_frame_{frame_count}.jpg"
+    Args:
+        video: Video being processed
+        video_path: Local path of the source video
+        frame_plan: Optional list of (frame_number, timestamp) pairs to extract;
+            defaults to the full sampling plan for the video's duration
+
+    Frames are re-encoded to the configured frame profile (FRAME_MAX_DIMENSION,
+    FRAME_JPEG_QUALITY) and get a preview rendition next to them.
+
+    Returns:
+        list: One dict per frame with path, preview_path, timestamp,
+            frame_number, width, height, sharpness and brightness
+    """
+    try:
+        # Create temp directory for frames
+        temp_dir = os.path.join(settings.MEDIA_ROOT, 'temp')
+        os.makedirs(temp_dir, exist_ok=True)
+
+        if frame_plan is None:
+            frame_plan = list(enumerate(plan_frame_timestamps(video.duration or 0)))
+
+        extracted = []
+        for frame_number, timestamp in frame_plan:
+            frame_filename = f"video_{video.id}_frame_{frame_number}.jpg"
             temp_frame_path = os.path.join(temp_dir, frame_filename)
+            preview_path = os.path.join(
+                temp_dir, f"video_{video.id}_frame_{frame_number}_preview.{preview_extension()}"
+            )
 
             cmd = [
                 'ffmpeg', '-i', video_path, '-ss', str(timestamp),
@@ -296,177 +709,255 @@ def extract_frames_from_s3_video(video, video_path):
 
             result = subprocess.run(cmd, capture_output=True)
             if result.returncode == 0 and os.path.exists(temp_frame_path):
-                # Get image dimensions
+                # Score quality, then re-encode to the frame profile
                 with Image.open(temp_frame_path) as img:
-                    width, height = img.size
-
-                # Read frame data
-                with open(temp_frame_path, 'rb') as f:
-                    frame_data = f.read()
-
-                # Upload to S3 using Django's storage backend
-                s3_path = f"frames/{frame_filename}"
-                saved_path = default_storage.save(s3_path, ContentFile(frame_data))
-
-                # Create VideoFrame record with S3 path
-                frame = VideoFrame.objects.create(
-                    video=video,
-                    timestamp=timestamp,
-                    frame_number=frame_count,
-                    image=saved_path,
-                    width=width,
-                    height=height
-                )
-                frames.append(frame)
-                frame_count += 1
-
-                # Clean up temp file
-                os.remove(temp_frame_path)
-
-            timestamp += interval
-
-        return frames
+                    img.load()
+                quality = frame_quality(img)
+                width, height = encode_frame_renditions(img, temp_frame_path, preview_path)
+
+                extracted.append({
+                    'path': temp_frame_path,
+                    'preview_path': preview_path,
+                    'timestamp': timestamp,
+                    'frame_number': frame_number,
+                    'width': width,
+                    'height': height,
+                    **quality,
+                })
+
+        return extracted
 
     except Exception as e:
         logger.error(f"Error extracting frames: {e}")
         return []
 
 
-def apply_inspection_rules(video, frames):
-    """Apply inspection mode rules with compliance checks"""
-    try:
-        from inspections.models import Inspection
-        from inspections.tasks import analyze_video
+def store_extracted_frames(video, extracted_frames, supplemental=False):
+    """Upload extracted frame files to S3 and create VideoFrame records
 
-        # Create inspection record with metadata from video
-        inspection = Inspection.objects.create(
-            title=video.title,
-            created_by=video.uploaded_by,
-            store=video.store,
-            mode=Inspection.Mode.ENTERPRISE,
-            status=Inspection.Status.PENDING
+    The stored frame count is checkpointed after every frame so an interrupted
+    upload resumes at the first frame that is not in S3 yet. Supplemental
+    frames of a range analysis are not part of the checkpoint.
+    """
+    frames = []
+
+    for extracted in extracted_frames:
+        temp_frame_path = extracted['path']
+        if not os.path.exists(temp_frame_path):
+            continue
+
+        # Read frame data
+        with open(temp_frame_path, 'rb') as f:
+            frame_data = f.read()
+
+        # Upload to S3 using Django's storage backend
+        s3_path = f"frames/{os.path.basename(temp_frame_path)}"
+        saved_path = default_storage.save(s3_path, ContentFile(frame_data))
+
+        preview_path = extracted.get('preview_path')
+        saved_preview_path = ''
+        if preview_path and os.path.exists(preview_path):
+            with open(preview_path, 'rb') as f:
+                saved_preview_path = default_storage.save(
+                    f"frames/previews/{os.path.basename(preview_path)}", ContentFile(f.read())
+                )
+            os.remove(preview_path)
+
+        # Create VideoFrame record with S3 path
+        frame = VideoFrame.objects.create(
+            video=video,
+            timestamp=extracted['timestamp'],
+            frame_number=extracted['frame_number'],
+            image=saved_path,
+            preview=saved_preview_path,
+            width=extracted['width'],
+            height=extracted['height'],
+            sharpness=extracted.get('sharpness'),
+            brightness=extracted.get('brightness'),
+            is_supplemental=supplemental,
         )
+        frames.append(frame)
+        if not supplemental:
+            video.update_checkpoint(frames_stored=video.frames.filter(is_supplemental=False).count())
 
-        # Link video to inspection
-        video.inspection = inspection
-        video.save(update_fields=['inspection'])
+        # Clean up temp file
+        os.remove(temp_frame_path)
 
-        analyze_video.delay(inspection.id)
+    return frames
 
-        return inspection
 
-    except Exception as e:
-        logger.error(f"Error applying inspection rules: {e}")
+def find_duplicate_video(upload):
+    """Latest analyzed video of the same brand whose upload has identical content
+
+    Content matches on the SHA-256 hash, or on the S3 ETag together with the
+    file size. Only videos that are the single video of their inspection
+    qualify, as the results of a multi-video inspection cover its other
+    videos too.
+    """
+    matches = Q()
+    if upload.content_hash:
+        matches |= Q(upload__content_hash=upload.content_hash)
+    if upload.etag and upload.file_size:
+        matches |= Q(upload__etag=upload.etag, upload__file_size=upload.file_size)
+    if not matches:
         return None
 
+    return Video.objects.filter(
+        matches,
+        upload__store__brand_id=upload.store.brand_id,
+        status=Video.Status.COMPLETED,
+        inspection__status=Inspection.Status.COMPLETED,
+    ).exclude(upload=upload).annotate(
+        inspection_videos=Count('inspection__videos')
+    ).filter(inspection_videos=1).select_related('inspection').order_by('-created_at').first()
 
-def apply_coaching_rules(video, frames):
-    """Apply coaching mode rules with improvement suggestions"""
-    try:
-        from inspections.models import Inspection
-        from inspections.tasks import analyze_video
-        from django.utils import timezone
-        from datetime import timedelta
-        from django.conf import settings
-
-        # Create inspection record with metadata from video
-        inspection = Inspection.objects.create(
-            title=video.title,
-            created_by=video.uploaded_by,
-            store=video.store,
-            mode=Inspection.Mode.COACHING,
-            status=Inspection.Status.PENDING
+
+@transaction.atomic
+def clone_analyzed_video(source, upload):
+    """Create a completed Video and inspection for upload from an identical analyzed video
+
+    Frames point at the source's stored images instead of copying them, and
+    the AI results and stored detections are copied so no extraction or
+    analysis calls are made.
+    """
+    from inspections.tasks import clone_inspection_results
+    from uploads.scorecards import build_scorecard
+
+    source_upload = source.upload
+    upload.duration_s = source_upload.duration_s
+    upload.metadata = source_upload.metadata
+    upload.status = Upload.Status.COMPLETE
+    upload.save()
+
+    video = Video.objects.create(
+        upload=upload,
+        title=upload.original_filename,
+        description=f"Upload from {upload.store.name}",
+        store=upload.store,
+        uploaded_by=upload.created_by,
+        status=Video.Status.COMPLETED,
+        duration=source.duration,
+        metadata={**source.metadata, 'deduplicated_from_video': source.id},
+    )
+    video.file.name = upload.s3_key
+    video.thumbnail.name = source.thumbnail.name
+    video.save()
+
+    source_frames = list(source.frames.all())
+    frames = VideoFrame.objects.bulk_create([
+        VideoFrame(
+            video=video,
+            timestamp=frame.timestamp,
+            frame_number=frame.frame_number,
+            image=frame.image.name,
+            preview=frame.preview.name,
+            width=frame.width,
+            height=frame.height,
+            ai_analysis=frame.ai_analysis,
+            sharpness=frame.sharpness,
+            brightness=frame.brightness,
+            is_supplemental=frame.is_supplemental,
         )
+        for frame in source_frames
+    ])
+    frame_map = {old.id: new for old, new in zip(source_frames, frames)}
+
+    inspection = create_inspection_for_video(video, upload_inspection_mode(upload.mode))
+    clone_inspection_results(source.inspection, inspection, frame_map)
+    build_scorecard(inspection, upload.id)
+
+    Detection.objects.bulk_create([
+        Detection(
+            upload=upload,
+            type=detection.type,
+            label=detection.label,
+            confidence=detection.confidence,
+            frame_ts_ms=detection.frame_ts_ms,
+            bbox_json=detection.bbox_json,
+        )
+        for detection in source_upload.detections.all()
+    ], batch_size=settings.DETECTION_BULK_BATCH_SIZE)
+
+    video.update_checkpoint(**{
+        **source.processing_checkpoint,
+        'analysis': {'inspection_id': inspection.id, 'frames_analyzed': len(frames)},
+    })
+    return video
 
+
+def upload_inspection_mode(upload_mode):
+    """Inspection mode matching an upload mode"""
+    return Inspection.Mode.ENTERPRISE if upload_mode == Upload.Mode.ENTERPRISE else Inspection.Mode.COACHING
+
+
+def create_pending_inspection(title, created_by, store, mode):
+    """Create a pending inspection, with its retention period in coaching mode"""
+    from django.utils import timezone
+    from datetime import timedelta
+
+    inspection = Inspection.objects.create(
+        title=title,
+        created_by=created_by,
+        store=store,
+        mode=mode,
+        status=Inspection.Status.PENDING
+    )
+
+    if mode == Inspection.Mode.COACHING:
         retention_days = getattr(settings, 'COACHING_MODE_RETENTION_DAYS', 7)
         inspection.expires_at = timezone.now() + timedelta(days=retention_days)
         inspection.save()
 
-        # Link video to inspection
-        video.inspection = inspection
-        video.save(update_fields=['inspection'])
+    return inspection
+
+
+def create_inspection_for_video(video, mode):
+    """Create a pending inspection for a video and link the two"""
+    # Create inspection record with metadata from video
+    inspection = create_pending_inspection(video.title, video.uploaded_by, video.store, mode)
+
+    # Link video to inspection
+    video.inspection = inspection
+    video.save(update_fields=['inspection'])
+
+    return inspection
 
-        analyze_video.delay(inspection.id)
+
+def apply_inspection_rules(video, frames, lock=None):
+    """Apply inspection mode rules with compliance checks"""
+    try:
+        from inspections.tasks import analyze_video
+
+        inspection = create_inspection_for_video(video, Inspection.Mode.ENTERPRISE)
+        analyze_video.delay(inspection.id, **analysis_lock_kwargs(lock))
 
         return inspection
 
     except Exception as e:
-        logger.error(f"Error applying coaching rules: {e}")
+        logger.error(f"Error applying inspection rules: {e}")
         return None
 
 
-def apply_rule_to_frames(rule, frames, coaching_mode=False):
-    """Apply a specific rule to video frames using AI analysis"""
-    violations = []
-
+def apply_coaching_rules(video, frames, lock=None):
+    """Apply coaching mode rules with improvement suggestions"""
     try:
-        from ai_services.analyzer import VideoAnalyzer
-        analyzer = VideoAnalyzer()
-
-        rule_config = rule.config_json
-        rule_type = rule_config.get('type', 'unknown')
-
-        for frame in frames:
-            try:
-                # Get frame path and read as bytes for analysis
-                frame_path = frame.image.path if frame.image else None
-                frame_bytes = None
-
-                if frame_path and os.path.exists(frame_path):
-                    with open(frame_path, 'rb') as f:
-                        frame_bytes = f.read()
-
-                    frame_analysis = analyzer.analyze_frame(frame_path, frame_bytes)
-
-                    # Generate findings from analysis
-                    findings = analyzer.generate_findings(frame_analysis, frame)
-
-                    for finding in findings:
-                        if rule_type == 'ppe_detection' and finding.get('category') == 'PPE':
-                            violations.append({
-                                'rule': rule,
-                                'frame': frame,
-                                'confidence': finding.get('confidence', 0.0),
-                                'severity': 'medium' if coaching_mode else finding.get('severity', 'high').lower(),
-                                'description': finding.get('description',
-                                                           f"PPE issue detected in frame {frame.frame_number}"),
-                                'bounding_box': finding.get('bounding_box'),
-                                'recommended_action': finding.get('recommended_action', '')
-                            })
-                        
-                        elif rule_type == 'safety_check' and finding.get('category') == 'SAFETY':
-                            violations.append({
-                                'rule': rule,
-                                'frame': frame,
-                                'confidence': finding.get('confidence', 0.0),
-                                'severity': finding.get('severity', 'high').lower(),
-                                'description': finding.get('description',
-                                                           f"Safety violation detected in frame {frame.frame_number}"),
-                                'bounding_box': finding.get('bounding_box'),
-                                'recommended_action': finding.get('recommended_action', '')
-                            })
-                        
-                        elif rule_type == 'cleanliness_check' and finding.get('category') == 'CLEANLINESS':
-                            violations.append({
-                                'rule': rule,
-                                'frame': frame,
-                                'confidence': finding.get('confidence', 0.0),
-                                'severity': 'medium' if coaching_mode else finding.get('severity', 'medium').lower(),
-                                'description': finding.get('description',
-                                                           f"Cleanliness issue detected in frame {frame.frame_number}"),
-                                'bounding_box': finding.get('bounding_box'),
-                                'recommended_action': finding.get('recommended_action', '')
-                            })
-                
-            except Exception as frame_error:
-                logger.error(f"Error analyzing frame {frame.frame_number}: {frame_error}")
-                continue
-
-        return violations
+        from inspections.tasks import analyze_video
+
+        inspection = create_inspection_for_video(video, Inspection.Mode.COACHING)
+        analyze_video.delay(inspection.id, **analysis_lock_kwargs(lock))
+
+        return inspection
 
     except Exception as e:
-        logger.error(f"Error applying rule {rule.code}: {e}")
-        return []
+        logger.error(f"Error applying coaching rules: {e}")
+        return None
+
+
+def analysis_lock_kwargs(lock):
+    """analyze_video arguments handing over a lock acquired by the caller"""
+    if lock is None:
+        return {}
+    return {'lock_key': lock.key, 'lock_token': lock.token}
 
 
 def generate_coaching_suggestions(rule, detection_data):
@@ -1,12 +1,18 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model
 from django.core.files.uploadedfile import SimpleUploadedFile
 from rest_framework.test import APIClient
 from rest_framework import status
 from unittest.mock import patch, MagicMock, mock_open
+from django.conf import settings
 from brands.models import Brand, Store
+from inspections.models import Inspection
+from uploads.models import Upload
 from .models import Video, VideoFrame
-from .tasks import extract_video_metadata, generate_thumbnail
+from .tasks import (
+    extract_video_metadata, generate_thumbnail, build_video_pipeline, store_frames_stage,
+    fetch_video_stage, pending_frame_plan
+)
 
 User = get_user_model()
 
@@ -215,4 +221,565 @@ class VideoAPITest(TestCase):
         
         response = self.client.post('/api/videos/', data, format='multipart')
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
-        self.assertIn('title', str(response.data))
\ No newline at end of file
+        self.assertIn('title', str(response.data))
+
+
+class VideoPipelineTest(TestCase):
+    def setUp(self):
+        self.brand = Brand.objects.create(name="Test Brand")
+        self.store = Store.objects.create(
+            brand=self.brand,
+            name="Test Store",
+            code="TS001",
+            address="123 Test St",
+            city="Test City",
+            state="TS",
+            zip_code="12345"
+        )
+        self.user = User.objects.create_user(
+            username="testuser",
+            store=self.store
+        )
+        self.upload = Upload.objects.create(
+            store=self.store,
+            mode=Upload.Mode.COACHING,
+            s3_key="uploads/coaching/test.mp4",
+            original_filename="test.mp4",
+            created_by=self.user
+        )
+
+    def test_pipeline_stages_in_order_on_separate_queues(self):
+        pipeline = build_video_pipeline(self.upload.id)
+        task_names = [sig.task for sig in pipeline.tasks]
+
+        self.assertEqual(task_names, [
+            'videos.tasks.fetch_video_stage',
+            'videos.tasks.probe_video_stage',
+            'videos.tasks.extract_frames_stage',
+            'videos.tasks.store_frames_stage',
+            'inspections.tasks.analyze_frames_stage',
+            'inspections.tasks.persist_results_stage',
+        ])
+        self.assertEqual(pipeline.tasks[0].args[0]['upload_id'], self.upload.id)
+
+        queues = [settings.CELERY_TASK_ROUTES[name]['queue'] for name in task_names]
+        self.assertEqual(len(set(queues)), len(task_names))
+
+    @patch('videos.tasks.build_video_pipeline')
+    def test_process_video_upload_is_thin_wrapper(self, mock_build):
+        from .tasks import process_video_upload
+
+        process_video_upload(self.upload.id)
+
+        mock_build.assert_called_once()
+        self.assertEqual(mock_build.call_args.args, (self.upload.id,))
+        mock_build.return_value.apply_async.assert_called_once()
+
+    @patch('videos.tasks.os.remove')
+    @patch('videos.tasks.os.path.exists', return_value=True)
+    @patch('videos.tasks.default_storage.save')
+    @patch('builtins.open', new_callable=mock_open, read_data=b'fake_frame_data')
+    def test_store_frames_stage_creates_frames_and_inspection(self, mock_file, mock_save,
+                                                              mock_exists, mock_remove):
+        mock_save.side_effect = lambda path, content: path
+        video = Video.objects.create(
+            uploaded_by=self.user,
+            store=self.store,
+            title="test.mp4",
+            file="uploads/coaching/test.mp4"
+        )
+        payload = {
+            'upload_id': self.upload.id,
+            'video_id': video.id,
+            'reprocess': False,
+            'extracted_frames': [
+                {'path': f'/tmp/video_{video.id}_frame_{i}.jpg', 'timestamp': i * 0.4,
+                 'frame_number': i, 'width': 640, 'height': 360}
+                for i in range(3)
+            ],
+        }
+
+        result = store_frames_stage(payload)
+
+        self.assertEqual(result['frame_count'], 3)
+        self.assertEqual(result['extracted_frames'], [])
+        self.assertEqual(video.frames.count(), 3)
+        inspection = Inspection.objects.get(id=result['inspection_id'])
+        self.assertEqual(inspection.mode, Inspection.Mode.COACHING)
+        self.assertIsNotNone(inspection.expires_at)
+        self.assertEqual(inspection.video, video)
+
+    def _create_checkpointed_video(self, stored_frames, frame_plan):
+        video = Video.objects.create(
+            upload=self.upload,
+            uploaded_by=self.user,
+            store=self.store,
+            title="test.mp4",
+            file="uploads/coaching/test.mp4",
+            duration=len(frame_plan),
+            processing_checkpoint={'probed': True, 'frame_plan': frame_plan}
+        )
+        for number in stored_frames:
+            VideoFrame.objects.create(
+                video=video, frame_number=number, timestamp=frame_plan[number],
+                image=f"frames/video_{video.id}_frame_{number}.jpg", width=640, height=360
+            )
+        return video
+
+    def test_pending_frame_plan_excludes_stored_and_skipped_frames(self):
+        video = self._create_checkpointed_video([0, 1], [0.0, 1.0, 2.0, 3.0])
+        video.update_checkpoint(frames_skipped=[3])
+
+        self.assertEqual(pending_frame_plan(video), [(2, 2.0)])
+
+    @patch('videos.tasks.download_and_hash_from_s3')
+    def test_fetch_stage_skips_download_when_frames_stored(self, mock_download):
+        video = self._create_checkpointed_video([0, 1, 2], [0.0, 1.0, 2.0])
+
+        result = fetch_video_stage({'upload_id': self.upload.id, 'video_id': None, 'reprocess': False})
+
+        mock_download.assert_not_called()
+        self.assertEqual(result['video_id'], video.id)
+        self.assertIsNone(result['video_path'])
+
+    @patch('videos.tasks.download_and_hash_from_s3', return_value=('/tmp/test.mp4', 'a' * 64))
+    def test_fetch_stage_resumes_existing_video_with_pending_frames(self, mock_download):
+        video = self._create_checkpointed_video([0], [0.0, 1.0])
+
+        result = fetch_video_stage({'upload_id': self.upload.id, 'video_id': None, 'reprocess': False})
+
+        mock_download.assert_called_once_with(self.upload.s3_key)
+        self.assertEqual(result['video_id'], video.id)
+        self.assertEqual(Video.objects.filter(upload=self.upload).count(), 1)
+
+    @patch('videos.tasks.os.remove')
+    @patch('videos.tasks.os.path.exists', return_value=True)
+    @patch('videos.tasks.default_storage.save')
+    @patch('builtins.open', new_callable=mock_open, read_data=b'fake_frame_data')
+    def test_store_frames_stage_resumes_interrupted_attempt(self, mock_file, mock_save,
+                                                            mock_exists, mock_remove):
+        mock_save.side_effect = lambda path, content: path
+        video = self._create_checkpointed_video([0], [0.0, 1.0])
+        failed_inspection = Inspection.objects.create(
+            title=video.title, store=self.store, mode=Inspection.Mode.COACHING,
+            status=Inspection.Status.FAILED
+        )
+        video.inspection = failed_inspection
+        video.save()
+        payload = {
+            'upload_id': self.upload.id,
+            'video_id': video.id,
+            'reprocess': False,
+            'extracted_frames': [
+                {'path': f'/tmp/video_{video.id}_frame_{i}.jpg', 'timestamp': float(i),
+                 'frame_number': i, 'width': 640, 'height': 360}
+                for i in range(2)
+            ],
+        }
+
+        result = store_frames_stage(payload)
+
+        mock_save.assert_called_once()
+        self.assertEqual(result['frame_count'], 2)
+        self.assertEqual(result['inspection_id'], failed_inspection.id)
+        video.refresh_from_db()
+        self.assertEqual(video.processing_checkpoint['frames_stored'], 2)
+
+    def _create_analyzed_upload(self, store, content_hash, etag=''):
+        from inspections.models import Finding
+
+        upload = Upload.objects.create(
+            store=store, mode=Upload.Mode.COACHING, s3_key="uploads/coaching/original.mp4",
+            original_filename="original.mp4", created_by=self.user,
+            status=Upload.Status.COMPLETE, content_hash=content_hash, etag=etag,
+            file_size=1000, duration_s=2
+        )
+        inspection = Inspection.objects.create(
+            title="original.mp4", store=store, mode=Inspection.Mode.COACHING,
+            status=Inspection.Status.COMPLETED, overall_score=72.5, ppe_score=60.0,
+            ai_analysis={'frame_analyses': [{'overall_score': 72.5}]}
+        )
+        video = Video.objects.create(
+            upload=upload, inspection=inspection, uploaded_by=self.user, store=store,
+            title="original.mp4", status=Video.Status.COMPLETED, duration=2.0,
+            processing_checkpoint={'probed': True, 'frame_plan': [0.0, 1.0]}
+        )
+        video.thumbnail.name = "thumbnails/original.jpg"
+        video.save()
+        frame = VideoFrame.objects.create(
+            video=video, frame_number=0, timestamp=0.0, image="frames/original_0.jpg",
+            width=640, height=360, ai_analysis={'overall_score': 72.5}
+        )
+        Finding.objects.create(
+            inspection=inspection, frame=frame, category='PPE', severity='HIGH',
+            title="Missing gloves", description="No gloves", confidence=0.9,
+            is_rejected=True, rejection_reason="reviewed"
+        )
+        return video
+
+    @patch('videos.tasks.os.remove')
+    @patch('videos.tasks.download_and_hash_from_s3', return_value=('/tmp/test.mp4', 'b' * 64))
+    @patch('videos.tasks.head_s3_object', return_value={'etag': 'e2', 'size': 1000, 'sha256': ''})
+    def test_fetch_stage_clones_identical_analyzed_video(self, mock_head, mock_download, mock_remove):
+        source = self._create_analyzed_upload(self.store, 'b' * 64, etag='e1')
+
+        result = fetch_video_stage({'upload_id': self.upload.id, 'video_id': None, 'reprocess': False})
+
+        mock_download.assert_called_once_with(self.upload.s3_key)
+        mock_remove.assert_called_once_with('/tmp/test.mp4')
+        self.assertEqual(result['deduplicated_from'], source.id)
+        self.assertIsNone(result['video_path'])
+        self.upload.refresh_from_db()
+        self.assertEqual(self.upload.content_hash, 'b' * 64)
+        self.assertEqual(self.upload.status, Upload.Status.COMPLETE)
+
+        video = Video.objects.get(id=result['video_id'])
+        self.assertEqual(video.upload, self.upload)
+        self.assertEqual(video.status, Video.Status.COMPLETED)
+        frame = video.frames.get()
+        self.assertEqual(frame.image.name, "frames/original_0.jpg")
+        self.assertEqual(frame.ai_analysis, {'overall_score': 72.5})
+
+        inspection = video.inspection
+        self.assertEqual(inspection.id, result['inspection_id'])
+        self.assertEqual(inspection.status, Inspection.Status.COMPLETED)
+        self.assertEqual(inspection.overall_score, 72.5)
+        finding = inspection.findings.get()
+        self.assertEqual(finding.frame, frame)
+        self.assertFalse(finding.is_rejected)
+
+        # Later stages pass the cloned result through
+        self.assertEqual(store_frames_stage(result), result)
+
+    @patch('videos.tasks.download_and_hash_from_s3')
+    @patch('videos.tasks.head_s3_object', return_value={'etag': 'e1', 'size': 1000, 'sha256': 'b' * 64})
+    def test_fetch_stage_clones_from_s3_metadata_without_download(self, mock_head, mock_download):
+        source = self._create_analyzed_upload(self.store, '', etag='e1')
+
+        result = fetch_video_stage({'upload_id': self.upload.id, 'video_id': None, 'reprocess': False})
+
+        mock_download.assert_not_called()
+        self.assertEqual(result['deduplicated_from'], source.id)
+        self.assertIsNone(result['video_path'])
+        self.upload.refresh_from_db()
+        self.assertEqual((self.upload.etag, self.upload.file_size), ('e1', 1000))
+        self.assertEqual(self.upload.content_hash, 'b' * 64)
+
+    @patch('videos.tasks.default_storage.delete')
+    @patch('videos.tasks.head_s3_object', return_value={'etag': 'e1', 'size': 1000, 'sha256': ''})
+    def test_cleanup_keeps_media_shared_with_clone(self, mock_head, mock_delete):
+        from datetime import timedelta
+        from django.utils import timezone
+        from inspections.tasks import cleanup_expired_inspections
+
+        source = self._create_analyzed_upload(self.store, '', etag='e1')
+        result = fetch_video_stage({'upload_id': self.upload.id, 'video_id': None, 'reprocess': False})
+        expired = timezone.now() - timedelta(days=1)
+
+        Inspection.objects.filter(id=source.inspection_id).update(expires_at=expired)
+        cleanup_expired_inspections()
+
+        self.assertFalse(Inspection.objects.filter(id=source.inspection_id).exists())
+        mock_delete.assert_not_called()
+
+        Inspection.objects.filter(id=result['inspection_id']).update(expires_at=expired)
+        cleanup_expired_inspections()
+
+        deleted = {call.args[0] for call in mock_delete.call_args_list}
+        self.assertEqual(deleted, {"frames/original_0.jpg", "thumbnails/original.jpg", self.upload.s3_key})
+
+    @patch('videos.tasks.download_and_hash_from_s3', return_value=('/tmp/test.mp4', 'b' * 64))
+    @patch('videos.tasks.head_s3_object', return_value={'etag': 'e2', 'size': 1000, 'sha256': ''})
+    def test_fetch_stage_reprocesses_when_forced_or_other_brand(self, mock_head, mock_download):
+        other_brand = Brand.objects.create(name="Other Brand")
+        other_store = Store.objects.create(
+            brand=other_brand, name="Other Store", code="OS001", address="1 Other St",
+            city="Test City", state="TS", zip_code="12345"
+        )
+        self._create_analyzed_upload(other_store, 'b' * 64)
+
+        result = fetch_video_stage({'upload_id': self.upload.id, 'video_id': None, 'reprocess': False})
+        self.assertNotIn('deduplicated_from', result)
+
+        self._create_analyzed_upload(self.store, 'b' * 64)
+        result = fetch_video_stage({
+            'upload_id': self.upload.id, 'video_id': None, 'reprocess': False, 'force_reanalysis': True
+        })
+        self.assertNotIn('deduplicated_from', result)
+        self.assertEqual(result['video_path'], '/tmp/test.mp4')
+        self.assertFalse(self.upload.videos.exists())
+
+
+class AdaptiveSamplingTest(TestCase):
+    def _frame(self, timestamp, shade, split=None):
+        from PIL import Image, ImageDraw
+        from .sampling import describe_frame
+
+        image = Image.new('RGB', (64, 48), (shade, shade, shade))
+        if split is not None:
+            ImageDraw.Draw(image).rectangle([split, 0, 63, 47], fill=(255 - shade, 0, 0))
+        return describe_frame(image, timestamp)
+
+    def test_static_shot_drops_near_duplicates(self):
+        from .sampling import select_frames
+
+        candidates = [self._frame(t * 0.5, 100, split=32) for t in range(10)]
+
+        kept, stats = select_frames(candidates, max_frames=20, min_hash_distance=6, scene_cut_threshold=0.3)
+
+        self.assertEqual([c['timestamp'] for c in kept], [0.0])
+        self.assertEqual(stats['dropped_near_duplicates'], 9)
+
+    def test_budget_goes_to_largest_changes(self):
+        from .sampling import select_frames
+
+        candidates = [self._frame(float(t), 30 * t, split=6 * t + 4) for t in range(8)]
+
+        kept, stats = select_frames(candidates, max_frames=3, min_hash_distance=0, scene_cut_threshold=0.3)
+
+        self.assertEqual(len(kept), 3)
+        self.assertEqual(kept[0]['timestamp'], 0.0)
+        self.assertEqual([c['timestamp'] for c in kept], sorted(c['timestamp'] for c in kept))
+        self.assertEqual(stats['dropped_over_budget'], 5)
+
+    @override_settings(FRAME_SAMPLING_STRATEGY='adaptive', MAX_FRAMES_PER_VIDEO=20, FRAME_SAMPLING_FPS=2.5)
+    @patch('videos.tasks.plan_adaptive_frame_timestamps', return_value=(None, None))
+    def test_plan_falls_back_to_fixed_sampling(self, mock_adaptive):
+        from .tasks import plan_video_frames
+
+        brand = Brand.objects.create(name="Test Brand")
+        store = Store.objects.create(
+            brand=brand, name="Test Store", code="TS001", address="123 Test St",
+            city="Test City", state="TS", zip_code="12345"
+        )
+        user = User.objects.create_user(username="testuser", store=store)
+        video = Video.objects.create(uploaded_by=user, store=store, title="test.mp4", duration=2.0)
+
+        timestamps = plan_video_frames(video, '/tmp/test.mp4')
+
+        self.assertEqual(len(timestamps), 5)
+        video.refresh_from_db()
+        self.assertEqual(video.metadata['frame_sampling']['strategy'], 'fixed')
+        self.assertEqual(video.metadata['frame_sampling']['kept'], 5)
+        self.assertEqual(video.metadata['frame_budget']['planned_frames'], 5)
+        self.assertEqual(video.metadata['frame_budget']['budget_reason'], 'max_frames')
+
+    @override_settings(FRAME_SAMPLING_STRATEGY='fixed', FRAME_SAMPLING_FPS=2.5, MAX_FRAMES_PER_VIDEO=20,
+                       FRAME_POLICY_DEFAULTS={'enterprise': {'frames_per_minute': 6}, 'coaching': {}})
+    def test_plan_applies_brand_frame_policy(self):
+        from .tasks import plan_video_frames
+
+        brand = Brand.objects.create(name="Test Brand", inspection_config={
+            'frame_policy': {'enterprise': {'daily_frame_cap': 15, 'min_frames': 2}},
+        })
+        store = Store.objects.create(
+            brand=brand, name="Test Store", code="TS001", address="123 Test St",
+            city="Test City", state="TS", zip_code="12345"
+        )
+        user = User.objects.create_user(username="testuser", store=store)
+        video = Video.objects.create(uploaded_by=user, store=store, title="test.mp4", duration=120.0)
+
+        # Duration budget: 6 frames per minute of a 2 minute video
+        self.assertEqual(len(plan_video_frames(video, '/tmp/test.mp4')), 12)
+
+        # Daily cap: 15 frames a day, 14 taken by another video today, but never below min_frames
+        other = Video.objects.create(uploaded_by=user, store=store, title="other.mp4", duration=10.0)
+        for number in range(14):
+            VideoFrame.objects.create(video=other, frame_number=number, timestamp=float(number), width=640, height=360)
+        self.assertEqual(len(plan_video_frames(video, '/tmp/test.mp4')), 2)
+
+        video.refresh_from_db()
+        budget = video.metadata['frame_budget']
+        self.assertEqual(budget['budget_reason'], 'daily_cap')
+        self.assertEqual(budget['planned_frames'], 2)
+        self.assertEqual(budget['policy']['frames_per_minute'], 6)
+
+
+@override_settings(FRAME_MIN_SHARPNESS=40.0, FRAME_MIN_BRIGHTNESS=35.0, FRAME_MAX_BRIGHTNESS=225.0)
+class FrameQualityGateTest(TestCase):
+    def _checkerboard(self, shade=255):
+        from PIL import Image, ImageDraw
+
+        image = Image.new('L', (320, 240), 0)
+        draw = ImageDraw.Draw(image)
+        for x in range(0, 320, 8):
+            for y in range(0, 240, 8):
+                if (x + y) // 8 % 2:
+                    draw.rectangle([x, y, x + 7, y + 7], fill=shade)
+        return image
+
+    def test_blurred_and_dark_frames_fail_the_gate(self):
+        from PIL import ImageFilter
+        from .sampling import frame_quality, is_usable_quality
+
+        sharp = frame_quality(self._checkerboard())
+        blurred = frame_quality(self._checkerboard().filter(ImageFilter.GaussianBlur(6)))
+        dark = frame_quality(self._checkerboard(shade=30))
+
+        self.assertTrue(is_usable_quality(**sharp))
+        self.assertGreater(sharp['sharpness'], blurred['sharpness'])
+        self.assertFalse(is_usable_quality(**blurred))
+        self.assertFalse(is_usable_quality(**dark))
+        self.assertTrue(is_usable_quality(None, None))
+
+    def test_best_frame_per_window_skips_unusable_windows(self):
+        from .sampling import best_frame_per_window
+
+        candidates = [
+            {'timestamp': 0.0, 'sharpness': 60.0, 'brightness': 120.0},
+            {'timestamp': 0.1, 'sharpness': 300.0, 'brightness': 120.0},
+            {'timestamp': 0.2, 'sharpness': 500.0, 'brightness': 10.0},
+            {'timestamp': 0.3, 'sharpness': 5.0, 'brightness': 120.0},
+        ]
+
+        chosen, skipped = best_frame_per_window(candidates, window_size=2)
+
+        self.assertEqual([c['timestamp'] for c in chosen], [0.1])
+        self.assertEqual(skipped, 1)
+
+
+@override_settings(FRAME_MAX_DIMENSION=1920, FRAME_JPEG_QUALITY=85, FRAME_PREVIEW_MAX_DIMENSION=480,
+                   FRAME_PREVIEW_FORMAT='WEBP', FRAME_PREVIEW_QUALITY=70)
+class FrameProfileTest(TestCase):
+    def test_encode_frame_renditions_bounds_size(self):
+        import os
+        import tempfile
+        from PIL import Image
+        from .frame_profile import encode_frame_renditions
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            frame_path = os.path.join(temp_dir, 'frame.jpg')
+            preview_path = os.path.join(temp_dir, 'frame_preview.webp')
+
+            size = encode_frame_renditions(Image.new('RGB', (3840, 2160), (90, 120, 150)), frame_path, preview_path)
+
+            self.assertEqual(size, (1920, 1080))
+            with Image.open(frame_path) as frame:
+                self.assertEqual((frame.format, frame.size), ('JPEG', (1920, 1080)))
+            with Image.open(preview_path) as preview:
+                self.assertEqual((preview.format, preview.size), ('WEBP', (480, 270)))
+
+    def test_small_frames_are_not_upscaled(self):
+        import os
+        import tempfile
+        from PIL import Image
+        from .frame_profile import encode_frame_renditions
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            size = encode_frame_renditions(
+                Image.new('RGB', (320, 240)), os.path.join(temp_dir, 'f.jpg'), os.path.join(temp_dir, 'p.webp')
+            )
+
+        self.assertEqual(size, (320, 240))
+
+
+@override_settings(RANGE_ANALYSIS_FPS=5.0, RANGE_ANALYSIS_MAX_SECONDS=30.0)
+class VideoRangeAnalysisTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.brand = Brand.objects.create(name="Test Brand")
+        self.store = Store.objects.create(
+            brand=self.brand, name="Test Store", code="TS001", address="123 Test St",
+            city="Test City", state="TS", zip_code="12345"
+        )
+        self.user = User.objects.create_user(username="testuser", store=self.store)
+        self.client.force_authenticate(user=self.user)
+        self.inspection = Inspection.objects.create(
+            title="Test", created_by=self.user, store=self.store,
+            mode=Inspection.Mode.ENTERPRISE, status=Inspection.Status.COMPLETED, overall_score=90.0
+        )
+        self.video = Video.objects.create(
+            uploaded_by=self.user, store=self.store, title="test.mp4", file="test.mp4",
+            duration=60.0, inspection=self.inspection
+        )
+
+    @patch('videos.tasks.analyze_video_range_task.delay')
+    def test_analyze_range_queues_analysis(self, mock_delay):
+        response = self.client.post(
+            f'/api/videos/{self.video.id}/analyze-range/', {'start': 10, 'end': 20}, format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['inspection_id'], self.inspection.id)
+        self.assertEqual(mock_delay.call_args.args, (self.video.id, 10.0, 20.0))
+
+    @patch('videos.tasks.analyze_video_range_task.delay')
+    def test_analyze_range_rejects_invalid_ranges(self, mock_delay):
+        url = f'/api/videos/{self.video.id}/analyze-range/'
+
+        for data in [{'start': 10}, {'start': 20, 'end': 10}, {'start': 0, 'end': 40}, {'start': 50, 'end': 70}]:
+            self.assertEqual(self.client.post(url, data, format='json').status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.inspection.status = Inspection.Status.PROCESSING
+        self.inspection.save()
+        response = self.client.post(url, {'start': 10, 'end': 20}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        mock_delay.assert_not_called()
+
+    @patch('videos.range_analysis.subprocess.run')
+    def test_extract_range_seeks_on_input(self, mock_run):
+        from .range_analysis import extract_range_frames
+
+        mock_run.return_value.returncode = 0
+
+        self.assertEqual(extract_range_frames(self.video, '/tmp/source.mp4', 12.5, 22.5, 4), [])
+
+        cmd = mock_run.call_args.args[0]
+        self.assertLess(cmd.index('-ss'), cmd.index('-i'))
+        self.assertEqual(cmd[cmd.index('-ss') + 1], '12.500')
+        self.assertEqual(cmd[cmd.index('-t') + 1], '10.000')
+        self.assertIn('fps=5.0', cmd)
+
+    @patch('inspections.tasks.BedrockRecommendationService')
+    @patch('inspections.tasks.VideoAnalyzer')
+    @patch('inspections.tasks.analyze_stored_frame')
+    @patch('videos.range_analysis.extract_range_frames')
+    @patch('videos.range_analysis.video_source', return_value='/tmp/source.mp4')
+    @patch('videos.tasks.os.remove')
+    @patch('videos.tasks.os.path.exists', return_value=True)
+    @patch('videos.tasks.default_storage.save')
+    @patch('builtins.open', new_callable=mock_open, read_data=b'fake_frame_data')
+    def test_range_results_are_attached_as_supplemental(self, mock_file, mock_save, mock_exists, mock_remove,
+                                                        mock_source, mock_extract, mock_analyze_frame,
+                                                        mock_analyzer_class, mock_bedrock):
+        from ai_services.bedrock_service import BedrockRecommendationService
+        from inspections.models import Finding
+        from .range_analysis import analyze_video_range
+
+        mock_save.side_effect = lambda path, content: path
+        mock_bedrock.return_value = BedrockRecommendationService(enabled=False)
+        mock_analyzer_class.return_value.rekognition.client = None
+        mock_analyzer_class.return_value.generate_findings.side_effect = lambda analysis, frame: [{
+            'category': 'SAFETY', 'severity': 'HIGH', 'title': 'Blocked exit', 'confidence': 0.9, 'frame': frame,
+        }] if frame.frame_number == 3 else []
+        def analyze(analyzer, frame, plan):
+            # A pipeline stage rewrites the inspection's analysis while the range is analyzed
+            Inspection.objects.filter(id=self.inspection.id).update(ai_analysis={'analysis_summary': {'merged': 1}})
+            return {'overall_score': 40.0}
+
+        mock_analyze_frame.side_effect = analyze
+        for number in range(2):
+            VideoFrame.objects.create(video=self.video, frame_number=number, timestamp=number * 5.0,
+                                      width=640, height=360)
+        mock_extract.return_value = [
+            {'path': f'/tmp/video_{self.video.id}_frame_{number}.jpg', 'timestamp': 10.0 + (number - 2) * 0.2,
+             'frame_number': number, 'width': 640, 'height': 360}
+            for number in range(2, 4)
+        ]
+
+        record = analyze_video_range(self.video, 10.0, 10.4)
+
+        self.assertEqual(mock_extract.call_args.args[1:], ('/tmp/source.mp4', 10.0, 10.4, 2))
+        supplemental = VideoFrame.objects.filter(video=self.video, is_supplemental=True)
+        self.assertEqual(sorted(supplemental.values_list('frame_number', flat=True)), [2, 3])
+        self.assertEqual(record['frames_analyzed'], 2)
+
+        finding = Finding.objects.get(inspection=self.inspection)
+        self.assertEqual(finding.frame.frame_number, 3)
+        self.assertEqual(record['finding_ids'], [finding.id])
+
+        # Supplemental results do not change the inspection's scores
+        self.inspection.refresh_from_db()
+        self.assertEqual(self.inspection.overall_score, 90.0)
+        self.assertEqual(self.inspection.ai_analysis['supplemental_ranges'], [record])
+        self.assertEqual(self.inspection.ai_analysis['analysis_summary']['merged'], 1)
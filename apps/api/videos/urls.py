@@ -5,6 +5,7 @@ urlpatterns = [
     path('', views.VideoListCreateView.as_view(), name='video-list-create'),
     path('<int:pk>/', views.VideoDetailView.as_view(), name='video-detail'),
     path('<int:pk>/reprocess/', views.reprocess_video, name='video-reprocess'),
+    path('<int:pk>/analyze-range/', views.analyze_video_range, name='video-analyze-range'),
     path('<int:video_id>/frames/', views.VideoFrameListView.as_view(), name='video-frames'),
     
     # Demo video endpoints
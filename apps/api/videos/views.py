@@ -8,6 +8,7 @@ from django.conf import settings
 from django.shortcuts import get_object_or_404
 from .models import Video, VideoFrame
 from .serializers import VideoSerializer, VideoListSerializer, VideoFrameSerializer
+from core.locks import PipelineLock
 
 
 class VideoListCreateView(generics.ListCreateAPIView):
@@ -91,8 +92,7 @@ def reprocess_video(request, pk):
 
     try:
         from inspections.models import Inspection
-        from uploads.models import Upload
-        from videos.tasks import apply_inspection_rules, apply_coaching_rules
+        from videos.tasks import apply_inspection_rules, apply_coaching_rules, find_upload_for_video, video_pipeline_lock
 
         user = request.user
 
@@ -105,7 +105,7 @@ def reprocess_video(request, pk):
         logger.info(f"Reprocessing video {pk}: {video.title}, status={video.status}")
 
         # Get existing frames
-        frames = list(video.frames.all())
+        frames = list(video.frames.filter(is_supplemental=False))
         logger.info(f"Found {len(frames)} frames for video {pk}")
 
         if not frames:
@@ -115,10 +115,7 @@ def reprocess_video(request, pk):
             logger.info(f"No frames found for video {pk}, triggering full reprocess")
 
             # Find Upload record to verify video exists in S3
-            upload = Upload.objects.filter(
-                store=video.store,
-                original_filename=video.title
-            ).order_by('-created_at').first()
+            upload = find_upload_for_video(video)
 
             if not upload:
                 return Response(
@@ -129,8 +126,19 @@ def reprocess_video(request, pk):
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
+            lock = video_pipeline_lock(video, upload)
+            if not lock.acquire():
+                return Response(
+                    {'error': 'Video is already being processed', 'code': 'already_running', 'video_id': video.id},
+                    status=status.HTTP_409_CONFLICT
+                )
+
             # Trigger full reprocessing
-            reprocess_video_from_s3.delay(video.id)
+            try:
+                reprocess_video_from_s3.delay(video.id, lock_token=lock.token)
+            except Exception:
+                lock.release()
+                raise
 
             return Response({
                 'message': 'Full video reprocessing started (extracting frames and analyzing)',
@@ -142,10 +150,7 @@ def reprocess_video(request, pk):
         logger.info(f"Reanalyzing {len(frames)} existing frames for video {pk}")
 
         # Find the Upload to determine mode (inspection vs coaching)
-        upload = Upload.objects.filter(
-            store=video.store,
-            original_filename=video.title
-        ).order_by('-created_at').first()
+        upload = find_upload_for_video(video)
 
         # Determine mode
         if upload:
@@ -154,14 +159,27 @@ def reprocess_video(request, pk):
             # Default to inspection if no Upload found (legacy videos)
             mode = 'inspection'
 
-        # Delete existing inspections for this video
-        Inspection.objects.filter(video=video).delete()
-
-        # Re-run analysis
-        if mode == 'inspection':
-            inspection = apply_inspection_rules(video, frames)
-        else:
-            inspection = apply_coaching_rules(video, frames)
+        lock = video_pipeline_lock(video, upload)
+        if not lock.acquire():
+            return Response(
+                {'error': 'Video is already being processed', 'code': 'already_running', 'video_id': video.id},
+                status=status.HTTP_409_CONFLICT
+            )
+
+        try:
+            # Delete existing inspections for this video
+            Inspection.objects.filter(video=video).delete()
+
+            # Re-run analysis
+            if mode == 'inspection':
+                inspection = apply_inspection_rules(video, frames, lock=lock)
+            else:
+                inspection = apply_coaching_rules(video, frames, lock=lock)
+        except Exception:
+            lock.release()
+            raise
+        if inspection is None:
+            lock.release()
 
         return Response({
             'message': 'Video analysis restarted (using existing frames)',
@@ -183,6 +201,69 @@ def reprocess_video(request, pk):
         )
 
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def analyze_video_range(request, pk):
+    """
+    Analyze a time range of a video at high frame density.
+
+    Frames between `start` and `end` (seconds) are extracted from the stored
+    source, analyzed, and attached to the video's inspection as supplemental
+    frames and findings, without changing its scores.
+    """
+    from inspections.models import Inspection
+    from videos.tasks import analyze_video_range_task
+
+    video = get_object_or_404(Video, pk=pk)
+    if request.user.role != 'ADMIN' and video.store != request.user.store:
+        return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
+
+    try:
+        start = float(request.data.get('start'))
+        end = float(request.data.get('end'))
+    except (TypeError, ValueError):
+        return Response({'error': 'start and end are required, in seconds'}, status=status.HTTP_400_BAD_REQUEST)
+
+    if start < 0 or end <= start:
+        return Response({'error': 'end must be after start'}, status=status.HTTP_400_BAD_REQUEST)
+    if end - start > settings.RANGE_ANALYSIS_MAX_SECONDS:
+        return Response(
+            {'error': f'Ranges are limited to {settings.RANGE_ANALYSIS_MAX_SECONDS:g} seconds'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if video.duration and end > video.duration:
+        return Response({'error': 'Range ends after the video'}, status=status.HTTP_400_BAD_REQUEST)
+
+    inspection = video.inspection
+    if not inspection or inspection.status != Inspection.Status.COMPLETED:
+        return Response(
+            {'error': 'Video has no completed inspection to attach results to'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    lock = PipelineLock.for_resource('video_range', video.id)
+    if not lock.acquire():
+        return Response(
+            {'error': 'A range of this video is already being analyzed', 'code': 'already_running',
+             'video_id': video.id},
+            status=status.HTTP_409_CONFLICT
+        )
+
+    try:
+        analyze_video_range_task.delay(video.id, start, end, lock_token=lock.token)
+    except Exception:
+        lock.release()
+        raise
+
+    return Response({
+        'message': 'Range analysis started',
+        'video_id': video.id,
+        'inspection_id': inspection.id,
+        'start': start,
+        'end': end,
+    }, status=status.HTTP_202_ACCEPTED)
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_demo_video(request, demo_type):
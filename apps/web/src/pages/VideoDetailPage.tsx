@@ -655,7 +655,7 @@ export default function VideoDetailPage() {
                                 onClick={() => setSelectedFrameIndex(index)}
                               >
                                 <img
-                                  src={frame.image}
+                                  src={frame.preview || frame.image}
                                   alt={`Frame ${frame.frame_number}`}
                                   className="w-full h-20 object-cover group-hover:opacity-75 transition-opacity"
                                 />
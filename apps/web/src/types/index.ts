@@ -101,6 +101,7 @@ export interface VideoFrame {
   timestamp: number;
   frame_number: number;
   image: string;
+  preview?: string | null;
   width: number;
   height: number;
   created_at: string;